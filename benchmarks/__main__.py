@@ -0,0 +1,59 @@
+import argparse
+import json
+from pathlib import Path
+import sys
+import traceback
+from typing import Any, Dict, List, Tuple
+
+from . import bench_control, bench_enforcement, bench_exec_guard, bench_fetch, bench_freezer, bench_hashes, bench_logging, bench_matching, bench_memory, bench_profiler, bench_replay, bench_respawn, bench_spawn_latency, bench_startup, bench_tracker, bench_utils  # noqa: F401 (registers benchmarks)
+from .harness import REGISTRY, Result, expand_params, format_duration, results_to_json, run_benchmark
+
+def _key(name: str, params: Dict[str, Any]) -> Tuple[str, str]:
+    return name, json.dumps(params, sort_keys=True)
+
+def load_baseline(path: Path) -> Dict[Tuple[str, str], float]:
+    data = json.loads(path.read_text())
+    return {_key(r["name"], r["params"]): r["min_s"] for r in data["results"]}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run hackablock's benchmark suite.")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this string")
+    parser.add_argument("-o", "--output", type=Path, help="write machine-readable results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="compare against a previous JSON results file")
+    parser.add_argument("--quick", action="store_true", help="run each benchmark once, for smoke-testing the suite")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.compare) if args.compare else {}
+    results: List[Result] = []
+    failed = False
+
+    for bench in REGISTRY:
+        if args.filter not in bench.name:
+            continue
+
+        for params in expand_params(bench.params):
+            label = bench.name + "".join(f" {k}={v}" for k, v in params.items())
+            try:
+                result = run_benchmark(bench, params, quick=args.quick)
+            except Exception:
+                failed = True
+                print(f"{label:<72} FAILED")
+                traceback.print_exc()
+                continue
+
+            results.append(result)
+            line = f"{label:<72} {format_duration(result.min_s):>10}"
+            if (previous := baseline.get(_key(result.name, result.params))):
+                line += f"  {result.min_s / previous:6.2f}x vs baseline"
+            if result.extra:
+                line += "  " + " ".join(f"{k}={v:.3g}" if isinstance(v, float) else f"{k}={v}" for k, v in result.extra.items())
+            print(line)
+
+    if args.output:
+        args.output.write_text(json.dumps(results_to_json(results), indent=2))
+        print(f"Wrote {len(results)} results to {args.output}")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
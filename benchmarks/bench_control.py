@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+from src import control
+
+from .harness import benchmark
+
+@benchmark("control.status")
+def status():
+    # Full client round trip, connect included, against a server answering from cached state
+    tmp = tempfile.TemporaryDirectory()
+    original_address = control.ADDRESS
+    if control.FAMILY == "AF_PIPE":
+        control.ADDRESS = rf"\\.\pipe\hackablock-bench-{os.getpid()}"
+    else:
+        control.ADDRESS = os.path.join(tmp.name, "bench.sock")
+
+    cached = {"seconds": 1234, "required_seconds": 3600, "requirement_met": False, "blocked_apps": ["steam.exe"]}
+    server = control.ControlServer({"status": lambda args: cached})
+    server.start()
+
+    def run() -> None:
+        control.send_command("status")
+
+    def teardown() -> None:
+        server.stop()
+        control.ADDRESS = original_address
+        tmp.cleanup()
+
+    run.teardown = teardown
+    return run
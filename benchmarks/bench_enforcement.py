@@ -0,0 +1,131 @@
+from pathlib import Path
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import psutil
+
+from src.daemon import Daemon
+from src.settings import settings
+from src.watchers import procfs
+
+from .harness import benchmark
+
+TABLE_SIZES = [1_000, 10_000, 50_000]
+BLOCKED_EVERY = 1_000  # One blocked process per this many entries
+
+class FakeProcess:
+    def __init__(self, pid: int, name: str) -> None:
+        self.info: Dict[str, Any] = {"pid": pid, "name": name, "exe": f"/usr/bin/{name}", "cmdline": [name]}
+
+def _process_name(pid: int) -> str:
+    return "steam.exe" if pid % BLOCKED_EVERY == 0 else f"worker-{pid % 97}"
+
+def _quiet_daemon() -> Tuple[Daemon, Callable[[], None]]:
+    # Returns the daemon and what puts the block list back
+    original = settings.data["blocked_apps"]
+    daemon = Daemon()
+    settings.update_setting("blocked_apps", ["steam.exe"])
+    return daemon, lambda: settings.update_setting("blocked_apps", list(original))
+
+@benchmark("enforcement.find_blocked_processes.psutil", params={"processes": TABLE_SIZES})
+def find_blocked_psutil(processes: int):
+    table: List[FakeProcess] = [FakeProcess(pid, _process_name(pid)) for pid in range(1, processes + 1)]
+    original_process_iter = psutil.process_iter
+    psutil.process_iter = lambda attrs=None: iter(table)
+
+    daemon, restore_settings = _quiet_daemon()
+    daemon.proc_scanner = None
+
+    # Only the scan is timed, killing would signal whatever real processes own these pids
+    def run() -> None:
+        daemon._find_blocked_processes_psutil()
+
+    def teardown() -> None:
+        psutil.process_iter = original_process_iter
+        restore_settings()
+
+    run.teardown = teardown
+    return run
+
+def _fake_proc_table(root: Path, processes: int, young_every: int = 0) -> None:
+    # Blocked names are left out, matches would get real signals sent to these pids
+    young_start = int(time.clock_gettime(time.CLOCK_BOOTTIME) * procfs.CLOCK_TICKS) if young_every else 0
+    for pid in range(1, processes + 1):
+        start_time = young_start if young_every and pid % young_every == 0 else 1000 + pid
+        (root / str(pid)).mkdir()
+        (root / str(pid) / "stat").write_text(
+            f"{pid} (worker-{pid % 97}) S 1 {pid} {pid} 0 -1 4194560 0 0 0 0 0 0 0 0 20 0 1 0 {start_time} 0 0\n"
+        )
+
+def _procfs_benchmark(processes: int, warm: bool):
+    tmp = tempfile.TemporaryDirectory()
+    _fake_proc_table(Path(tmp.name), processes)
+    original_proc_path = procfs.PROC_PATH
+    procfs.PROC_PATH = tmp.name
+
+    daemon, restore_settings = _quiet_daemon()
+    scanner = procfs.ProcScanner()
+    if warm:
+        scanner.scan()
+
+    def run() -> None:
+        daemon._find_blocked_processes_procfs(scanner if warm else procfs.ProcScanner())
+
+    def teardown() -> None:
+        procfs.PROC_PATH = original_proc_path
+        restore_settings()
+        tmp.cleanup()
+
+    run.teardown = teardown
+    return run
+
+@benchmark("enforcement.find_blocked_processes.procfs_cold", params={"processes": TABLE_SIZES}, repeat=3)
+def find_blocked_procfs_cold(processes: int):
+    return _procfs_benchmark(processes, warm=False)
+
+@benchmark("enforcement.find_blocked_processes.procfs_warm", params={"processes": TABLE_SIZES})
+def find_blocked_procfs_warm(processes: int):
+    return _procfs_benchmark(processes, warm=True)
+
+@benchmark("enforcement.procfs_rescan", params={"processes": [10_000], "young_percent": [0, 1, 10]})
+def procfs_rescan(processes: int, young_percent: int):
+    # A warm rescan also re-reads every process started within RECHECK_AGE, in case it has exec'd since
+    tmp = tempfile.TemporaryDirectory()
+    _fake_proc_table(Path(tmp.name), processes, young_every=100 // young_percent if young_percent else 0)
+    original_proc_path = procfs.PROC_PATH
+    procfs.PROC_PATH = tmp.name
+    scanner = procfs.ProcScanner()
+    scanner.scan()
+
+    def run() -> None:
+        scanner.scan()
+
+    def teardown() -> None:
+        procfs.PROC_PATH = original_proc_path
+        tmp.cleanup()
+
+    run.teardown = teardown
+    return run
+
+@benchmark("enforcement.psutil_sweep_real")
+def psutil_sweep_real():
+    # The full sweep the app used before the incremental scanner, against this machine's process table
+    def run() -> None:
+        for proc in psutil.process_iter(["pid", "name"]):
+            proc.info["name"]
+
+    run.extra = {"processes": len(psutil.pids())}
+    return run
+
+if procfs.ProcScanner.is_supported():
+    @benchmark("enforcement.procfs_scan_real")
+    def procfs_scan_real():
+        scanner = procfs.ProcScanner()
+        scanner.scan()
+
+        def run() -> None:
+            scanner.scan()
+
+        run.extra = {"processes": len(psutil.pids())}
+        return run
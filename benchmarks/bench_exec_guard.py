@@ -0,0 +1,51 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+from src.block_rules import BlockRuleIndex
+from src.settings import settings
+
+from .harness import benchmark
+
+if sys.platform.startswith("linux"):
+    from src.watchers import fanotify
+
+    @benchmark("exec_guard.decision", params={"cache": ["hit", "miss"]})
+    def decision(cache: str):
+        # Work done per permission event while the exec waits, on the binary Python itself was started from
+        rules = BlockRuleIndex(["steam", "re:.*launcher.*", "path:/opt/games/*"])
+        decisions = fanotify.DecisionCache()
+        fd = os.open(sys.executable, os.O_RDONLY)
+
+        def run() -> None:
+            if cache == "miss":
+                decisions.lookup(BlockRuleIndex(), (0, 0, 0))  # A different rule index drops every decision
+            fanotify.decide(fd, rules, decisions)
+
+        run.teardown = lambda: os.close(fd)
+        return run
+
+    if hasattr(os, "geteuid") and os.geteuid() == 0 and shutil.which("true"):
+        @benchmark("exec_guard.exec_overhead", params={"guard": [False, True]})
+        def exec_overhead(guard: bool):
+            # Full fork and exec of true, with and without every exec on the machine waiting on the guard
+            original = dict(settings.data)
+            settings.update_settings({"blocked_apps": ["hb-never-runs"], "exec_guard_enabled": guard})
+            shutdown_event, requirement_met_event = threading.Event(), threading.Event()
+            guard_thread = fanotify.start_exec_guard(shutdown_event, requirement_met_event)
+            true_path = shutil.which("true")
+
+            def run() -> None:
+                subprocess.run([true_path], check=True)
+
+            def teardown() -> None:
+                shutdown_event.set()
+                if guard_thread:
+                    guard_thread.join()
+                settings.update_settings({key: original[key] for key in ("blocked_apps", "exec_guard_enabled")})
+
+            run.extra = {"guard_active": guard_thread is not None}
+            run.teardown = teardown
+            return run
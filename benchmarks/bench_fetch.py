@@ -0,0 +1,117 @@
+from bisect import bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from typing import List
+
+from src.coding_time_tracker import CodingTimeTracker
+from src.hackatime_client import HackatimeClient, RateLimiter
+from src.profiles import ProfileRegistry
+from src.settings import settings
+
+from .harness import benchmark
+
+RATE_LIMIT = 50  # requests per second
+
+class FakeHackatimeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_GET(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps({"data": {"grand_total": {"total_seconds": 1234}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+def start_fake_hackatime(latency: float) -> ThreadingHTTPServer:
+    handler = type("Handler", (FakeHackatimeHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+@benchmark("fetch.fetch_coding_seconds", params={"latency_ms": [0, 5, 50], "cache_ttl": [0, 15]})
+def fetch_coding_seconds(latency_ms: int, cache_ttl: int):
+    server = start_fake_hackatime(latency_ms / 1000)
+    client = HackatimeClient(base_url=f"http://127.0.0.1:{server.server_port}/api/hackatime/v1")
+    tracker = CodingTimeTracker(client)
+    original_ttl = settings.data["fetch_cache_ttl"]
+    settings.update_setting("fetch_cache_ttl", cache_ttl)
+
+    def run() -> None:
+        tracker.fetch_coding_seconds()
+
+    def teardown() -> None:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        settings.update_setting("fetch_cache_ttl", original_ttl)
+
+    run.teardown = teardown
+    run.extra = lambda: {**client.latency_stats(), "cache_hits": tracker.cache_hits, "cache_misses": tracker.cache_misses}
+    return run
+
+class CountingHackatimeHandler(FakeHackatimeHandler):
+    # Tracks how many requests overlap and the busiest second, to check the pool and the rate limit
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    started: List[float] = []
+
+    def do_GET(self) -> None:
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+            cls.started.append(time.monotonic())
+        try:
+            super().do_GET()
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+def _peak_rate(started: List[float], window: float = 1.0) -> int:
+    started = sorted(started)
+    return max((bisect_right(started, t + window) - i for i, t in enumerate(started)), default=0)
+
+@benchmark("fetch.profiles", params={"profiles": [1, 12, 48], "workers": [1, 8]}, repeat=3)
+def fetch_profiles(profiles: int, workers: int):
+    # One polling round over every profile against a 100ms API, capped at RATE_LIMIT requests per second overall
+    handler = type("Handler", (CountingHackatimeHandler,), {"latency": 0.1, "lock": threading.Lock(), "started": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    original = dict(settings.data)
+    settings.update_settings({
+        "profiles": [{"name": f"student{i}", "hackatime_api_key": f"key-{i}", "users": [f"student{i}"]} for i in range(profiles)],
+        "fetch_cache_ttl": 0,
+        "fetch_workers": workers,
+    })
+    client = HackatimeClient(
+        base_url=f"http://127.0.0.1:{server.server_port}/api/hackatime/v1",
+        pool_size=workers,
+        rate_limiter=RateLimiter(RATE_LIMIT, burst=workers)
+    )
+    registry = ProfileRegistry(client)
+    states = registry.states()
+
+    def run() -> None:
+        registry.map(lambda state: state.tracker.fetch_coding_seconds(state.profile.api_key), states)
+
+    def teardown() -> None:
+        registry.close()
+        client.close()
+        server.shutdown()
+        server.server_close()
+        settings.update_settings({key: original[key] for key in ("profiles", "fetch_cache_ttl", "fetch_workers")})
+
+    run.teardown = teardown
+    run.extra = lambda: {"max_in_flight": handler.max_in_flight, "peak_requests_per_s": _peak_rate(handler.started), "requests": len(handler.started)}
+    return run
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from typing import List
+
+from src.watchers.enforcer import ProcessFreezer
+
+from .harness import benchmark
+
+STARTUP_MS = [200, 1000]
+
+# Stands in for a heavy app: a slow cold start, then it answers each line on stdin
+APP_SCRIPT = """
+import sys, time
+time.sleep({startup_ms} / 1000)
+loaded = bytearray(64 * 1024 * 1024)
+for i in range(0, len(loaded), 4096):
+    loaded[i] = 1
+print("ready", flush=True)
+for line in sys.stdin:
+    print(line.strip(), flush=True)
+"""
+
+def _start_app(startup_ms: int) -> subprocess.Popen:
+    app = subprocess.Popen(
+        [sys.executable, "-c", APP_SCRIPT.format(startup_ms=startup_ms)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    app.stdout.readline()
+    return app
+
+def _ping(app: subprocess.Popen) -> None:
+    app.stdin.write("ping\n")
+    app.stdin.flush()
+    app.stdout.readline()
+
+@benchmark("freezer.time_to_usable", params={"startup_ms": STARTUP_MS, "mode": ["kill", "suspend"]}, repeat=3)
+def time_to_usable(startup_ms: int, mode: str):
+    # Timed from the block to the app answering again, after a relaunch (kill) or a resume (suspend)
+    apps: List[subprocess.Popen] = [_start_app(startup_ms)]
+    freezer = ProcessFreezer()
+
+    def run_kill() -> None:
+        apps[0].kill()
+        apps[0].wait()
+        apps[0] = _start_app(startup_ms)
+        _ping(apps[0])
+
+    def run_suspend() -> None:
+        freezer.freeze(apps[0].pid, "app")
+        freezer.resume_all()
+        _ping(apps[0])
+
+    def teardown() -> None:
+        freezer.resume_all()
+        apps[0].kill()
+        apps[0].wait()
+
+    run = run_kill if mode == "kill" else run_suspend
+    run.teardown = teardown
+    return run
@@ -0,0 +1,27 @@
+import os
+from pathlib import Path
+import tempfile
+
+from src.binary_hashes import BinaryHashCache, sha256_file
+
+from .harness import benchmark
+
+@benchmark("hashing.binary_check", params={"cache": ["cold", "warm"], "size_mb": [1, 64]})
+def binary_check(cache: str, size_mb: int):
+    # Cold hashes the whole executable, warm is the stat and lookup every later check costs
+    tmp = tempfile.TemporaryDirectory()
+    binary = Path(tmp.name) / "app.bin"
+    binary.write_bytes(os.urandom(size_mb * 1024 * 1024))
+
+    hashes = BinaryHashCache(Path(tmp.name) / "hashes.json")
+    key, digest = sha256_file(binary)
+    hashes._loaded()[key] = digest
+
+    def run() -> None:
+        if cache == "cold":
+            sha256_file(binary)
+        else:
+            hashes.lookup(str(binary))
+
+    run.teardown = tmp.cleanup
+    return run
@@ -0,0 +1,50 @@
+import logging
+from logging.handlers import QueueListener
+from pathlib import Path
+import queue
+import tempfile
+
+from src import logging_setup
+
+from .harness import benchmark
+
+@benchmark("logging.kill_event", params={"handler": ["file", "queue"], "log_format": ["text", "json"]})
+def kill_event(handler: str, log_format: str):
+    # Cost on the calling thread of the log line written for every blocked exec
+    tmp = tempfile.TemporaryDirectory()
+    original_log_file = logging_setup.LOG_FILE
+    logging_setup.LOG_FILE = Path(tmp.name) / "hackablock.log"
+    file_handler = logging_setup.create_file_handler(log_format, max_bytes=5 * 1024 * 1024, backups=1)
+
+    logger = logging.getLogger(f"bench.{handler}.{log_format}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    listener = None
+    if handler == "queue":
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, file_handler)
+        listener.start()
+        logger.addHandler(logging_setup._EnqueueHandler(log_queue))
+    else:
+        logger.addHandler(file_handler)
+
+    pid, name, latency_ms = 4242, "steam.exe", 0.734
+
+    def run() -> None:
+        logger.info(
+            f"Terminated process: {name} (pid={pid}) {latency_ms:.2f}ms after exec",
+            extra={"pid": pid, "app": name, "latency_ms": latency_ms}
+        )
+
+    def teardown() -> None:
+        if listener:
+            listener.stop()
+        for attached in logger.handlers[:]:
+            logger.removeHandler(attached)
+        file_handler.close()
+        logging_setup.LOG_FILE = original_log_file
+        tmp.cleanup()
+
+    run.teardown = teardown
+    return run
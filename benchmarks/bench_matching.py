@@ -0,0 +1,53 @@
+import itertools
+
+from src.block_rules import BlockRuleIndex
+
+from .harness import benchmark
+
+RULE_COUNTS = [10, 1_000, 5_000]
+
+def _rules(count: int, kind: str):
+    if kind == "exact":
+        return [f"app{i}.exe" for i in range(count)]
+    if kind == "glob":
+        return [f"app{i}*.exe" for i in range(count)]
+    # A realistic mix: mostly exact names with some patterns, paths and command lines
+    return (
+        [f"app{i}.exe" for i in range(count * 8 // 10)]
+        + [f"game{i}*" for i in range(count // 10)]
+        + [f"path:/opt/vendor{i}/*" for i in range(count // 20)]
+        + [f"cmdline:*--profile={i}*" for i in range(count // 20)]
+    )
+
+@benchmark("matching.build_index", params={"rules": RULE_COUNTS, "kind": ["exact", "mixed"]}, repeat=3)
+def build_index(rules: int, kind: str):
+    rule_list = _rules(rules, kind)
+
+    def run() -> None:
+        BlockRuleIndex(rule_list)
+
+    return run
+
+@benchmark("matching.lookup", params={"rules": RULE_COUNTS, "kind": ["exact", "glob", "mixed"], "hit": [True, False]})
+def lookup(rules: int, kind: str, hit: bool):
+    index = BlockRuleIndex(_rules(rules, kind))
+    if hit:
+        names = itertools.cycle([f"app{i}.exe" for i in range(0, rules, max(1, rules // 100))])
+    else:
+        names = itertools.cycle([f"unrelated{i}.exe" for i in range(100)])
+
+    def run() -> None:
+        index.matches(next(names))
+
+    return run
+
+@benchmark("matching.legacy_list_scan", params={"rules": RULE_COUNTS})
+def legacy_list_scan(rules: int):
+    # The matching the app used before BlockRuleIndex, kept as a reference point
+    blocked_apps = _rules(rules, "exact")
+    names = itertools.cycle([f"unrelated{i}.exe" for i in range(100)])
+
+    def run() -> None:
+        next(names).lower() in blocked_apps
+
+    return run
@@ -0,0 +1,56 @@
+import os
+import tracemalloc
+
+from src.utils import get_rss_bytes
+
+from .harness import benchmark
+
+WARMUP_CYCLES = 3
+MEASURED_CYCLES = 20
+MB = 1024 ** 2
+
+@benchmark("memory.window_cycle", repeat=1)
+def window_cycle():
+    # Opens, closes and releases the main window, the extras report RSS at each stage and Python heap growth per cycle
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QCoreApplication, QEvent
+
+    from src.app import App
+
+    app = App()
+    app._init_qt_app()
+    stats = {"rss_idle_mb": round(get_rss_bytes() / MB, 1)}
+
+    def cycle() -> None:
+        window = app._get_main_window()
+        window.show_window(0)
+        QCoreApplication.processEvents()
+        stats["rss_window_open_mb"] = round(get_rss_bytes() / MB, 1)
+
+        window.close()
+        app._release_main_window()
+        QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+        QCoreApplication.processEvents()
+
+    for _ in range(WARMUP_CYCLES):
+        cycle()
+    stats["rss_after_release_mb"] = round(get_rss_bytes() / MB, 1)
+
+    tracemalloc.start(10)
+    before = tracemalloc.take_snapshot()
+    for _ in range(MEASURED_CYCLES):
+        cycle()
+    growth = [diff for diff in tracemalloc.take_snapshot().compare_to(before, "lineno") if diff.size_diff > 0]
+    tracemalloc.stop()
+
+    stats["leaked_kb_per_cycle"] = round(sum(diff.size_diff for diff in growth) / MEASURED_CYCLES / 1024, 2)
+    if growth:
+        top = max(growth, key=lambda diff: diff.size_diff).traceback[0]
+        stats["top_growth"] = f"{os.path.basename(top.filename)}:{top.lineno}"
+
+    def teardown() -> None:
+        app.fetch_pool.shutdown(wait=False, cancel_futures=True)
+
+    cycle.extra = lambda: stats
+    cycle.teardown = teardown
+    return cycle
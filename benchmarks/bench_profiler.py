@@ -0,0 +1,30 @@
+from pathlib import Path
+import tempfile
+
+from src.block_rules import BlockRuleIndex
+from src.profiler import profiler
+
+from .harness import benchmark
+
+def _rules(count: int):
+    return [f"app{i}.exe" for i in range(count)] + [f"game{i}*" for i in range(count // 10)]
+
+@benchmark("profiler.overhead", params={"profiling": [False, True]})
+def overhead(profiling: bool):
+    # The same matching work with the sampler and tracemalloc off and on, off should cost nothing at all
+    index = BlockRuleIndex(_rules(1_000))
+    names = [f"app{i}.exe" for i in range(0, 1_000, 10)] + [f"unrelated{i}.exe" for i in range(100)]
+    tmp = tempfile.TemporaryDirectory()
+    if profiling:
+        profiler.start(directory=Path(tmp.name))
+
+    def run() -> None:
+        for name in names:
+            index.matches(name)
+
+    def teardown() -> None:
+        profiler.stop()
+        tmp.cleanup()
+
+    run.teardown = teardown
+    return run
@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+import tempfile
+
+from src.settings import DEFAULT_PROFILE
+from src.trace_recorder import TRACE_VERSION
+from src.trace_replay import TraceReplayer
+
+from .harness import benchmark
+
+FETCH_INTERVAL = 60  # sec
+EXEC_INTERVAL = 6  # sec
+REQUIRED_MINUTES = 60
+
+def _write_trace(path: Path, hours: int, profile_count: int) -> None:
+    # Each profile codes at its own rate and crosses the requirement partway through,
+    # while steam (blocked) and code (allowed) keep being launched by every user in turn
+    users = [f"student{i}" for i in range(profile_count)]
+    names = users if profile_count > 1 else [DEFAULT_PROFILE]
+    rates = [0.2 + 0.1 * i for i in range(profile_count)]
+    values = {"blocked_apps": ["steam"], "minutes_required": REQUIRED_MINUTES, "profiles": [
+        {"name": name, "hackatime_api_key": "<redacted>", "users": [user]} for name, user in zip(names, users)
+    ] if profile_count > 1 else []}
+
+    records = [{"t": 0.0, "kind": "settings", "values": values}]
+    fetched = [0] * profile_count
+    for t in range(0, hours * 3600, EXEC_INTERVAL):
+        if t % FETCH_INTERVAL == 0:
+            for i, name in enumerate(names):
+                fetched[i] = int(t * rates[i])
+                records.append({"t": float(t), "kind": "fetch", "profile": name, "seconds": fetched[i]})
+
+        i = (t // EXEC_INTERVAL) % profile_count
+        app = "steam" if (t // EXEC_INTERVAL) % 2 else "code"
+        met = fetched[i] >= REQUIRED_MINUTES * 60
+        records.append({
+            "t": t + 0.5, "kind": "process", "source": "netlink", "pid": 1000 + t, "name": app, "user": users[i],
+            "exe": f"/usr/bin/{app}", "cmdline": [app], "blocked": app == "steam" and not met,
+            **({} if met else {"profile": names[i]}),
+        })
+
+    with open(path, "w") as f:
+        f.write(json.dumps({"version": TRACE_VERSION}) + "\n")
+        f.writelines(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+
+@benchmark("replay.trace", params={"hours": [1, 8], "profiles": [1, 4]}, repeat=3)
+def replay_trace(hours: int, profiles: int):
+    # Replays hours of recorded enforcement and polling, the extra fields report how much faster than real time
+    tmp = tempfile.TemporaryDirectory()
+    path = Path(tmp.name) / "trace.jsonl"
+    _write_trace(path, hours, profiles)
+    report = TraceReplayer(path).run()
+
+    def run() -> None:
+        TraceReplayer(path).run()
+
+    run.extra = {"events": report.events, "mismatches": report.mismatch_count, "speedup": round(report.speedup)}
+    run.teardown = tmp.cleanup
+    return run
@@ -0,0 +1,73 @@
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from src.metrics import PROCESSES_BLOCKED
+from src.settings import settings
+from src.watchers import enforcer
+
+from .harness import benchmark
+
+STORM_SECONDS = 3
+CHILD_NAME = "hb-respawn-child"  # A copy of sleep under a name nothing else on the machine uses
+LAUNCHER_NAME = "hb-respawn-sh"  # A copy of sh, listed as a launcher so only it can be killed
+
+def _blocked() -> float:
+    # Kills by the exec watcher plus execs the fanotify guard denied outright
+    return sum(sample["value"] for sample in PROCESSES_BLOCKED.snapshot() if sample["labels"]["action"] in ("kill", "deny"))
+
+if sys.platform.startswith("linux") and shutil.which("sleep"):
+    from src.watchers.linux import watch_processes
+
+    @benchmark("enforcement.respawn_storm", params={"parent_kill": [False, True], "exec_guard": [False, True]}, repeat=1)
+    def respawn_storm(parent_kill: bool, exec_guard: bool):
+        # A launcher that relaunches its blocked child as soon as it dies, the extras report block rate and CPU spent
+        tmp = tempfile.TemporaryDirectory()
+        child = Path(tmp.name) / CHILD_NAME
+        launcher_path = Path(tmp.name) / LAUNCHER_NAME
+        shutil.copy(shutil.which("sleep"), child)
+        shutil.copy(shutil.which("sh"), launcher_path)
+        original = dict(settings.data)
+        settings.update_settings({
+            "blocked_apps": [CHILD_NAME], "enforcement_mode": "kill", "exec_guard_enabled": exec_guard,
+            "kill_respawning_parents": parent_kill, "respawning_launchers": [LAUNCHER_NAME],
+        })
+        stats = {}
+
+        def run() -> None:
+            enforcer.respawn_guard = enforcer.RespawnGuard()
+            shutdown_event, requirement_met_event = threading.Event(), threading.Event()
+            watcher = threading.Thread(target=watch_processes, args=(shutdown_event, requirement_met_event), daemon=True)
+            watcher.start()
+            time.sleep(0.2)
+
+            blocked_before, cpu_before = _blocked(), time.process_time()
+            launcher = subprocess.Popen([str(launcher_path), "-c", f'while :; do "{child}" 60; done'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            time.sleep(STORM_SECONDS)
+            launcher_survived = launcher.poll() is None
+            blocked, cpu = _blocked() - blocked_before, time.process_time() - cpu_before
+
+            launcher.kill()
+            launcher.wait()
+            shutdown_event.set()
+            watcher.join()
+            stats.update(
+                blocked=int(blocked),
+                blocked_per_s=round(blocked / STORM_SECONDS, 1),
+                enforcement_cpu_s=round(cpu, 3),
+                launcher_survived=launcher_survived,
+            )
+
+        def teardown() -> None:
+            restored = {key: original[key] for key in ("blocked_apps", "enforcement_mode", "kill_respawning_parents", "respawning_launchers", "exec_guard_enabled")}
+            settings.update_settings({**restored, "blocked_apps": list(restored["blocked_apps"]), "respawning_launchers": list(restored["respawning_launchers"])})
+            subprocess.run(["pkill", "-x", CHILD_NAME[:15]], check=False)
+            tmp.cleanup()
+
+        run.extra = lambda: stats
+        run.teardown = teardown
+        return run
@@ -0,0 +1,95 @@
+from pathlib import Path
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from src.settings import settings
+from src.watchers import enforcer
+
+from .harness import benchmark
+
+PROBE_NAME = "hb-spawn-probe"  # A copy of sleep under a name nothing else on the machine uses
+NOISE_LOOPS = 4
+PROBES = {"netlink": 200, "polling": 20}
+PROBE_TIMEOUT = 5  # sec, a probe still alive after this counts as missed
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    if len(latencies) < 2:
+        return {}
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p90_ms": round(cuts[89] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+if sys.platform.startswith("linux") and shutil.which("sleep") and shutil.which("true"):
+    from src.watchers.linux import watch_processes as watch_netlink
+    from src.watchers.polling import watch_processes as watch_polling
+
+    @benchmark("enforcement.spawn_to_kill", params={"watcher": ["netlink", "polling"], "burst": [0, 5_000]}, repeat=1)
+    def spawn_to_kill(watcher: str, burst: int):
+        # Time from launching a blocked app until it's dead, while a burst of short-lived processes runs
+        # alongside. Launch time includes the fork and exec, so it's what a user would actually see
+        tmp = tempfile.TemporaryDirectory()
+        probe = Path(tmp.name) / PROBE_NAME
+        shutil.copy(shutil.which("sleep"), probe)
+        keys = ("blocked_apps", "enforcement_mode", "kill_respawning_parents", "exec_guard_enabled")
+        original = {key: settings.data[key] for key in keys}
+        # The probes' parent is this process, it must never be taken for a respawning launcher
+        settings.update_settings({"blocked_apps": [PROBE_NAME], "enforcement_mode": "kill", "kill_respawning_parents": False, "exec_guard_enabled": False})
+        stats = {}
+
+        def run() -> None:
+            enforcer.respawn_guard = enforcer.RespawnGuard()
+            shutdown_event, requirement_met_event = threading.Event(), threading.Event()
+            target = watch_netlink if watcher == "netlink" else watch_polling
+            thread = threading.Thread(target=target, args=(shutdown_event, requirement_met_event), daemon=True)
+            thread.start()
+            time.sleep(0.2 if watcher == "netlink" else settings.data["process_poll_interval"] + 0.2)
+
+            loop = f'i=0; while [ $i -lt {burst // NOISE_LOOPS} ]; do "{shutil.which("true")}"; i=$((i+1)); done'
+            burst_started_at = time.perf_counter()
+            noise = [subprocess.Popen(["sh", "-c", loop]) for _ in range(NOISE_LOOPS)] if burst else []
+            burst_ended_at = []
+            waiter = threading.Thread(target=lambda: ([n.wait() for n in noise], burst_ended_at.append(time.perf_counter())))
+            waiter.start()
+
+            latencies, missed = [], 0
+            while len(latencies) + missed < PROBES[watcher] or waiter.is_alive():
+                if watcher == "polling":
+                    # Launches land anywhere within a poll interval, not right after each scan
+                    time.sleep(random.uniform(0, settings.data["process_poll_interval"]))
+                started_at = time.perf_counter()
+                proc = subprocess.Popen([str(probe), "60"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    proc.wait(timeout=PROBE_TIMEOUT)
+                    latencies.append(time.perf_counter() - started_at)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+                    missed += 1
+
+            waiter.join()
+            shutdown_event.set()
+            thread.join()
+
+            stats.update(_percentiles(latencies), probes=len(latencies), missed=missed)
+            if burst:
+                stats["burst_execs_per_s"] = round(burst / (burst_ended_at[0] - burst_started_at))
+
+        def teardown() -> None:
+            settings.update_settings({**original, "blocked_apps": list(original["blocked_apps"])})
+            subprocess.run(["pkill", "-x", PROBE_NAME[:15]], check=False)
+            tmp.cleanup()
+
+        run.extra = lambda: stats
+        run.teardown = teardown
+        return run
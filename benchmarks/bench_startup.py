@@ -0,0 +1,104 @@
+from collections import defaultdict
+import json
+import os
+from pathlib import Path
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from .harness import benchmark
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+ENTRY_MODULES = {"headless": "src.daemon", "gui": "src.app"}
+REPORTED_PACKAGES = ("src", "PySide6", "shiboken6", "requests", "urllib3", "psutil")
+PROBE_NAME = "hb-startup-probe"
+STARTUP_TIMEOUT = 30  # sec
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+SWEEP_LINE = re.compile(r"First enforcement sweep finished ([\d.]+)ms after startup")
+
+def _env(mode: str) -> Dict[str, str]:
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    if mode == "gui":
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+def _import_breakdown(stderr: str) -> Dict[str, float]:
+    # Self time summed per top-level package, so the total isn't counted twice through nested imports
+    self_us: Dict[str, int] = defaultdict(int)
+    for match in IMPORTTIME_LINE.finditer(stderr):
+        self_us[match[4].split(".")[0]] += int(match[1])
+    stats = {"import_ms": round(sum(self_us.values()) / 1000, 1), "modules": len(IMPORTTIME_LINE.findall(stderr))}
+    stats.update((f"{package.lower()}_ms", round(self_us.get(package, 0) / 1000, 1)) for package in REPORTED_PACKAGES)
+    return stats
+
+def _wait_for_sweep(log: Path) -> float | None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if log.exists() and (sweeps := SWEEP_LINE.findall(log.read_text(errors="replace"))):
+            return float(sweeps[-1])
+        time.sleep(0.01)
+    return None
+
+@benchmark("startup.import", params={"mode": ["headless", "gui"]}, repeat=3)
+def import_cost(mode: str):
+    # Imports the entry module in a fresh interpreter, the extras break -X importtime down by package
+    command = [sys.executable, "-X", "importtime", "-c", f"import {ENTRY_MODULES[mode]}"]
+    tmp = tempfile.TemporaryDirectory()  # hackablock keeps its files in the working directory in development
+    stats = {}
+
+    def run() -> None:
+        result = subprocess.run(command, cwd=tmp.name, env=_env(mode), capture_output=True, text=True, check=True)
+        stats.update(_import_breakdown(result.stderr))
+
+    run.extra = lambda: stats
+    run.teardown = tmp.cleanup
+    return run
+
+if sys.platform.startswith("linux") and shutil.which("sleep"):
+    @benchmark("startup.time_to_first_block", params={"mode": ["headless", "gui"]}, repeat=3)
+    def time_to_first_block(mode: str):
+        # Starts hackablock with a blocked app already running. first_block_ms runs from launch until that app
+        # is dead, sweep_ms is hackablock's own count from when the daemon is built, so after imports. The timed
+        # figure also includes shutting down again
+        tmp = tempfile.TemporaryDirectory()
+        workdir = Path(tmp.name)
+        probe = workdir / PROBE_NAME
+        shutil.copy(shutil.which("sleep"), probe)
+        (workdir / "hackablock.json").write_text(json.dumps({
+            "blocked_apps": [PROBE_NAME],
+            "kill_respawning_parents": False,  # The probe's parent is this process
+            "exec_guard_enabled": False,
+        }))
+        command = [sys.executable, "-m", "src.main", *(["--headless"] if mode == "headless" else [])]
+        stats = {}
+
+        log = workdir / "hackablock.log"
+
+        def run() -> None:
+            log.unlink(missing_ok=True)
+            target = subprocess.Popen([str(probe), "60"])
+            started_at = time.perf_counter()
+            hackablock = subprocess.Popen(command, cwd=workdir, env=_env(mode), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                target.wait(timeout=STARTUP_TIMEOUT)
+                stats["first_block_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+                # The sweep is logged once it's done reporting, and a SIGINT before the handlers are in would lose it
+                stats["sweep_ms"] = _wait_for_sweep(log)
+            finally:
+                target.kill()
+                target.wait()
+                hackablock.send_signal(signal.SIGINT)
+                try:
+                    hackablock.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    hackablock.kill()
+                    hackablock.wait()
+
+        run.extra = lambda: stats
+        run.teardown = tmp.cleanup
+        return run
@@ -0,0 +1,62 @@
+from src.coding_time_tracker import CodingTimeTracker
+from src.poll_scheduler import PollScheduler
+
+from .harness import benchmark
+
+SAMPLES_PER_DAY = 24 * 60
+
+class _NoClient:
+    # Stands in for HackatimeClient so building a tracker doesn't open an HTTP session
+    pass
+
+def _day_sequence(days: int):
+    # One sample per minute with a midnight reset between days
+    sequence = []
+    for _ in range(days):
+        sequence.extend(minute * 30 for minute in range(SAMPLES_PER_DAY))
+    return sequence
+
+@benchmark("tracker.update_midnight_sequence", params={"days": [1, 7]})
+def update_midnight_sequence(days: int):
+    sequence = _day_sequence(days)
+
+    def run() -> None:
+        tracker = CodingTimeTracker(client=_NoClient())
+        for seconds in sequence:
+            tracker.update(seconds)
+
+    return run
+
+TIMELINES = {
+    "steady": lambda t: t,
+    "half_rate": lambda t: t * 0.5,
+    "burst_then_idle": lambda t: min(t, 1200) + max(0, t - 5000) * 0.8,
+    "coded_before_start": lambda t: 1800 + t * 0.3,
+}
+
+def _simulate(coded, scheduler: PollScheduler | None, required: int = 3600, max_latency: int = 120, horizon: int = 8 * 3600):
+    now, calls = 0.0, 0
+    while now < horizon:
+        seconds = int(coded(now))
+        calls += 1
+        if scheduler:
+            scheduler.record(seconds, now=now)
+        if seconds >= required:
+            break
+        now += scheduler.next_delay(seconds, required, max_latency) if scheduler else max(required - seconds, 60)
+
+    crossed_at = next(t for t in range(horizon * 2) if coded(t) >= required)
+    return calls, now - crossed_at
+
+@benchmark("tracker.poll_scheduler_replay", params={"timeline": list(TIMELINES), "scheduler": ["legacy", "adaptive"]}, repeat=3)
+def poll_scheduler_replay(timeline: str, scheduler: str):
+    # Replays a synthetic coding timeline, the extra fields report API calls made and unblock latency
+    coded = TIMELINES[timeline]
+    make = (lambda: PollScheduler(min_interval=60)) if scheduler == "adaptive" else (lambda: None)
+    calls, latency = _simulate(coded, make())
+
+    def run() -> None:
+        _simulate(coded, make())
+
+    run.extra = {"api_calls": calls, "unblock_latency_s": round(latency, 1)}
+    return run
@@ -0,0 +1,25 @@
+from contextlib import redirect_stdout
+import io
+
+from src.utils import format_time, timestamped_print
+
+from .harness import benchmark
+
+@benchmark("utils.format_time", params={"seconds": [59, 3599, 86399], "full_format": [False, True]})
+def bench_format_time(seconds: int, full_format: bool):
+    def run() -> None:
+        format_time(seconds, full_format=full_format, pad=True)
+
+    return run
+
+@benchmark("utils.timestamped_print")
+def bench_timestamped_print():
+    sink = io.StringIO()
+
+    def run() -> None:
+        with redirect_stdout(sink):
+            timestamped_print("🚫 Blocked steam.exe from opening")
+        sink.seek(0)
+        sink.truncate()
+
+    return run
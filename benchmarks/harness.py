@@ -0,0 +1,116 @@
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+import itertools
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+TARGET_SAMPLE_TIME = 0.2  # sec
+MIN_NUMBER = 1
+
+BenchmarkSetup = Callable[..., Callable[[], Any]]
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: BenchmarkSetup
+    params: Dict[str, List[Any]]
+    repeat: int
+
+@dataclass
+class Result:
+    name: str
+    params: Dict[str, Any]
+    number: int
+    repeat: int
+    min_s: float
+    median_s: float
+    mean_s: float
+    stdev_s: float
+    ops_per_s: float
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+REGISTRY: List[Benchmark] = []
+
+def benchmark(name: str, params: Dict[str, List[Any]] | None = None, repeat: int = 5) -> Callable[[BenchmarkSetup], BenchmarkSetup]:
+    # The decorated function does any setup and returns the callable that gets timed
+    def register(setup: BenchmarkSetup) -> BenchmarkSetup:
+        REGISTRY.append(Benchmark(name, setup, params or {}, repeat))
+        return setup
+    return register
+
+def _calibrate(func: Callable[[], Any]) -> int:
+    number = MIN_NUMBER
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= TARGET_SAMPLE_TIME or number >= 1_000_000:
+            return number
+        number = max(number * 2, int(number * TARGET_SAMPLE_TIME / max(elapsed, 1e-9)))
+
+def run_benchmark(bench: Benchmark, params: Dict[str, Any], quick: bool = False) -> Result:
+    func = bench.setup(**params)
+    extra = getattr(func, "extra", {})
+
+    # Setups patch settings and modules, those have to be put back even if a run fails
+    try:
+        number = MIN_NUMBER if quick else _calibrate(func)
+        repeat = 1 if quick else bench.repeat
+
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        if teardown := getattr(func, "teardown", None):
+            teardown()
+
+    return Result(
+        name=bench.name,
+        params=params,
+        number=number,
+        repeat=repeat,
+        min_s=min(samples),
+        median_s=statistics.median(samples),
+        mean_s=statistics.fmean(samples),
+        stdev_s=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        ops_per_s=1 / min(samples) if min(samples) > 0 else float("inf"),
+        extra=extra() if callable(extra) else extra
+    )
+
+def expand_params(params: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    if not params:
+        return [{}]
+    keys = list(params)
+    return [dict(zip(keys, values)) for values in itertools.product(*(params[k] for k in keys))]
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+def format_duration(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.1f}ns"
+
+def results_to_json(results: List[Result]) -> Dict[str, Any]:
+    return {"environment": environment(), "results": [asdict(r) for r in results]}
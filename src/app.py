@@ -1,70 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+import gc
 import logging
 import signal
 import sys
-import threading
 from types import FrameType
-from typing import List, Set, Tuple
+from typing import TYPE_CHECKING, Any, Dict
 
-import psutil
-from PySide6.QtCore import QCoreApplication, QTimer, QObject, Signal
+from PySide6.QtCore import QCoreApplication, QTimer, QObject, Signal, SignalInstance
 from PySide6.QtWidgets import QApplication
 
-from .coding_time_tracker import CodingTimeTracker
+from .control import CommandHandler
+from .daemon import Daemon
 from .hackatime_error import HackatimeError
 from .notifier import Notifier
-from .main_window import MainWindow
-from .settings import settings
+from .profiler import profiler
 from .tray import Tray
-from .utils import format_time, get_app_path, open_folder, timestamped_print, time_until_tomorrow
-from .watchers import watch_processes
+from .settings import settings
+from .utils import format_time, get_rss_bytes, timestamped_print, trim_heap
 
-CHECK_INTERVAL = 60  # sec
+if TYPE_CHECKING:
+    from .main_window import MainWindow
 
 class AppSignals(QObject):
     update_progress_signal = Signal(int)
     update_error_signal = Signal(HackatimeError)
+    window_progress_signal = Signal(int)
+    refresh_progress_signal = Signal(int)
+    show_window_signal = Signal()
+    blocked_app_added_signal = Signal(str)
 
-class App:
+class App(Daemon):
     def __init__(self) -> None:
-        self.requirement_met_event: threading.Event = threading.Event()
-        self.shutdown_event: threading.Event = threading.Event()
+        super().__init__()
 
         self.tray: Tray | None = None
-        self.notifier: Notifier | None = None
-        self.watcher_thread: threading.Thread | None = None
-        self.logic_thread: threading.Thread | None = None
         self.signals = AppSignals()
-        
+
         self.qt_app: QCoreApplication | None = None
-        self.main_window: MainWindow | None = None
-        
-        self.tracker: CodingTimeTracker = CodingTimeTracker()
+        self.main_window: "MainWindow | None" = None
+        self.window_idle_timer: QTimer | None = None
+
+        self.fetch_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fetch")
 
     # ENTRY POINT
     def run(self) -> None:
         try:
             logging.info("Booting hackablock...")
             timestamped_print("🔃 Loaded hackablock. Session starting...")
-            
+
             self._init_qt_app()
-            
+
             self.signals.update_progress_signal.connect(self._handle_progress_update)
             self.signals.update_error_signal.connect(self._handle_fetch_error)
-            
+            self.signals.window_progress_signal.connect(self._handle_window_progress)
+            self.signals.refresh_progress_signal.connect(self._handle_refresh_result)
+            self.signals.show_window_signal.connect(lambda: self._show_main_window_thread(None))
+            self.signals.blocked_app_added_signal.connect(self._handle_blocked_app_added)
+
             self._start_tray()
-            self._start_logic_thread()
-            self._start_process_watcher()
-            self._block_running_processes()
-            
+            self._start_services()
+
             if __debug__:
                 signal.signal(signal.SIGINT, self._handle_sigint)
-            
+
                 timer = QTimer()
                 timer.timeout.connect(lambda: None)
                 timer.start(200)
-            
+
             self._start_qt_app()
-            
+
         finally:
             timestamped_print("👋 Exiting hackablock...")
             logging.info("Terminating hackablock...\n")
@@ -76,36 +80,38 @@ class App:
             self.qt_app.setQuitOnLastWindowClosed(False)
         else:
             self.qt_app = QApplication.instance()
-            
-        self.main_window = MainWindow(
-            requirement_met_event=self.requirement_met_event,
-            on_refresh=self._handle_refresh_progress
-        )
-        self.main_window.hide()
-        
-        self.main_window.block_requested.connect(self._block_running_processes)
-        
+
+        self.window_idle_timer = QTimer()
+        self.window_idle_timer.setSingleShot(True)
+        self.window_idle_timer.timeout.connect(self._release_main_window)
+
+    def _get_main_window(self) -> "MainWindow":
+        if self.main_window is None:
+            # Imported on first use so sessions where the window is never opened don't pay for it
+            from .main_window import MainWindow
+
+            self.main_window = MainWindow(
+                requirement_met_event=self.requirement_met_event,
+                on_refresh=self._handle_refresh_progress
+            )
+            self.main_window.block_requested.connect(self._handle_block_requested)
+            self.main_window.hidden.connect(self._handle_window_hidden)
+
+        return self.main_window
+
+    def _release_main_window(self) -> None:
+        if self.main_window is None or self.main_window.isVisible():
+            return
+
+        # Most sessions never reopen the window, so its widgets and the log index aren't worth keeping
+        window, self.main_window = self.main_window, None
+        window.dispose()
+        window.destroyed.connect(self._handle_window_destroyed)
+        window.deleteLater()
+
     def _start_qt_app(self) -> None:
         if self.qt_app:
             self.qt_app.exec()
-        
-    def _start_logic_thread(self) -> None:
-        self.logic_thread = threading.Thread(
-            target=self._main_loop,
-            daemon=True
-        )
-        self.logic_thread.start()
-
-    def _start_process_watcher(self) -> None:
-        if watch_processes:
-            self.watcher_thread = threading.Thread(
-                target=watch_processes,
-                args=(self.shutdown_event, self.requirement_met_event, self.notifier),
-                daemon=True
-            )
-            self.watcher_thread.start()
-        else:
-            timestamped_print(f"⚠️ Process watching is unsupported on this platform: {sys.platform}")
 
     def _start_tray(self) -> None:
         self.tray = Tray(
@@ -113,178 +119,133 @@ class App:
             on_show_blocked_apps=self._handle_show_blocked_apps_tab,
             on_show_settings=self._handle_show_settings_tab,
             on_show_logs=self._handle_show_logs,
+            on_toggle_profiling=self._handle_toggle_profiling,
+            is_profiling=lambda: profiler.enabled,
             on_quit=self._handle_quit
         )
         self.tray.show()
-        
+
         self.notifier = Notifier(self.tray)
-        
-    def _shutdown_watcher(self) -> None:
-        if not self.watcher_thread or not self.watcher_thread.is_alive():
-            return
-        
-        timestamped_print("👀 Shutting down process watcher...")
-        self.shutdown_event.set()
-        self.watcher_thread.join(timeout=5)
-        
-        if self.watcher_thread.is_alive():
-            logging.warning("Watcher thread didn't exit within timeout")
-            timestamped_print("⚠️ Process watcher didn't shut down cleanly.")
-
-    # BUSINESS LOGIC       
-    def _get_seconds_coded(self) -> int:
-        seconds = self.tracker.fetch_coding_seconds()
-        return self.tracker.update(seconds)
-        
-    def _handle_progress_update(self, seconds: int) -> int:
-        remaining_seconds = max(0, settings.data["minutes_required"] * 60 - seconds)
-        
-        if seconds < settings.data["minutes_required"] * 60:
-            self._set_requirement_unmet()
-            
-            logging.info(f"{format_time(seconds)} recorded, {format_time(remaining_seconds)} more required to unblock apps.")
-            timestamped_print(f"⏳ You need to code {format_time(remaining_seconds)} more to meet today's requirement.")
-        else:
-            self._set_requirement_met()
-            
-            logging.info(f"{format_time(seconds)} coded - requirement met!")
-            timestamped_print(f"🎉 Time requirement met! You've coded for {format_time(seconds)} today.")
-            if self.notifier:
-                self.notifier.notify(
-                    "🎉 Time requirement met!",
-                    f"You've coded for {format_time(seconds)} today. Apps are unblocked!"
-                ) 
-        
-        return self._calculate_sleep_time(seconds)
-    
-    def _block_running_processes(self) -> None:
-        killed_apps, failed_kills = self._kill_blocked_processes()
-        self._report_processing_blocking_results(killed_apps, failed_kills)
-
-    # STATE MANAGEMENT
-    def _set_requirement_met(self) -> None:
-        self.requirement_met_event.set()
-    
-    def _set_requirement_unmet(self) -> None:
-        self.requirement_met_event.clear()
-        
+
+    def _shutdown(self) -> None:
+        super()._shutdown()
+        self.fetch_pool.shutdown(wait=False, cancel_futures=True)
+
+        if self.qt_app:
+            self.qt_app.quit()
+
     # EVENT HANDLERS
     def _handle_show_progress_tab(self) -> None:
-        if self.main_window:
-            QTimer.singleShot(0, lambda: self._show_main_window_thread(0))
-            
+        QTimer.singleShot(0, lambda: self._show_main_window_thread(0))
+
     def _handle_show_blocked_apps_tab(self) -> None:
-        if self.main_window:
-            QTimer.singleShot(0, lambda: self._show_main_window_thread(1))
-            
+        QTimer.singleShot(0, lambda: self._show_main_window_thread(1))
+
     def _handle_show_settings_tab(self) -> None:
-        if self.main_window:
-            QTimer.singleShot(0, lambda: self._show_main_window_thread(2))
-        
+        QTimer.singleShot(0, lambda: self._show_main_window_thread(2))
+
     def _show_main_window_thread(self, tab_index: int | None) -> None:
-        if self.main_window:
-            try:
-                seconds = self._get_seconds_coded()
-                self.main_window.update_progress(seconds)
-            except HackatimeError as e:
-                self._handle_fetch_error(e)
-            
-            self.main_window.show_window(tab_index)
-        else:
-            timestamped_print("⚠️ Main window is not available")
-    
+        if self.window_idle_timer:
+            self.window_idle_timer.stop()
+        main_window = self._get_main_window()
+
+        # Show the last known value straight away, the fresh one arrives via window_progress_signal
+        main_window.update_progress(self.tracker.total_seconds)
+        main_window.show_window(tab_index)
+        self._fetch_in_background(self.signals.window_progress_signal)
+
     def _handle_refresh_progress(self) -> None:
+        self._fetch_in_background(self.signals.refresh_progress_signal)
+
+    def _handle_window_progress(self, seconds: int) -> None:
+        if self.main_window:
+            self.main_window.update_progress(seconds)
+
+    def _handle_refresh_result(self, seconds: int) -> None:
+        self._handle_progress_update(seconds)
+        if self.main_window:
+            self.main_window.update_progress(seconds)
+        timestamped_print(f"🔃 Progress refreshed. You've coded for {format_time(seconds)} today.")
+
+    def _handle_block_requested(self) -> None:
+        # Terminating trees waits on processes to exit, keep that off the GUI thread
         try:
-            seconds = self._get_seconds_coded()
-            self._handle_progress_update(seconds)
-            if self.main_window:
-                self.main_window.update_progress(seconds)
-            timestamped_print(f"🔃 Progress refreshed. You've coded for {format_time(seconds)} today.")
-        except HackatimeError as e:
-            self._handle_fetch_error(e)
-        
+            self.fetch_pool.submit(self._block_running_processes)
+        except RuntimeError:  # Pool already shut down
+            pass
+
+    def _handle_window_hidden(self) -> None:
+        if self.window_idle_timer and (timeout := settings.data["window_idle_timeout"]):
+            self.window_idle_timer.start(timeout * 1000)
+
+    def _handle_window_destroyed(self) -> None:
+        gc.collect()
+        trim_heap()
+        if (rss := get_rss_bytes()) is not None:
+            logging.info(f"Released idle main window, RSS now {rss / 1024 ** 2:.1f} MB")
+
+    def _handle_blocked_app_added(self, name: str) -> None:
+        if self.main_window:
+            self.main_window.blocked_list.addItem(name)
+
     def _handle_show_logs(self) -> None:
-        path = get_app_path()
-        timestamped_print("📂 Opening 'hackablock.log' in File Explorer.")  
+        QTimer.singleShot(0, self._show_logs_tab)
+
+    def _show_logs_tab(self) -> None:
+        main_window = self._get_main_window()
+        self._show_main_window_thread(main_window.tabs.indexOf(main_window.logs_tab))
+
+    def _handle_toggle_profiling(self) -> None:
+        if not profiler.enabled:
+            profiler.start()
+            return
+
+        # Writing the report goes through every sample and a heap snapshot, keep that off the GUI thread
         try:
-            open_folder(path)
-        except Exception as e:
-            logging.error(f"Unexpected error opening folder {path}: {e}")
-            timestamped_print(f"⚠️ Failed to open folder {path}. See 'hackablock.log'.")
+            self.fetch_pool.submit(profiler.stop)
+        except RuntimeError:  # Pool already shut down
+            pass
 
     def _handle_quit(self) -> None:
         timestamped_print("🛑 Quit requested from system tray.")
-        self._shutdown_watcher()
-        
-        if self.qt_app:
-            self.qt_app.quit()
-            
+        self._shutdown()
+
     def _handle_sigint(self, signum: int, frame: FrameType | None):
         timestamped_print("🛑 Ctrl+C caught, shutting down...")
-        self._shutdown_watcher()
-        
-        if self.qt_app:
-            self.qt_app.quit()
+        self._shutdown()
 
-    def _handle_fetch_error(self, error: HackatimeError) -> None:
-        logging.error(f"Fetch failed: {error}")
-        timestamped_print("❌ Could not fetch coding time. See 'hackablock.log'.")
-        if self.notifier:
-            self.notifier.notify("❌ Could not fetch coding time.", f"Retrying in {CHECK_INTERVAL} seconds.")
-
-    # INTERNAL HELPERS           
-    def _main_loop(self) -> None:
-        while not self.shutdown_event.is_set():
-            try:
-                seconds = self._get_seconds_coded()
-                self.signals.update_progress_signal.emit(seconds)
-                sleep_time = self._calculate_sleep_time(seconds)
-            except HackatimeError as e:
-                self.signals.update_error_signal.emit(e)
-                sleep_time = CHECK_INTERVAL
-
-            if self.shutdown_event.wait(timeout=sleep_time):
-                break
-        
-        timestamped_print("🛑 Logic thread shutting down...")
-            
-    def _calculate_sleep_time(self, seconds: int) -> int:
-        if seconds < settings.data["minutes_required"] * 60:
-            remaining_seconds = settings.data["minutes_required"] * 60 - seconds
-            return max(remaining_seconds, CHECK_INTERVAL)
-        else:
-            return time_until_tomorrow()
-    
-    def _kill_blocked_processes(self) -> Tuple[Set[str], List[str]]:
-        killed_apps = set()
-        failed_kills = []
-        
-        for proc in psutil.process_iter(["pid", "name"]):
-            try:
-                name, pid = proc.info["name"], proc.info["pid"]
-                if name and name.lower() in settings.data["blocked_apps"]:         
-                    logging.info(f"Killing running process: {name} (pid={pid})")
-                    proc.kill()
-                    killed_apps.add(name)
-                    
-            except psutil.AccessDenied:
-                logging.warning(f"Access denied killing {name} (pid={pid})")
-                failed_kills.append(f"{name} (access denied)")
-            except psutil.NoSuchProcess:
-                continue
-        
-        return killed_apps, failed_kills
-
-    def _report_processing_blocking_results(self, killed_apps: Set[str], failed_kills: List[str]) -> None:
-        if killed_apps:
-            apps_list = ", ".join(killed_apps)
-            timestamped_print(f"🚫 Blocked running apps: {apps_list}")
-            if self.notifier:
-                self.notifier.notify("🚫 Blocked running apps:", apps_list)
-        if failed_kills:
-            failed_list = ", ".join(failed_kills)
-            timestamped_print(f"⚠️ Could not kill: {failed_list}")
-            if self.notifier:
-                self.notifier.notify("⚠️ Could not kill:", failed_list)
-        if not killed_apps and not failed_kills:
-            timestamped_print("✅ No blocked apps currently running")
\ No newline at end of file
+    # CONTROL COMMANDS
+    def _control_handlers(self) -> Dict[str, CommandHandler]:
+        return {**super()._control_handlers(), "show": self._handle_show_command}
+
+    def _handle_show_command(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        self.signals.show_window_signal.emit()
+        return {}
+
+    # INTERNAL HELPERS
+    def _add_blocked_app(self, name: str) -> bool:
+        added = super()._add_blocked_app(name)
+        if added:
+            self.signals.blocked_app_added_signal.emit(name)
+        return added
+
+    def _publish_progress(self, seconds: int) -> None:
+        self.signals.update_progress_signal.emit(seconds)
+
+    def _publish_error(self, error: HackatimeError) -> None:
+        self.signals.update_error_signal.emit(error)
+
+    def _fetch_in_background(self, result_signal: SignalInstance) -> None:
+        try:
+            self.fetch_pool.submit(self._fetch_and_emit, result_signal)
+        except RuntimeError:  # Pool already shut down
+            pass
+
+    def _fetch_and_emit(self, result_signal: SignalInstance) -> None:
+        try:
+            result_signal.emit(self._get_seconds_coded())
+        except HackatimeError as e:
+            self.signals.update_error_signal.emit(e)
+        except Exception as e:  # The pool would swallow it, leaving the window on its stale value with no sign why
+            logging.error(f"Background fetch failed: {e!r}", exc_info=True)
+            self.signals.update_error_signal.emit(HackatimeError(f"Unexpected error: {e!r}"))
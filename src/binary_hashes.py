@@ -0,0 +1,145 @@
+import atexit
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+import threading
+from typing import Callable, Dict, List, Tuple
+
+from .block_rules import BlockRuleIndex
+from .utils import get_app_path
+
+HASH_CACHE_FILE = get_app_path() / "hackablock-hashes.json"
+MAX_ENTRIES = 4096
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+SAVE_DELAY = 5  # sec, hashes finished within it are written together
+
+FileKey = Tuple[int, int, int, int]  # (device, inode, size, mtime_ns)
+HashCallback = Callable[[str], None]
+
+def file_key(stat: os.stat_result) -> FileKey:
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+def sha256_file(path: str | Path) -> Tuple[FileKey, str]:
+    # Keyed by the opened file, so a binary replaced mid-hash is never cached under the old one's key
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return file_key(stat), hashlib.sha256().hexdigest()
+
+        # hashlib drops the GIL on large buffers, so pool workers hash in parallel with the watchers
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return file_key(stat), hashlib.sha256(mm).hexdigest()
+
+class BinaryHashCache:
+    def __init__(self, path: Path = HASH_CACHE_FILE, max_entries: int = MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._hashes: OrderedDict[FileKey, str] | None = None  # Loaded on first use, most recently used last
+        self._pending: Dict[FileKey, List[HashCallback]] = {}
+        self._pool: ThreadPoolExecutor | None = None
+        self._save_timer: threading.Timer | None = None
+        self._dirty = False
+
+    def lookup(self, path: str, on_ready: HashCallback | None = None, stat: os.stat_result | None = None) -> str | None:
+        # Returns the cached digest, or None after queueing the file for hashing, on_ready then gets the digest
+        key = file_key(stat or os.stat(path))
+        with self._lock:
+            hashes = self._loaded()
+            if (digest := hashes.get(key)) is not None:
+                hashes.move_to_end(key)
+                return digest
+
+            if (callbacks := self._pending.get(key)) is not None:
+                if on_ready:
+                    callbacks.append(on_ready)
+                return None
+            self._pending[key] = [on_ready] if on_ready else []
+
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+
+        self._pool.submit(self._hash, path, key)
+        return None
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty or self._hashes is None:
+                return
+            entries = [[*key, digest] for key, digest in self._hashes.items()]
+            self._dirty = False
+            self._save_timer = None
+
+        tmp_path = self.path.with_suffix(".json.tmp")
+        try:
+            tmp_path.write_text(json.dumps({"version": 1, "entries": entries}))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Failed to save binary hash cache: {e}")
+
+    # INTERNAL HELPERS
+    def _loaded(self) -> OrderedDict[FileKey, str]:
+        if self._hashes is None:
+            self._hashes = OrderedDict()
+            try:
+                data = json.loads(self.path.read_text())
+                for *key, digest in data["entries"][-self.max_entries:]:
+                    self._hashes[tuple(key)] = digest
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logging.warning(f"Failed to load binary hash cache: {e}. Starting empty.")
+            atexit.register(self.flush)
+        return self._hashes
+
+    def _hash(self, path: str, key: FileKey) -> None:
+        try:
+            actual_key, digest = sha256_file(path)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Could not hash {path}: {e}")
+            with self._lock:
+                self._pending.pop(key, None)
+            return
+
+        with self._lock:
+            callbacks = self._pending.pop(key, [])
+            hashes = self._loaded()
+            hashes[actual_key] = digest
+            hashes.move_to_end(actual_key)
+            while len(hashes) > self.max_entries:
+                hashes.popitem(last=False)
+
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+        for callback in callbacks:
+            try:
+                callback(digest)
+            except Exception as e:
+                logging.error(f"Error handling hash of {path}: {e}")
+
+def matches_hash(rules: BlockRuleIndex, path: str | None, on_match: Callable[[], None] | None = None) -> bool:
+    # True on a cache hit, on a miss on_match runs from a hash worker if the binary turns out to be blocked
+    if not path or not rules.needs_hash:
+        return False
+
+    def on_ready(digest: str) -> None:
+        if on_match and digest in rules.hashes:
+            on_match()
+
+    try:
+        digest = binary_hashes.lookup(path, on_ready)
+    except OSError:
+        return False
+    return digest in rules.hashes
+
+binary_hashes = BinaryHashCache()
@@ -0,0 +1,125 @@
+import fnmatch
+import logging
+import re
+from typing import Iterable, List, Pattern, Sequence, Tuple
+
+REGEX_PREFIX = "re:"
+PATH_PREFIX = "path:"
+CMDLINE_PREFIX = "cmdline:"
+SHA256_PREFIX = "sha256:"
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+GLOB_CHARS = ("*", "?", "[")
+GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+def rule_error(rule: str) -> str | None:
+    # Why a rule would be ignored, or None if it's usable. Checked before a rule is added from the UI or CLI
+    rule = rule.strip()
+    if rule.startswith(SHA256_PREFIX):
+        return None if SHA256_PATTERN.fullmatch(rule[len(SHA256_PREFIX):].strip().lower()) else "expected 64 hex digits"
+
+    for prefix in (PATH_PREFIX, CMDLINE_PREFIX):
+        if rule.startswith(prefix):
+            rule = rule[len(prefix):]
+            break
+    if rule.startswith(REGEX_PREFIX):
+        pattern = rule[len(REGEX_PREFIX):]
+        # Each rule ends up inside a larger expression, where flags for the whole pattern aren't allowed
+        if GLOBAL_FLAGS.match(pattern):
+            return "inline flags must be scoped, like (?s:...), matching is already case-insensitive"
+        try:
+            re.compile(_regex_rule(pattern), re.IGNORECASE)
+        except re.error as e:
+            return str(e)
+    return None
+
+def _regex_rule(pattern: str) -> str:
+    return f"(?:{pattern})\\Z"
+
+def _compile_patterns(patterns: List[str]) -> Tuple[Pattern[str], ...]:
+    # Rules are joined into one alternation, except those with groups of their own. Joined, their group names
+    # could clash with another rule's, and numbered backreferences would point at some other rule's group
+    compiled = [re.compile(p, re.IGNORECASE) for p in patterns]
+    plain = [p.pattern for p in compiled if not p.groups]
+    if len(plain) < 2:
+        return tuple(compiled)
+
+    try:
+        combined = re.compile("|".join(f"(?:{p})" for p in plain), re.IGNORECASE)
+    except re.error as e:
+        logging.warning(f"Block rules can't be combined, matching them one by one: {e}")
+        return tuple(compiled)
+    return (combined, *(p for p in compiled if p.groups))
+
+def _matches(patterns: Tuple[Pattern[str], ...], value: str) -> bool:
+    return any(p.match(value) for p in patterns)
+
+class BlockRuleIndex:
+    def __init__(self, rules: Iterable[str] = ()) -> None:
+        names = set()
+        hashes = set()
+        name_patterns = []
+        path_patterns = []
+        cmdline_patterns = []
+
+        for rule in rules:
+            rule = rule.strip()
+            if not rule:
+                continue
+
+            if (error := rule_error(rule)) is not None:
+                logging.warning(f"Ignoring invalid block rule {rule!r}: {error}")
+                continue
+
+            if rule.startswith(SHA256_PREFIX):
+                hashes.add(rule[len(SHA256_PREFIX):].strip().lower())
+                continue
+            elif rule.startswith(PATH_PREFIX):
+                target, rule = path_patterns, rule[len(PATH_PREFIX):]
+            elif rule.startswith(CMDLINE_PREFIX):
+                target, rule = cmdline_patterns, rule[len(CMDLINE_PREFIX):]
+            elif rule.startswith(REGEX_PREFIX) or any(c in rule for c in GLOB_CHARS):
+                target = name_patterns
+            else:
+                names.add(rule.lower())
+                continue
+
+            target.append(_regex_rule(rule[len(REGEX_PREFIX):]) if rule.startswith(REGEX_PREFIX) else fnmatch.translate(rule))
+
+        self.names: frozenset[str] = frozenset(names)
+        self.hashes: frozenset[str] = frozenset(hashes)  # SHA-256 of blocked executables, checked separately since hashing is deferred
+        self._name_patterns = _compile_patterns(name_patterns)
+        self._path_patterns = _compile_patterns(path_patterns)
+        self._cmdline_patterns = _compile_patterns(cmdline_patterns)
+
+    @property
+    def needs_exe(self) -> bool:
+        return bool(self._path_patterns)
+
+    @property
+    def needs_cmdline(self) -> bool:
+        return bool(self._cmdline_patterns)
+
+    @property
+    def needs_hash(self) -> bool:
+        return bool(self.hashes)
+
+    def matches(self, name: str | None, exe: str | None = None, cmdline: Sequence[str] | str | None = None) -> bool:
+        if name:
+            if name.lower() in self.names:
+                return True
+            if self._name_patterns and _matches(self._name_patterns, name):
+                return True
+
+        if exe and self._path_patterns and _matches(self._path_patterns, exe):
+            return True
+
+        if cmdline and self._cmdline_patterns:
+            if not isinstance(cmdline, str):
+                cmdline = " ".join(cmdline)
+            if _matches(self._cmdline_patterns, cmdline):
+                return True
+
+        return False
+
+    def __bool__(self) -> bool:
+        return bool(self.names or self.hashes or self._name_patterns or self._path_patterns or self._cmdline_patterns)
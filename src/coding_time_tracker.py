@@ -1,43 +1,119 @@
+from concurrent.futures import Future
 import logging
+import threading
+import time
+from typing import Tuple
 
 import requests
 
+from .hackatime_client import HackatimeClient
 from .hackatime_error import HackatimeError
+from .metrics import FETCH_CACHE, FETCH_DURATION, FETCH_ERRORS
 from .settings import settings
-
-HACKATIME_API_URL = "https://hackatime.hackclub.com/api/hackatime/v1"
+from .trace_recorder import trace_recorder
 
 class CodingTimeTracker:
-    def __init__(self) -> None:
+    def __init__(self, client: HackatimeClient | None = None, profile: str | None = None) -> None:
+        self.profile = profile
         self.total_seconds: int = 0
         self.last_seconds: int = 0
+        self.client: HackatimeClient = client or HackatimeClient()
+        
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self.coalesced_calls: int = 0
+        self._fetch_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._cached: Tuple[str, float, int] | None = None  # (api key, fetched at, seconds)
+        self._in_flight: Tuple[str, Future] | None = None  # (api key, pending result)
     
-    @staticmethod
-    def fetch_coding_seconds() -> int:
-        try:
-            res = requests.get(
-                f"{HACKATIME_API_URL}/users/current/statusbar/today",
-                headers={"Authorization": f"Bearer {settings.data["hackatime_api_key"]}"},
-                timeout=10
-            )
-            res.raise_for_status()
+    def fetch_coding_seconds(self, api_key: str | None = None) -> int:
+        api_key = settings.data["hackatime_api_key"] if api_key is None else api_key
+        
+        with self._fetch_lock:
+            if self._cached and self._cached[0] == api_key and time.monotonic() - self._cached[1] < settings.data["fetch_cache_ttl"]:
+                self.cache_hits += 1
+                FETCH_CACHE.inc(result="hit")
+                return self._cached[2]
             
-            data = res.json()
+            # Share an in-flight request for the same key instead of firing a duplicate
+            if self._in_flight and self._in_flight[0] == api_key:
+                self.coalesced_calls += 1
+                FETCH_CACHE.inc(result="coalesced")
+                future = self._in_flight[1]
+                is_leader = False
+            else:
+                self.cache_misses += 1
+                FETCH_CACHE.inc(result="miss")
+                future = Future()
+                self._in_flight = (api_key, future)
+                is_leader = True
+        
+        if not is_leader:
+            return future.result()
+        
+        try:
+            seconds = self._fetch(api_key)
+        except BaseException as e:  # Anything the leader doesn't deliver would leave the waiters blocked for good
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(seconds)
+            with self._fetch_lock:
+                self._cached = (api_key, time.monotonic(), seconds)
+            return seconds
+        finally:
+            with self._fetch_lock:
+                if self._in_flight and self._in_flight[1] is future:
+                    self._in_flight = None
+    
+    def _fetch(self, api_key: str) -> int:
+        started_at = time.perf_counter()
+        try:
+            seconds = self._request_seconds(api_key)
+        except HackatimeError as e:
+            FETCH_DURATION.observe(time.perf_counter() - started_at, outcome="error")
+            FETCH_ERRORS.inc(error=type(e.__cause__ or e).__name__)
+            if trace_recorder.enabled:
+                trace_recorder.fetch(self.profile, error=str(e))
+            raise
+        
+        FETCH_DURATION.observe(time.perf_counter() - started_at, outcome="ok")
+        if trace_recorder.enabled:
+            trace_recorder.fetch(self.profile, seconds=seconds)
+        return seconds
+    
+    def _request_seconds(self, api_key: str) -> int:
+        try:
+            data = self.client.get_json("/users/current/statusbar/today", api_key)
             total_seconds = int(data["data"]["grand_total"]["total_seconds"])
-            logging.info(f"Fetched coding time: {total_seconds} seconds")
+            logging.info(
+                f"Fetched coding time{f' for {self.profile}' if self.profile else ''}: {total_seconds} seconds ({self.client.last_latency_ms:.0f}ms, "
+                f"cache hits={self.cache_hits} misses={self.cache_misses} coalesced={self.coalesced_calls})"
+            )
             return total_seconds
         
         except requests.RequestException as e:
             raise HackatimeError(f"Network/API error: {e}") from e
-        except KeyError as e:
+        except (KeyError, TypeError) as e:  # TypeError when a level is a list or null instead of an object
             raise HackatimeError(f"Unexpected response format: {e}") from e
         except ValueError as e:
             raise HackatimeError(f"Bad data in API response: {e}") from e
     
+    def retry_delay(self) -> float:
+        return self.client.retry_delay()
+    
+    def restore(self, seconds: int) -> int:
+        with self._update_lock:
+            self.total_seconds = seconds
+            self.last_seconds = seconds
+            return self.total_seconds
+    
     def update(self, seconds: int) -> int:
-        if seconds >= self.last_seconds:
-            self.total_seconds += seconds - self.last_seconds
-        else: # Midnight reset
-            self.total_seconds += seconds
-        self.last_seconds = seconds
-        return self.total_seconds
\ No newline at end of file
+        with self._update_lock:
+            if seconds >= self.last_seconds:
+                self.total_seconds += seconds - self.last_seconds
+            else: # Midnight reset
+                self.total_seconds += seconds
+            self.last_seconds = seconds
+            return self.total_seconds
\ No newline at end of file
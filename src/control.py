@@ -0,0 +1,136 @@
+import getpass
+import json
+import logging
+from multiprocessing.connection import Client, Connection, Listener
+import os
+from pathlib import Path
+import sys
+import threading
+from typing import IO, Any, Callable, Dict
+
+from .utils import get_app_path, timestamped_print
+
+LOCK_FILE = get_app_path() / "hackablock.lock"
+if sys.platform == "win32":
+    FAMILY = "AF_PIPE"
+    ADDRESS = rf"\\.\pipe\hackablock-{getpass.getuser()}"
+else:
+    FAMILY = "AF_UNIX"
+    ADDRESS = str(get_app_path() / "hackablock.sock")
+
+REQUEST_TIMEOUT = 1  # sec a client gets to send its command once connected
+REPLY_TIMEOUT = 5  # sec
+MAX_REQUEST_BYTES = 64 * 1024
+
+CommandHandler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+class CommandError(Exception):
+    pass
+
+class InstanceLock:
+    def __init__(self, path: Path = LOCK_FILE) -> None:
+        self.path = path
+        self._file: IO[bytes] | None = None
+
+    def acquire(self) -> bool:
+        # Held until the process exits, the OS drops it even after a crash so it can never go stale
+        file = open(self.path, "a+b")
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+
+        self._file = file
+        return True
+
+class ControlServer:
+    def __init__(self, handlers: Dict[str, CommandHandler]) -> None:
+        self.handlers = handlers
+
+        self._listener: Listener | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+    def start(self) -> None:
+        if FAMILY == "AF_UNIX":
+            # Only the lock holder starts a server, so a socket file left here is from a dead instance
+            Path(ADDRESS).unlink(missing_ok=True)
+        self._listener = Listener(ADDRESS, FAMILY)
+        if FAMILY == "AF_UNIX":
+            os.chmod(ADDRESS, 0o600)
+
+        self._thread = threading.Thread(target=self._serve, name="control", daemon=True)
+        self._thread.start()
+
+        logging.info(f"Control socket listening on {ADDRESS}")
+        timestamped_print(f"🎛️ Control socket listening on {ADDRESS}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._listener is None:
+            return
+
+        # accept() isn't interrupted by closing the listener from another thread, so wake it with a connection
+        try:
+            Client(ADDRESS, FAMILY).close()
+        except OSError:
+            pass
+        if self._thread:
+            self._thread.join(timeout=1)
+
+        self._listener.close()
+        self._listener = None
+
+    # INTERNAL HELPERS
+    def _serve(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError as e:
+                if not self._stop_event.is_set():
+                    logging.warning(f"Control socket accept failed: {e}")
+                continue
+
+            # Handlers only read cached state or hand work off, so one connection at a time is enough
+            with conn:
+                if not self._stop_event.is_set():
+                    self._handle(conn)
+
+    def _handle(self, conn: Connection) -> None:
+        try:
+            if not conn.poll(REQUEST_TIMEOUT):
+                return
+            request = json.loads(conn.recv_bytes(MAX_REQUEST_BYTES))
+            command, args = request["command"], request.get("args") or {}
+        except (OSError, EOFError, ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Dropped malformed control request: {e}")
+            return
+
+        try:
+            if (handler := self.handlers.get(command)) is None:
+                raise CommandError(f"Unknown command: {command}")
+            reply = {"ok": True, **handler(args)}
+        except CommandError as e:
+            reply = {"ok": False, "error": str(e)}
+        except Exception as e:
+            logging.error(f"Control command {command} failed: {e}")
+            reply = {"ok": False, "error": "Command failed. See 'hackablock.log'."}
+
+        try:
+            conn.send_bytes(json.dumps(reply).encode())
+        except OSError:
+            pass
+
+def send_command(command: str, **args: Any) -> Dict[str, Any]:
+    with Client(ADDRESS, FAMILY) as conn:
+        conn.send_bytes(json.dumps({"command": command, "args": args}).encode())
+        if not conn.poll(REPLY_TIMEOUT):
+            raise TimeoutError(f"No reply to {command} within {REPLY_TIMEOUT}s")
+        return json.loads(conn.recv_bytes())
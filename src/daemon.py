@@ -0,0 +1,553 @@
+from functools import partial
+import logging
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from types import FrameType
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Set, Tuple
+
+from .binary_hashes import matches_hash
+from .block_rules import rule_error
+from .coding_time_tracker import CodingTimeTracker
+from .control import CommandError, CommandHandler, ControlServer
+from .hackatime_error import HackatimeError
+from .heartbeat_server import HeartbeatServer
+from .history_store import HistoryStore
+from .metrics import ENFORCEMENT_CPU, SCAN_DURATION, SCAN_PROCESSES, MetricsExporter
+from .profiler import profiler
+from .profiles import ProfileState, profiles
+from .settings import settings
+from .trace_recorder import trace_recorder
+from .utils import format_time, get_rss_bytes, timestamped_print, time_until_tomorrow
+from .watchers import watch_processes
+from .watchers.enforcer import block_process, freezer, terminate_trees
+from .watchers.procfs import ProcScanner, is_blocked
+
+if TYPE_CHECKING:
+    from .notifier import Notifier
+
+CHECK_INTERVAL = 60  # sec
+
+class Daemon:
+    def __init__(self) -> None:
+        self.started_at: float = time.perf_counter()
+        self.requirement_met_event: threading.Event = threading.Event()
+        self.shutdown_event: threading.Event = threading.Event()
+
+        self.notifier: "Notifier | None" = None
+        self.watcher_thread: threading.Thread | None = None
+        self.logic_thread: threading.Thread | None = None
+
+        self.retry_delay: float = CHECK_INTERVAL
+        self.heartbeat_server: HeartbeatServer | None = None
+        self._progress_lock = threading.Lock()  # Keeps the primary tracker's totals in order across the poll and heartbeat threads
+        self.history: HistoryStore | None = None
+        self.metrics_exporter: MetricsExporter | None = None
+        self.control_server: ControlServer | None = None
+        self.proc_scanner: ProcScanner | None = ProcScanner() if ProcScanner.is_supported() else None
+
+    @property
+    def tracker(self) -> CodingTimeTracker:
+        return profiles.primary.tracker
+
+    # ENTRY POINT
+    def run(self) -> None:
+        try:
+            logging.info("Booting hackablock in headless mode...")
+            timestamped_print("🔃 Loaded hackablock (headless). Session starting...")
+
+            signal.signal(signal.SIGINT, self._handle_signal)
+            signal.signal(signal.SIGTERM, self._handle_signal)
+
+            self._start_services()
+
+            # Wake up periodically so signal handlers get a chance to run
+            while not self.shutdown_event.wait(timeout=1):
+                pass
+
+            self._shutdown()
+
+        finally:
+            timestamped_print("👋 Exiting hackablock...")
+            logging.info("Terminating hackablock...\n")
+
+    # APP LIFECYCLE
+    def _start_services(self) -> None:
+        freezer.recover()
+        self._restore_today_progress()
+        self._start_control_server()
+        self._start_metrics_exporter()
+        self._start_heartbeat_server()
+        self._start_logic_thread()
+        self._start_process_watcher()
+        self._block_running_processes()
+
+        elapsed_ms = (time.perf_counter() - self.started_at) * 1000
+        logging.info(f"First enforcement sweep finished {elapsed_ms:.1f}ms after startup")
+
+    def _start_logic_thread(self) -> None:
+        self.logic_thread = threading.Thread(
+            target=self._main_loop,
+            name="logic",
+            daemon=True
+        )
+        self.logic_thread.start()
+
+    def _start_process_watcher(self) -> None:
+        if watch_processes:
+            self.watcher_thread = threading.Thread(
+                target=watch_processes,
+                args=(self.shutdown_event, self.requirement_met_event, self.notifier),
+                name="watcher",
+                daemon=True
+            )
+            self.watcher_thread.start()
+        else:
+            timestamped_print(f"⚠️ Process watching is unsupported on this platform: {sys.platform}")
+
+    def _restore_today_progress(self) -> int | None:
+        try:
+            self.history = HistoryStore()
+            seconds = self.history.today_seconds()
+        except sqlite3.Error as e:
+            logging.error(f"Failed to open history store: {e}")
+            return None
+
+        if seconds is None:
+            return None
+        if trace_recorder.enabled:
+            trace_recorder.restore(seconds)
+        return self._apply_restored_progress(seconds)
+
+    def _apply_restored_progress(self, seconds: int) -> int:
+        # Decide blocking from the last known state instead of waiting for the network
+        seconds = self.tracker.restore(seconds)
+        if seconds >= profiles.primary.profile.required_seconds:
+            self._set_requirement_met()
+
+        logging.info(f"Restored {format_time(seconds)} of coding time recorded earlier today.")
+        timestamped_print(f"💾 Restored today's progress: {format_time(seconds)} coded.")
+        return seconds
+
+    def _start_heartbeat_server(self) -> None:
+        if not settings.data["heartbeat_server_enabled"]:
+            return
+
+        server = HeartbeatServer(self.tracker.client, on_progress=self._handle_local_heartbeat)
+        try:
+            server.start(settings.data["heartbeat_server_port"])
+        except OSError as e:
+            logging.error(f"Failed to start heartbeat receiver: {e}")
+            timestamped_print("❌ Failed to start heartbeat receiver. See 'hackablock.log'.")
+            return
+
+        self.heartbeat_server = server
+
+    def _start_control_server(self) -> None:
+        server = ControlServer(self._control_handlers())
+        try:
+            server.start()
+        except OSError as e:
+            logging.error(f"Failed to start control socket: {e}")
+            timestamped_print("❌ Failed to start control socket. See 'hackablock.log'.")
+            return
+
+        self.control_server = server
+
+    def _start_metrics_exporter(self) -> None:
+        port, interval = settings.data["metrics_port"], settings.data["metrics_snapshot_interval"]
+        if not port and not interval:
+            return
+
+        self.metrics_exporter = MetricsExporter()
+        self.metrics_exporter.start(port, interval)
+
+    def _shutdown(self) -> None:
+        self._shutdown_control_server()
+        self._shutdown_watcher()
+        self._resume_suspended_processes()  # Don't leave apps stopped once nothing will resume them
+        self._shutdown_heartbeat_server()
+        self._close_history()
+        self._shutdown_metrics_exporter()
+        profiles.close()
+
+    def _shutdown_control_server(self) -> None:
+        if self.control_server:
+            self.control_server.stop()
+            self.control_server = None
+
+    def _shutdown_metrics_exporter(self) -> None:
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
+
+    def _close_history(self) -> None:
+        if self.history:
+            self.history.close()
+            self.history = None
+
+    def _shutdown_heartbeat_server(self) -> None:
+        if self.heartbeat_server:
+            timestamped_print("💓 Shutting down heartbeat receiver...")
+            self.heartbeat_server.stop()
+            self.heartbeat_server = None
+
+    def _shutdown_watcher(self) -> None:
+        self.shutdown_event.set()
+        if not self.watcher_thread or not self.watcher_thread.is_alive():
+            return
+
+        timestamped_print("👀 Shutting down process watcher...")
+        self.watcher_thread.join(timeout=5)
+
+        if self.watcher_thread.is_alive():
+            logging.warning("Watcher thread didn't exit within timeout")
+            timestamped_print("⚠️ Process watcher didn't shut down cleanly.")
+
+    # BUSINESS LOGIC
+    def _get_seconds_coded(self, state: ProfileState | None = None) -> int:
+        state = state or profiles.primary
+        seconds = state.tracker.fetch_coding_seconds(state.profile.api_key)
+        if state is not profiles.primary:
+            seconds = state.tracker.update(seconds)
+            state.scheduler.record(seconds)
+            return seconds
+
+        with self._progress_lock:
+            if self.heartbeat_server:
+                seconds = self.heartbeat_server.reconcile(seconds)
+            if self.history:
+                self.history.record(seconds)
+
+            seconds = state.tracker.update(seconds)
+            state.scheduler.record(seconds)
+            return seconds
+
+    def _handle_local_heartbeat(self, seconds: int) -> None:
+        # Runs on the heartbeat receiver's threads, only the transition to unblocked needs reporting
+        with self._progress_lock:
+            # Handler threads and polls can get here out of order. The update() would take an older
+            # total for a midnight reset, the receiver's current one is never behind what the tracker has
+            if self.heartbeat_server:
+                seconds = self.heartbeat_server.effective_seconds
+            if trace_recorder.enabled:
+                trace_recorder.heartbeat(seconds)
+            state = profiles.primary
+            seconds = state.tracker.update(seconds)
+            state.scheduler.record(seconds)
+            if not state.met:
+                self._publish_progress(seconds)
+
+    def _handle_progress_update(self, seconds: int, state: ProfileState | None = None) -> float:
+        state = state or profiles.primary
+        required_seconds = state.profile.required_seconds
+        remaining_seconds = max(0, required_seconds - seconds)
+        # Only name the profile once there's more than one to tell apart
+        label = f" for {state.profile.name}" if len(profiles.states()) > 1 else ""
+
+        if seconds < required_seconds:
+            self._set_requirement_unmet(state)
+
+            logging.info(f"{format_time(seconds)} recorded{label}, {format_time(remaining_seconds)} more required to unblock apps.")
+            timestamped_print(f"⏳ {format_time(remaining_seconds)} more coding needed{label} to meet today's requirement." if label else f"⏳ You need to code {format_time(remaining_seconds)} more to meet today's requirement.")
+        else:
+            self._set_requirement_met(state)
+
+            logging.info(f"{format_time(seconds)} coded{label} - requirement met!")
+            timestamped_print(f"🎉 Time requirement met{label}! {format_time(seconds)} coded today." if label else f"🎉 Time requirement met! You've coded for {format_time(seconds)} today.")
+            if self.notifier:
+                self.notifier.notify(
+                    f"🎉 Time requirement met{label}!",
+                    f"{format_time(seconds)} coded today. Apps are unblocked{label}!" if label else f"You've coded for {format_time(seconds)} today. Apps are unblocked!",
+                    category="progress"
+                )
+
+        return self._calculate_sleep_time(seconds, state)
+
+    def _block_running_processes(self) -> None:
+        killed_apps, failed_kills = self._kill_blocked_processes()
+        self._report_processing_blocking_results(killed_apps, failed_kills)
+
+    def _add_blocked_app(self, name: str) -> bool:
+        def add(data: Mapping[str, Any]) -> Dict[str, Any] | None:
+            if name.lower() in [a.lower() for a in data["blocked_apps"]]:
+                return None
+            return {"blocked_apps": [*data["blocked_apps"], name]}
+
+        if settings.update(add) is None:
+            return False
+        settings.save()
+        logging.info(f"Added {name} to blocked apps")
+        return True
+
+    # STATE MANAGEMENT
+    def _set_requirement_met(self, state: ProfileState | None = None) -> None:
+        (state or profiles.primary).met = True
+        # Watchers only idle once nobody is blocked, until then each process is checked against its own profile
+        if profiles.all_met():
+            self.requirement_met_event.set()
+            self._resume_suspended_processes()
+        else:
+            self._resume_suspended_processes(lambda pid: profiles.enforced_profile(pid) is None)
+
+    def _set_requirement_unmet(self, state: ProfileState | None = None) -> None:
+        (state or profiles.primary).met = False
+        self.requirement_met_event.clear()
+
+    # EVENT HANDLERS
+    def _handle_signal(self, signum: int, frame: FrameType | None) -> None:
+        timestamped_print(f"🛑 {signal.Signals(signum).name} caught, shutting down...")
+        self.shutdown_event.set()
+
+    def _handle_fetch_error(self, error: HackatimeError) -> None:
+        logging.error(f"Fetch failed: {error}")
+        timestamped_print("❌ Could not fetch coding time. See 'hackablock.log'.")
+        if self.notifier:
+            self.notifier.notify("❌ Could not fetch coding time.", f"Retrying in {format_time(int(self.retry_delay))}.", category="fetch_error")
+
+    def _handle_refresh_progress(self) -> None:
+        threading.Thread(target=self._fetch_and_publish, daemon=True).start()
+
+    def _handle_block_requested(self) -> None:
+        threading.Thread(target=self._block_running_processes, daemon=True).start()
+
+    # CONTROL COMMANDS
+    def _control_handlers(self) -> Dict[str, CommandHandler]:
+        # Answered on the control thread, so each one only reads cached state or hands the work off
+        return {
+            "status": self._handle_status_command,
+            "refresh": self._handle_refresh_command,
+            "block-now": self._handle_block_now_command,
+            "add-app": self._handle_add_app_command,
+            "profile": self._handle_profile_command,
+        }
+
+    def _handle_status_command(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        primary = profiles.primary
+        return {
+            "seconds": primary.tracker.total_seconds,
+            "required_seconds": primary.profile.required_seconds,
+            "requirement_met": self.requirement_met_event.is_set(),
+            "blocked_apps": list(primary.profile.blocked_apps),
+            "profiles": [
+                {
+                    "name": state.profile.name,
+                    "seconds": state.tracker.total_seconds,
+                    "required_seconds": state.profile.required_seconds,
+                    "requirement_met": state.met,
+                    "users": list(state.profile.users),
+                }
+                for state in profiles.states()
+            ],
+            "enforcement_mode": settings.data["enforcement_mode"],
+            "suspended_apps": freezer.frozen_names(),
+            "uptime_seconds": int(time.perf_counter() - self.started_at),
+            "rss_bytes": get_rss_bytes(),
+        }
+
+    def _handle_refresh_command(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        self._handle_refresh_progress()
+        return {}
+
+    def _handle_block_now_command(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        if self.requirement_met_event.is_set():
+            raise CommandError("Today's requirement is met, nothing is blocked.")
+        self._handle_block_requested()
+        return {}
+
+    def _handle_add_app_command(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        name = args.get("name")
+        if not isinstance(name, str) or not (name := name.strip()):
+            raise CommandError("add-app needs an app name.")
+        if (error := rule_error(name)) is not None:
+            raise CommandError(f"Invalid rule {name!r}: {error}")
+
+        added = self._add_blocked_app(name)
+        if added and not self.requirement_met_event.is_set():
+            self._handle_block_requested()
+        return {"added": added}
+
+    def _handle_profile_command(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        match args.get("action"):
+            case "start":
+                seconds = args.get("seconds") or 0
+                if not isinstance(seconds, (int, float)) or seconds < 0:
+                    raise CommandError("Profiling time must be a positive number of seconds.")
+                if not profiler.start(seconds):
+                    raise CommandError("Already profiling.")
+                return {}
+            case "stop":
+                if not profiler.enabled:
+                    raise CommandError("Not profiling.")
+                if (report := profiler.stop()) is None:
+                    raise CommandError("The profile couldn't be written, see the log.")
+                return {"report": str(report)}
+            case _:
+                raise CommandError("profile needs start or stop.")
+
+    # INTERNAL HELPERS
+    def _fetch_and_publish(self) -> None:
+        states = profiles.states()
+        for state, delay in zip(states, profiles.map(self._poll_profile, states)):
+            state.next_poll_at = time.monotonic() + delay
+
+    def _poll_profile(self, state: ProfileState) -> float:
+        # Returns how long until the profile is due again. Runs on the profile pool when there are several
+        try:
+            seconds = self._get_seconds_coded(state)
+        except HackatimeError as e:
+            self.retry_delay = state.tracker.retry_delay()
+            if state is profiles.primary:
+                self._publish_error(e)
+            else:
+                logging.error(f"Fetch failed for {state.profile.name}: {e}")
+            return self.retry_delay
+
+        if state is profiles.primary:
+            self._publish_progress(seconds)
+        else:
+            self._handle_progress_update(seconds, state)
+        return self._calculate_sleep_time(seconds, state)
+
+    def _publish_progress(self, seconds: int) -> None:
+        self._handle_progress_update(seconds)
+
+    def _publish_error(self, error: HackatimeError) -> None:
+        self._handle_fetch_error(error)
+
+    def _main_loop(self) -> None:
+        while not self.shutdown_event.is_set():
+            # Each profile keeps its own schedule, only the ones due are fetched
+            now = time.monotonic()
+            due = [state for state in profiles.states() if state.next_poll_at <= now]
+            for state, delay in zip(due, profiles.map(self._poll_profile, due)):
+                state.next_poll_at = time.monotonic() + delay
+            self._retry_failed_resumes()
+
+            # Woken at least every CHECK_INTERVAL so profiles added in the meantime get polled
+            next_poll_at = min(state.next_poll_at for state in profiles.states())
+            if self.shutdown_event.wait(timeout=min(CHECK_INTERVAL, max(0.0, next_poll_at - time.monotonic()))):
+                break
+
+        timestamped_print("🛑 Logic thread shutting down...")
+
+    def _calculate_sleep_time(self, seconds: int, state: ProfileState | None = None) -> float:
+        state = state or profiles.primary
+        if seconds < state.profile.required_seconds:
+            return state.scheduler.next_delay(seconds, state.profile.required_seconds, settings.data["max_unblock_latency"])
+        else:
+            return time_until_tomorrow()
+
+    def _kill_blocked_processes(self) -> Tuple[Set[str], List[str]]:
+        started_at, cpu_started_at = time.perf_counter(), time.thread_time()
+        backend = "procfs" if self.proc_scanner else "psutil"
+        if self.proc_scanner:
+            targets, examined = self._find_blocked_processes_procfs(self.proc_scanner)
+        else:
+            targets, examined = self._find_blocked_processes_psutil()
+
+        SCAN_DURATION.observe(time.perf_counter() - started_at, backend=backend)
+        SCAN_PROCESSES.inc(examined, backend=backend)
+
+        if not targets:
+            killed_apps, failed_kills = set(), []
+        elif settings.data["enforcement_mode"] == "suspend":
+            killed_apps, failed_kills = self._suspend_processes(targets)
+        else:
+            killed_apps, failed_kills = terminate_trees(targets)
+
+        ENFORCEMENT_CPU.inc(time.thread_time() - cpu_started_at, source="sweep")
+        return killed_apps, failed_kills
+
+    def _find_blocked_processes_psutil(self) -> Tuple[List[Tuple[int, str]], int]:
+        import psutil  # Only needed where /proc isn't available, keeps it off the startup path elsewhere
+
+        targets = []
+        examined = 0
+
+        attrs = ["pid", "name"]
+        if any(p.block_rules.needs_exe or p.block_rules.needs_hash for p in settings.profiles):
+            attrs.append("exe")
+        if any(p.block_rules.needs_cmdline for p in settings.profiles):
+            attrs.append("cmdline")
+
+        for proc in psutil.process_iter(attrs):
+            examined += 1
+            name, pid = proc.info["name"], proc.info["pid"]
+            if freezer.is_frozen(pid):
+                continue
+            profile = profiles.enforced_profile(pid)
+            rules = profile.block_rules if profile else None
+            blocked = rules is not None and (rules.matches(name, proc.info.get("exe"), proc.info.get("cmdline")) or matches_hash(
+                rules, proc.info.get("exe"), partial(block_process, pid, name, self.notifier, watcher="sweep")
+            ))
+            if trace_recorder.enabled:
+                trace_recorder.process("sweep", pid, name, profile, blocked, proc.info.get("exe"), proc.info.get("cmdline"))
+            if blocked:
+                targets.append((pid, name))
+
+        return targets, examined
+
+    def _find_blocked_processes_procfs(self, scanner: ProcScanner) -> Tuple[List[Tuple[int, str]], int]:
+        targets = []
+        examined = 0
+
+        scanner.scan()
+        for pid, name in scanner.processes():
+            examined += 1
+            if freezer.is_frozen(pid):
+                continue
+            profile = profiles.enforced_profile(pid)
+            blocked = profile is not None and is_blocked(profile.block_rules, pid, name, partial(block_process, pid, name, self.notifier, watcher="sweep"))
+            if trace_recorder.enabled:
+                trace_recorder.process("sweep", pid, name, profile, blocked)
+            if blocked:
+                targets.append((pid, name))
+
+        return targets, examined
+
+    def _suspend_processes(self, targets: List[Tuple[int, str]]) -> Tuple[Set[str], List[str]]:
+        suspended_apps = set()
+        failed_suspends = []
+
+        for pid, name in targets:
+            try:
+                logging.info(f"Suspending running process: {name} (pid={pid})")
+                freezer.freeze(pid, name)
+                suspended_apps.add(name)
+            except PermissionError:
+                logging.warning(f"Access denied suspending {name} (pid={pid})")
+                failed_suspends.append(f"{name} (access denied)")
+            except ProcessLookupError:
+                continue
+
+        return suspended_apps, failed_suspends
+
+    def _resume_suspended_processes(self, should_resume: Callable[[int], bool] | None = None) -> None:
+        resumed_apps = freezer.resume(should_resume)
+        if resumed_apps:
+            apps_list = ", ".join(resumed_apps)
+            timestamped_print(f"▶️ Resumed suspended apps: {apps_list}")
+            if self.notifier:
+                self.notifier.notify("▶️ Resumed suspended apps:", apps_list, category="progress")
+
+    def _retry_failed_resumes(self) -> None:
+        # Nothing else resumes them once a requirement is met, polling stops until tomorrow
+        if freezer.frozen_names() and any(state.met for state in profiles.states()):
+            self._resume_suspended_processes(lambda pid: profiles.enforced_profile(pid) is None)
+
+    def _report_processing_blocking_results(self, killed_apps: Set[str], failed_kills: List[str]) -> None:
+        if killed_apps:
+            apps_list = ", ".join(killed_apps)
+            timestamped_print(f"🚫 Blocked running apps: {apps_list}")
+            if self.notifier:
+                self.notifier.notify("🚫 Blocked running apps:", apps_list, category="blocked")
+        if failed_kills:
+            failed_list = ", ".join(failed_kills)
+            timestamped_print(f"⚠️ Could not kill: {failed_list}")
+            if self.notifier:
+                self.notifier.notify("⚠️ Could not kill:", failed_list, category="blocked")
+        if not killed_apps and not failed_kills:
+            timestamped_print("✅ No blocked apps currently running")
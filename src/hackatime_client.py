@@ -0,0 +1,206 @@
+from collections import deque
+import logging
+import random
+import threading
+import time
+from typing import Any, Deque, Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .hackatime_error import CircuitOpenError
+from .metrics import FETCH_THROTTLED
+
+HACKATIME_API_URL = "https://hackatime.hackclub.com/api/hackatime/v1"
+
+REQUEST_TIMEOUT = 10  # sec
+BACKOFF_BASE = 60  # sec
+BACKOFF_MAX = 30 * 60  # sec
+FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 10 * 60  # sec
+LATENCY_SAMPLES = 256
+POOL_SIZE = 4
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate  # requests per second
+        self.burst = burst
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+
+    def acquire(self) -> float:
+        # Each caller reserves the next slot under the lock and sleeps outside it, so waiters queue in order
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate) - 1
+            self._updated_at = now
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class HackatimeClient:
+    def __init__(
+        self,
+        base_url: str = HACKATIME_API_URL,
+        timeout: float = REQUEST_TIMEOUT,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        pool_size: int = POOL_SIZE,
+        rate_limiter: RateLimiter | None = None
+    ) -> None:
+        self.base_url = base_url
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.rate_limiter = rate_limiter
+
+        # Keep-alive connections are reused across polls instead of paying a new TCP + TLS handshake each time
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._etags: Dict[Tuple[str, str], Tuple[str, Any]] = {}  # (url, api key) -> (etag, body)
+        self._consecutive_failures = 0
+        self._opened_at: float | None = None
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def get_json(self, path: str, api_key: str) -> Any:
+        self._check_circuit()
+
+        url = f"{self.base_url}{path}"
+        headers = {"Authorization": f"Bearer {api_key}"}
+        with self._lock:
+            cached = self._etags.get((url, api_key))
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        self._throttle()
+
+        start = time.perf_counter()
+        try:
+            res = self._session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            self._record_failure()
+            raise
+        finally:
+            self._record_latency(time.perf_counter() - start)
+
+        if res.status_code == 304 and cached:
+            self._record_success()
+            return cached[1]
+
+        # Client errors (e.g. a bad API key) mean the API is reachable, so they don't trip the breaker
+        if res.status_code >= 500 or res.status_code == 429:
+            self._record_failure()
+        else:
+            self._record_success()
+        res.raise_for_status()
+
+        body = res.json()
+        if etag := res.headers.get("ETag"):
+            with self._lock:
+                self._etags[(url, api_key)] = (etag, body)
+        return body
+
+    def post_json(self, path: str, api_key: str, payload: Any) -> Any:
+        self._check_circuit()
+        self._throttle()
+
+        start = time.perf_counter()
+        try:
+            res = self._session.post(
+                f"{self.base_url}{path}",
+                json=payload,
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=self.timeout
+            )
+        except requests.RequestException:
+            self._record_failure()
+            raise
+        finally:
+            self._record_latency(time.perf_counter() - start)
+
+        if res.status_code >= 500 or res.status_code == 429:
+            self._record_failure()
+        else:
+            self._record_success()
+        res.raise_for_status()
+
+        return res.json()
+
+    def retry_delay(self) -> float:
+        with self._lock:
+            if self._opened_at is not None:
+                return max(1.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+            failures = max(1, self._consecutive_failures)
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (failures - 1))
+
+        # Jitter so many clients recovering from the same outage don't retry in lockstep
+        return random.uniform(delay / 2, delay)
+
+    def latency_stats(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+
+        if not samples:
+            return {"count": 0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+
+        return {
+            "count": len(samples),
+            "p50_ms": samples[len(samples) // 2] * 1000,
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+            "max_ms": samples[-1] * 1000,
+        }
+
+    @property
+    def last_latency_ms(self) -> float:
+        with self._lock:
+            return self._latencies[-1] * 1000 if self._latencies else 0.0
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _check_circuit(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(f"Hackatime API unavailable, pausing requests for {int(remaining)}s")
+
+            # Half-open: let a single trial request through, a failure re-opens the circuit
+            self._opened_at = time.monotonic()
+
+    def _throttle(self) -> None:
+        if self.rate_limiter and (waited := self.rate_limiter.acquire()):
+            FETCH_THROTTLED.observe(waited)
+
+    def _record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logging.info("Hackatime API recovered, closing circuit breaker")
+            self._consecutive_failures = 0
+            self._opened_at = None
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logging.warning(f"Hackatime API failed {self._consecutive_failures} times in a row, opening circuit breaker")
+                self._opened_at = time.monotonic()
@@ -1,2 +1,5 @@
 class HackatimeError(Exception):
+    pass
+
+class CircuitOpenError(HackatimeError):
     pass
\ No newline at end of file
@@ -0,0 +1,235 @@
+from bisect import bisect_left
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import requests
+
+from .hackatime_client import HackatimeClient
+from .hackatime_error import HackatimeError
+from .profiles import profiles
+from .utils import timestamped_print
+
+HEARTBEAT_TIMEOUT = 2 * 60  # sec, gaps longer than this aren't counted as coding time
+FLUSH_INTERVAL = 10  # sec
+BULK_SIZE = 25  # Max heartbeats per upstream bulk request
+MAX_PENDING = 10_000
+MAX_CLOCK_SKEW = 5 * 60  # sec, heartbeats dated further ahead than this are rejected
+
+class CodingDay:
+    def __init__(self, day: date) -> None:
+        self.day = day
+        self.seconds: float = 0.0
+        self._times: List[float] = []
+
+    def add(self, timestamp: float) -> None:
+        times = self._times
+        i = bisect_left(times, timestamp)
+        if i < len(times) and times[i] == timestamp:
+            return
+
+        # Heartbeats from several editors arrive interleaved, so splice each one into the timeline
+        prev_time = times[i - 1] if i > 0 else None
+        next_time = times[i] if i < len(times) else None
+        if prev_time is not None and next_time is not None:
+            self.seconds -= _gap_seconds(prev_time, next_time)
+        if prev_time is not None:
+            self.seconds += _gap_seconds(prev_time, timestamp)
+        if next_time is not None:
+            self.seconds += _gap_seconds(timestamp, next_time)
+
+        times.insert(i, timestamp)
+
+def _parse_time(heartbeat: Any) -> Tuple[float, date]:
+    try:
+        timestamp = float(heartbeat["time"])
+        day = datetime.fromtimestamp(timestamp).date()
+    except (KeyError, TypeError, ValueError, OverflowError, OSError) as e:  # Missing, not a number, NaN or out of range
+        raise ValueError(f"bad time in heartbeat: {e!r}") from e
+    if timestamp > time.time() + MAX_CLOCK_SKEW:
+        raise ValueError(f"heartbeat time {timestamp} is in the future")
+    return timestamp, day
+
+def _gap_seconds(start: float, end: float) -> float:
+    gap = end - start
+    return gap if gap <= HEARTBEAT_TIMEOUT else 0.0
+
+class HeartbeatServer:
+    def __init__(self, client: HackatimeClient, on_progress: Callable[[int], None] | None = None) -> None:
+        self.client = client
+        self.on_progress = on_progress
+
+        self._lock = threading.Lock()
+        self._today = CodingDay(date.today())
+        self._pending: List[Dict[str, Any]] = []
+        self._server_seconds = 0
+        self._local_at_sync = 0.0
+        self._effective_seconds = 0
+
+        self._httpd: ThreadingHTTPServer | None = None
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self, port: int) -> None:
+        handler = type("HeartbeatHandler", (_HeartbeatHandler,), {"receiver": self})
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+        self._threads = [
+            threading.Thread(target=self._httpd.serve_forever, daemon=True),
+            threading.Thread(target=self._flush_loop, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        logging.info(f"Heartbeat receiver listening on 127.0.0.1:{port}")
+        timestamped_print(f"💓 Heartbeat receiver listening on http://127.0.0.1:{port}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._flush()
+
+    def add_heartbeats(self, heartbeats: List[Any]) -> List[str | None]:
+        # Invalid heartbeats are skipped and the rest still count. Returns why each one was rejected, None if it wasn't
+        accepted, errors = [], []
+        for heartbeat in heartbeats:
+            try:
+                accepted.append((heartbeat, *_parse_time(heartbeat)))
+                errors.append(None)
+            except ValueError as e:
+                errors.append(str(e))
+        if not accepted:
+            return errors
+
+        with self._lock:
+            # Only the local clock moves the day on, a heartbeat dated ahead within the skew just isn't counted
+            if date.today() > self._today.day:
+                self._start_day(date.today())
+            for _, timestamp, day in accepted:
+                if day == self._today.day:
+                    self._today.add(timestamp)
+
+            if len(self._pending) + len(accepted) <= MAX_PENDING:
+                self._pending.extend(heartbeat for heartbeat, _, _ in accepted)
+            else:
+                logging.warning(f"Heartbeat upload queue full, dropping {len(accepted)} heartbeats")
+
+            changed = self._update_effective()
+            seconds = self._effective_seconds
+
+        if changed and self.on_progress:
+            self.on_progress(seconds)
+        return errors
+
+    def reconcile(self, server_seconds: int) -> int:
+        with self._lock:
+            if date.today() > self._today.day:
+                self._start_day(date.today())
+            if server_seconds < self._server_seconds:  # Midnight reset upstream
+                self._effective_seconds = 0
+
+            # Hackatime is authoritative for everything up to now, local heartbeats cover the time since
+            self._server_seconds = server_seconds
+            self._local_at_sync = self._today.seconds
+            self._update_effective()
+            return self._effective_seconds
+
+    @property
+    def effective_seconds(self) -> int:
+        with self._lock:
+            return self._effective_seconds
+
+    def _start_day(self, day: date) -> None:
+        self._today = CodingDay(day)
+        self._server_seconds = 0
+        self._local_at_sync = 0.0
+        self._effective_seconds = 0
+
+    def _update_effective(self) -> bool:
+        # Never report less than before within a day, server totals lag behind local heartbeats
+        seconds = int(self._server_seconds + max(0.0, self._today.seconds - self._local_at_sync))
+        if seconds <= self._effective_seconds:
+            return False
+        self._effective_seconds = seconds
+        return True
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(timeout=FLUSH_INTERVAL):
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        for i in range(0, len(pending), BULK_SIZE):
+            batch = pending[i:i + BULK_SIZE]
+            try:
+                self.client.post_json("/users/current/heartbeats.bulk", profiles.primary.profile.api_key, batch)
+            except (requests.RequestException, HackatimeError) as e:
+                logging.warning(f"Failed to forward {len(pending) - i} heartbeats upstream: {e}")
+                with self._lock:
+                    self._pending[:0] = pending[i:][:MAX_PENDING - len(self._pending)]
+                return
+
+        if pending:
+            logging.info(f"Forwarded {len(pending)} heartbeats upstream")
+
+class _HeartbeatHandler(BaseHTTPRequestHandler):
+    receiver: HeartbeatServer
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if not (path.endswith("/heartbeats") or path.endswith("/heartbeats.bulk")):
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid heartbeat: {e}"})
+            return
+
+        heartbeats = body if isinstance(body, list) else [body]
+        errors = self.receiver.add_heartbeats(heartbeats)
+        if all(errors):
+            self._send_json(400, {"error": f"Invalid heartbeat: {errors[0] if errors else 'empty batch'}"})
+        elif path.endswith(".bulk"):
+            self._send_json(201, {"responses": [
+                [{"data": hb}, 201] if error is None else [{"error": error}, 400] for hb, error in zip(heartbeats, errors)
+            ]})
+        else:
+            self._send_json(201, {"data": heartbeats[0]})
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if not path.endswith("/statusbar/today"):
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        seconds = self.receiver.effective_seconds
+        hours, minutes = divmod(seconds // 60, 60)
+        self._send_json(200, {"data": {"grand_total": {
+            "total_seconds": seconds,
+            "text": f"{hours} hrs {minutes} mins",
+        }}})
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
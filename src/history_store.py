@@ -0,0 +1,133 @@
+from datetime import date, datetime
+import logging
+from pathlib import Path
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Tuple
+
+from .utils import get_app_path
+
+HISTORY_FILE = get_app_path() / "hackablock.db"
+FLUSH_INTERVAL = 5  # sec
+BATCH_SIZE = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    day TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    seconds INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_by_day ON samples (day, recorded_at);
+
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT PRIMARY KEY,
+    seconds INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+class HistoryStore:
+    def __init__(self, path: Path = HISTORY_FILE) -> None:
+        self.path = path
+        self._queue: queue.Queue[Tuple[str, float, int] | None] = queue.Queue()
+        self._latest: Tuple[str, int] | None = None  # Last recorded (day, seconds), including unflushed ones
+        self._closed = False
+        self._close_lock = threading.Lock()  # Nothing gets queued behind the writer's stop marker
+
+        self._read_lock = threading.Lock()
+        self._read_conn = self._connect()
+        self._read_conn.executescript(SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, seconds: int, when: datetime | None = None) -> None:
+        when = when or datetime.now()
+        day = when.date().isoformat()
+        with self._close_lock:
+            if self._closed:
+                logging.warning(f"History store is closed, dropping the {seconds}s sample for {day}")
+                return
+            self._latest = (day, seconds)
+            self._queue.put((day, when.timestamp(), seconds))
+
+    def today_seconds(self) -> int | None:
+        today = date.today().isoformat()
+        if self._latest and self._latest[0] == today:
+            return self._latest[1]
+
+        with self._read_lock:
+            row = self._read_conn.execute("SELECT seconds FROM daily_totals WHERE day = ?", (today,)).fetchone()
+        return row[0] if row else None
+
+    def daily_totals(self, start: date, end: date) -> List[Tuple[str, int]]:
+        with self._read_lock:
+            return self._read_conn.execute(
+                "SELECT day, seconds FROM daily_totals WHERE day BETWEEN ? AND ? ORDER BY day",
+                (start.isoformat(), end.isoformat())
+            ).fetchall()
+
+    def samples(self, day: date) -> List[Tuple[float, int]]:
+        with self._read_lock:
+            return self._read_conn.execute(
+                "SELECT recorded_at, seconds FROM samples WHERE day = ? ORDER BY recorded_at",
+                (day.isoformat(),)
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join(timeout=5)
+        with self._read_lock:
+            self._read_conn.close()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        stopping = False
+
+        try:
+            while not stopping:
+                row = self._queue.get()
+                if row is None:
+                    break
+
+                # Gather rows for up to FLUSH_INTERVAL so they share one transaction
+                batch = [row]
+                deadline = time.monotonic() + FLUSH_INTERVAL
+                while len(batch) < BATCH_SIZE and (remaining := deadline - time.monotonic()) > 0:
+                    try:
+                        row = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if row is None:
+                        stopping = True
+                        break
+                    batch.append(row)
+
+                self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[str, float, int]]) -> None:
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT INTO samples (day, recorded_at, seconds) VALUES (?, ?, ?)", batch)
+                conn.executemany(
+                    "INSERT INTO daily_totals (day, seconds, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (day) DO UPDATE SET seconds = excluded.seconds, updated_at = excluded.updated_at",
+                    [(day, seconds, recorded_at) for day, recorded_at, seconds in batch]
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Failed to write {len(batch)} history samples: {e}")
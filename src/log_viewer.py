@@ -0,0 +1,413 @@
+from array import array
+from bisect import bisect_right
+import logging
+import mmap
+import os
+from pathlib import Path
+import queue
+import re
+import threading
+from typing import Callable, Tuple
+
+from PySide6.QtCore import QObject, Qt, QTimer, Signal
+from PySide6.QtGui import QColor, QFontDatabase, QGuiApplication, QKeyEvent, QKeySequence, QMouseEvent, QPainter, QPaintEvent, QResizeEvent
+from PySide6.QtWidgets import QAbstractScrollArea, QCheckBox, QComboBox, QHBoxLayout, QLabel, QLineEdit, QPushButton, QVBoxLayout, QWidget
+
+from .logging_setup import LOG_FILE
+from .utils import get_app_path, open_folder, timestamped_print
+
+CHUNK_SIZE = 16 * 1024 * 1024
+BATCH_LINES = 200_000  # Lines indexed between updates to the view
+FOLLOW_INTERVAL = 1000  # ms
+FILTER_DEBOUNCE = 300  # ms
+
+NEWLINE = re.compile(rb"\n")
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+def _level_pattern(min_level: str) -> bytes:
+    # Matches the level in both the text and the JSON lines formats
+    levels = "|".join(LEVELS[LEVELS.index(min_level):])
+    return rb'\[(?:' + levels.encode() + rb')\]|"level": "(?:' + levels.encode() + rb')"'
+
+def _line_color(line: str) -> QColor | None:
+    if "[ERROR]" in line or '"level": "ERROR"' in line:
+        return QColor("red")
+    if "[WARNING]" in line or '"level": "WARNING"' in line:
+        return QColor("darkorange")
+    return None
+
+class LogIndex(QObject):
+    lines_added = Signal(int)  # total indexed lines
+    reset = Signal()
+    filter_ready = Signal(int, object, bool)  # generation, line numbers, whether they extend the previous result
+
+    def __init__(self, path: Path = LOG_FILE) -> None:
+        super().__init__()
+        self.path = path
+
+        # Guards the mapping and the line starts, the worker thread writes them while the GUI thread reads
+        self._lock = threading.Lock()
+        self._file = None
+        self._mm: mmap.mmap | None = None
+        self._identity: Tuple[int, int] | None = None  # (device, inode) of the mapped file
+        self._starts = array("Q", [0])  # Offset of every line start, the last entry ends the indexed region
+
+        self._filter: Tuple[int, re.Pattern | None, re.Pattern | None] | None = None
+        self._jobs: queue.Queue[Callable[[], None] | None] = queue.Queue()
+        self._worker: threading.Thread | None = None
+
+    @property
+    def line_count(self) -> int:
+        with self._lock:
+            return len(self._starts) - 1
+
+    def line(self, number: int) -> str:
+        with self._lock:
+            if self._mm is None or number >= len(self._starts) - 1:
+                return ""
+            return self._mm[self._starts[number]:self._starts[number + 1]].decode("utf-8", "replace").rstrip("\r\n")
+
+    def open(self) -> None:
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work_loop, name="log-index", daemon=True)
+            self._worker.start()
+        self._jobs.put(self._refresh)
+
+    def poll(self) -> None:
+        if self._jobs.empty():
+            self._jobs.put(self._refresh)
+
+    def close(self) -> None:
+        self._jobs.put(self._unmap)
+
+    def stop(self) -> None:
+        self.close()
+        if self._worker is not None:
+            self._jobs.put(None)
+            self._worker.join(timeout=1)
+            self._worker = None
+
+    def set_filter(self, generation: int, min_level: str | None, text: str) -> None:
+        level_re = re.compile(_level_pattern(min_level)) if min_level else None
+        text_re = re.compile(re.escape(text.encode()), re.IGNORECASE) if text else None
+        self._jobs.put(lambda: self._apply_filter(generation, level_re, text_re))
+
+    # INTERNAL HELPERS
+    def _work_loop(self) -> None:
+        while (job := self._jobs.get()) is not None:
+            try:
+                job()
+            except (OSError, ValueError) as e:
+                logging.warning(f"Log viewer failed to read {self.path}: {e}")
+
+    def _refresh(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+
+        identity = (stat.st_dev, stat.st_ino)
+        indexed_to = self._starts[-1]
+        if identity != self._identity or stat.st_size < indexed_to:
+            # Rotated or truncated, start over on the new file
+            self._unmap()
+            with self._lock:
+                self._starts = array("Q", [0])
+                self._identity = identity
+            indexed_to = 0
+            self.reset.emit()
+
+        if stat.st_size == 0 or (self._mm is not None and stat.st_size == len(self._mm)):
+            return
+
+        new_file = open(self.path, "rb")
+        new_mm = mmap.mmap(new_file.fileno(), 0, access=mmap.ACCESS_READ)
+        with self._lock:
+            old_file, old_mm = self._file, self._mm
+            self._file, self._mm = new_file, new_mm
+        if old_mm:
+            old_mm.close()
+            old_file.close()
+
+        self._index_from(indexed_to, len(new_mm))
+
+    def _index_from(self, start: int, end: int) -> None:
+        mm = self._mm
+        first_line = len(self._starts) - 1
+        batch = array("Q")
+
+        pos = start
+        while pos < end:
+            chunk_end = min(pos + CHUNK_SIZE, end)
+            chunk = mm[pos:chunk_end]
+            batch.extend(pos + match.end() for match in NEWLINE.finditer(chunk))
+            pos = chunk_end
+
+            if len(batch) >= BATCH_LINES or pos >= end:
+                with self._lock:
+                    self._starts.extend(batch)
+                    count = len(self._starts) - 1
+                batch = array("Q")
+                self.lines_added.emit(count)
+
+        # A partial last line stays unindexed until its newline is written
+        if self._filter and len(self._starts) - 1 > first_line:
+            generation, level_re, text_re = self._filter
+            self.filter_ready.emit(generation, self._matching_lines(level_re, text_re, first_line), True)
+
+    def _apply_filter(self, generation: int, level_re: re.Pattern | None, text_re: re.Pattern | None) -> None:
+        if level_re is None and text_re is None:
+            self._filter = None
+            self.filter_ready.emit(generation, None, False)
+            return
+
+        self._filter = (generation, level_re, text_re)
+        self.filter_ready.emit(generation, self._matching_lines(level_re, text_re, 0), False)
+
+    def _matching_lines(self, level_re: re.Pattern | None, text_re: re.Pattern | None, first_line: int) -> array:
+        starts, mm = self._starts, self._mm
+        matches = array("I")
+        if mm is None:
+            return matches
+
+        # Search the whole mapping for the rarer pattern and only check the other one on matching lines
+        pattern = text_re or level_re
+        other = level_re if text_re else None
+        end = starts[-1]
+        pos = starts[first_line]
+        while (match := pattern.search(mm, pos, end)) is not None:
+            line = bisect_right(starts, match.start(), first_line) - 1
+            line_start, line_end = starts[line], starts[line + 1]
+            if other is None or other.search(mm, line_start, line_end):
+                matches.append(line)
+            pos = line_end
+        return matches
+
+    def _unmap(self) -> None:
+        with self._lock:
+            old_file, old_mm = self._file, self._mm
+            self._file, self._mm = None, None
+        if old_mm:
+            old_mm.close()
+            old_file.close()
+
+class LogModel(QObject):
+    changed = Signal(bool)  # True when rows were only appended
+
+    def __init__(self, index: LogIndex) -> None:
+        super().__init__()
+        self.index_ = index
+        self._line_count = 0
+        self._rows: array | None = None  # Line numbers shown while a filter is active
+        self._generation = 0
+
+        index.lines_added.connect(self._handle_lines_added)
+        index.reset.connect(self._handle_reset)
+        index.filter_ready.connect(self._handle_filter_ready)
+
+    @property
+    def row_count(self) -> int:
+        return len(self._rows) if self._rows is not None else self._line_count
+
+    def line(self, row: int) -> str:
+        return self.index_.line(self._rows[row] if self._rows is not None else row)
+
+    def set_filter(self, min_level: str | None, text: str) -> None:
+        self._generation += 1
+        self.index_.set_filter(self._generation, min_level, text)
+
+    def _handle_lines_added(self, count: int) -> None:
+        self._line_count = count
+        self.changed.emit(True)
+
+    def _handle_reset(self) -> None:
+        self._line_count = 0
+        if self._rows is not None:
+            self._rows = array("I")
+        self.changed.emit(False)
+
+    def _handle_filter_ready(self, generation: int, rows: array | None, append: bool) -> None:
+        if generation != self._generation:
+            return
+
+        if append and self._rows is not None:
+            self._rows.extend(rows)
+        else:
+            self._rows = rows
+        self.changed.emit(append)
+
+class LogView(QAbstractScrollArea):
+    # Qt's item views lay out every row on each insert, this only ever touches the rows on screen
+    def __init__(self, model: LogModel) -> None:
+        super().__init__()
+        self.model = model
+        self.follow = True
+        self._selected: int | None = None
+
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.horizontalScrollBar().setSingleStep(self.fontMetrics().averageCharWidth() * 4)
+        model.changed.connect(self._handle_model_changed)
+
+    def scroll_to_bottom(self) -> None:
+        bar = self.verticalScrollBar()
+        bar.setValue(bar.maximum())
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        painter = QPainter(self.viewport())
+        metrics = self.fontMetrics()
+        line_height = metrics.height()
+        left = -self.horizontalScrollBar().value() + 4
+        first = self.verticalScrollBar().value()
+        palette = self.palette()
+        widest = 0
+
+        for offset in range(self._visible_rows() + 1):
+            row = first + offset
+            if row >= self.model.row_count:
+                break
+
+            top = offset * line_height
+            line = self.model.line(row)
+            if row == self._selected:
+                painter.fillRect(0, top, self.viewport().width(), line_height, palette.highlight())
+                painter.setPen(palette.highlightedText().color())
+            else:
+                painter.setPen(_line_color(line) or palette.text().color())
+            painter.drawText(left, top + metrics.ascent(), line)
+            widest = max(widest, metrics.horizontalAdvance(line))
+
+        # Only widens, so scrolling past a long line doesn't yank the horizontal bar
+        h_bar = self.horizontalScrollBar()
+        h_bar.setRange(0, max(h_bar.maximum(), widest + 8 - self.viewport().width()))
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def scrollContentsBy(self, dx: int, dy: int) -> None:
+        self.viewport().update()
+
+    def mousePressEvent(self, event: QMouseEvent) -> None:
+        row = self.verticalScrollBar().value() + int(event.position().y()) // self.fontMetrics().height()
+        self._selected = row if row < self.model.row_count else None
+        self.viewport().update()
+
+    def keyPressEvent(self, event: QKeyEvent) -> None:
+        if event.matches(QKeySequence.StandardKey.Copy) and self._selected is not None:
+            QGuiApplication.clipboard().setText(self.model.line(self._selected))
+            return
+        super().keyPressEvent(event)
+
+    # INTERNAL HELPERS
+    def _visible_rows(self) -> int:
+        return max(1, self.viewport().height() // self.fontMetrics().height())
+
+    def _update_scrollbars(self) -> None:
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        visible = self._visible_rows()
+        bar.setPageStep(visible)
+        bar.setRange(0, max(0, self.model.row_count - visible))
+        if self.follow and at_bottom:
+            bar.setValue(bar.maximum())
+        self.viewport().update()
+
+    def _handle_model_changed(self, appended: bool) -> None:
+        if not appended:
+            self._selected = None
+            self.verticalScrollBar().setValue(0)
+            self.horizontalScrollBar().setRange(0, 0)
+        self._update_scrollbars()
+
+class LogsTab(QWidget):
+    def __init__(self) -> None:
+        super().__init__()
+        self.log_index = LogIndex()
+        self.model = LogModel(self.log_index)
+        self._active = False
+
+        self.level_filter = QComboBox()
+        self.level_filter.addItems(["All levels", *LEVELS[1:4]])
+        self.level_filter.currentIndexChanged.connect(self._apply_filter)
+
+        self.text_filter = QLineEdit()
+        self.text_filter.setPlaceholderText("Filter")
+        self.text_filter.setClearButtonEnabled(True)
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(FILTER_DEBOUNCE)
+        self._filter_timer.timeout.connect(self._apply_filter)
+        self.text_filter.textChanged.connect(self._filter_timer.start)
+
+        self.view = LogView(self.model)
+
+        self.follow = QCheckBox("Follow")
+        self.follow.setChecked(True)
+        self.follow.toggled.connect(self._handle_follow_toggled)
+        self.status_label = QLabel("")
+
+        open_folder_btn = QPushButton("Open folder")
+        open_folder_btn.clicked.connect(self._open_log_folder)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.level_filter)
+        filter_layout.addWidget(self.text_filter)
+
+        footer_layout = QHBoxLayout()
+        footer_layout.addWidget(self.follow)
+        footer_layout.addWidget(self.status_label, 1)
+        footer_layout.addWidget(open_folder_btn)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(6, 6, 6, 6)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.view)
+        layout.addLayout(footer_layout)
+        self.setLayout(layout)
+
+        self._follow_timer = QTimer(self)
+        self._follow_timer.setInterval(FOLLOW_INTERVAL)
+        self._follow_timer.timeout.connect(self.log_index.poll)
+        self.model.changed.connect(self._update_status)
+
+    def activate(self) -> None:
+        if self._active:
+            return
+        self._active = True
+        self.log_index.open()
+        self._follow_timer.start()
+
+    def deactivate(self) -> None:
+        # The mapping is dropped while hidden so it never holds up log rotation
+        if not self._active:
+            return
+        self._active = False
+        self._follow_timer.stop()
+        self.log_index.close()
+
+    def shutdown(self) -> None:
+        self.deactivate()
+        self.log_index.stop()
+
+    def _apply_filter(self) -> None:
+        level = self.level_filter.currentText() if self.level_filter.currentIndex() > 0 else None
+        self.model.set_filter(level, self.text_filter.text().strip())
+
+    def _handle_follow_toggled(self, checked: bool) -> None:
+        self.view.follow = checked
+        if checked:
+            self.view.scroll_to_bottom()
+
+    def _update_status(self) -> None:
+        total = self.log_index.line_count
+        shown = self.model.row_count
+        self.status_label.setText(f"{total:,} lines" if shown == total else f"{shown:,} of {total:,} lines")
+
+    def _open_log_folder(self) -> None:
+        path = get_app_path()
+        try:
+            open_folder(path)
+        except Exception as e:
+            logging.error(f"Unexpected error opening folder {path}: {e}")
+            timestamped_print(f"⚠️ Failed to open folder {path}. See 'hackablock.log'.")
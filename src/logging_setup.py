@@ -0,0 +1,89 @@
+import atexit
+from datetime import datetime
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import os
+import queue
+import time
+from typing import Any, Dict
+
+from .utils import get_app_path
+
+LOG_FILE = get_app_path() / "hackablock.log"
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+EXTRA_FIELDS = ("pid", "app", "latency_ms")  # Passed by callers through logging's extra=
+ROLLOVER_RETRY = 30  # sec between rollover attempts while the log can't be renamed
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for field in EXTRA_FIELDS:
+            if (value := getattr(record, field, None)) is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class _EnqueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener thread formats, callers only pay for the enqueue
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class _DeferringRotatingFileHandler(RotatingFileHandler):
+    # On Windows the log can't be renamed while something else has it open, like the Logs tab's mapping. Rolling
+    # over is put off then and the file keeps growing, instead of every record failing the rename and being dropped
+    _retry_at = 0.0
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        return time.monotonic() >= self._retry_at and super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None  # Reopened by the next emit
+
+        # Tried before the backups are shifted, so a failed attempt doesn't push the oldest one out
+        probe = f"{self.baseFilename}.rollover"
+        try:
+            os.rename(self.baseFilename, probe)
+            os.rename(probe, self.baseFilename)
+        except FileNotFoundError:
+            pass
+        except PermissionError:
+            self._retry_at = time.monotonic() + ROLLOVER_RETRY
+            return
+        super().doRollover()
+
+def create_file_handler(log_format: str, max_bytes: int, backups: int) -> logging.Handler:
+    handler = _DeferringRotatingFileHandler(LOG_FILE, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    return handler
+
+def setup_logging() -> QueueListener:
+    from .settings import settings  # Loading settings may itself log, so the root logger is configured afterwards
+
+    file_handler = create_file_handler(settings.data["log_format"], settings.data["log_max_bytes"], settings.data["log_backups"])
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_EnqueueHandler(log_queue))
+
+    listener.start()
+    atexit.register(listener.stop)  # Flushes whatever is still queued
+    return listener
@@ -1,23 +1,162 @@
-import logging
+import argparse
+import json
+from pathlib import Path
 import sys
 
-from .utils import get_app_path
+from .logging_setup import setup_logging
 
-logging.basicConfig(
-    filename=str(get_app_path() / "hackablock.log"),
-    filemode="a",
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    level=logging.INFO
-)
+setup_logging()
 
-from .app import App
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="hackablock")
+    parser.add_argument("--headless", action="store_true", help="run the tracker and process watcher without the tray or window")
+    parser.add_argument("--record-trace", nargs="?", const="", metavar="PATH", help="record process events, fetches and settings changes for replay")
+    parser.add_argument("--profile", nargs="?", type=float, const=0, metavar="SECONDS", help="profile every thread from startup, until exit or for SECONDS")
 
-if sys.platform == "win32":
-    import ctypes
-    app_id = "Hackablock.App"
-    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(app_id)
+    # Commands talk to the running instance over its control socket and never start Qt
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    status = commands.add_parser("status", help="print today's progress")
+    status.add_argument("--json", action="store_true", help="print the raw reply for scripts")
+    commands.add_parser("refresh", help="fetch coding time from Hackatime now")
+    commands.add_parser("block-now", help="close blocked apps that are running")
+    add_app = commands.add_parser("add-app", help="add an app to the block list")
+    add_app.add_argument("name")
+    profile = commands.add_parser("profile", help="start or stop profiling the running instance")
+    profile.add_argument("action", choices=["start", "stop"])
+    profile.add_argument("--seconds", type=float, default=0, help="stop by itself after this long")
+    replay = commands.add_parser("replay", help="replay a recorded trace against the current enforcement logic")
+    replay.add_argument("trace", type=Path)
+    replay.add_argument("--speed", type=float, default=0, help="virtual seconds per real second, 0 replays as fast as possible")
+    replay.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+def run_replay(args: argparse.Namespace) -> int:
+    # Runs offline in this process, nothing talks to a running instance or the network
+    from dataclasses import asdict
+
+    from .trace_replay import TraceReplayer
+    from .utils import format_time
+
+    try:
+        report = TraceReplayer(args.trace, speed=args.speed).run()
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not replay {args.trace}: {e}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps({**asdict(report), "speedup": report.speedup}))
+    else:
+        print(
+            f"🔁 Replayed {report.events} events ({report.processes} processes, {report.fetches} fetches) "
+            f"covering {format_time(int(report.virtual_seconds))} in {report.wall_seconds:.2f}s ({report.speedup:.0f}×)."
+        )
+        if report.skipped:
+            print(f"⏭️ {report.skipped} blocks came from sha256: rules and weren't re-checked.")
+        for mismatch in report.mismatches:
+            print(f"  {mismatch}")
+        print(f"❌ {report.mismatch_count} decisions differ from the recording." if report.mismatch_count else "✅ Every decision matches the recording.")
+    return 1 if report.mismatch_count else 0
+
+def run_command(args: argparse.Namespace) -> int:
+    from .control import send_command
+    from .utils import format_time
+
+    try:
+        match args.command:
+            case "add-app":
+                reply = send_command(args.command, name=args.name)
+            case "profile":
+                reply = send_command(args.command, action=args.action, seconds=args.seconds)
+            case _:
+                reply = send_command(args.command)
+    except (OSError, TimeoutError) as e:
+        print(f"❌ hackablock isn't running or didn't answer: {e}", file=sys.stderr)
+        return 2
+
+    if not reply["ok"]:
+        print(f"⚠️ {reply['error']}", file=sys.stderr)
+        return 1
+
+    match args.command:
+        case "status" if args.json:
+            print(json.dumps(reply))
+        case "status" if len(reply["profiles"]) > 1:
+            for profile in reply["profiles"]:
+                seconds, required = profile["seconds"], profile["required_seconds"]
+                if profile["requirement_met"]:
+                    print(f"🎉 {profile['name']}: {format_time(seconds)} coded today, requirement met.")
+                else:
+                    print(f"⏳ {profile['name']}: {format_time(seconds)} coded today, {format_time(max(0, required - seconds))} more required.")
+            if reply["suspended_apps"]:
+                print(f"⏸️ Suspended: {', '.join(reply['suspended_apps'])}")
+        case "status":
+            seconds, required = reply["seconds"], reply["required_seconds"]
+            if reply["requirement_met"]:
+                print(f"🎉 {format_time(seconds)} coded today, requirement met. Apps are unblocked.")
+            else:
+                print(f"⏳ {format_time(seconds)} coded today, {format_time(max(0, required - seconds))} more required.")
+            if reply["suspended_apps"]:
+                print(f"⏸️ Suspended: {', '.join(reply['suspended_apps'])}")
+        case "refresh":
+            print("🔃 Refresh requested.")
+        case "block-now":
+            print("🚫 Closing blocked apps.")
+        case "add-app":
+            print(f"➕ Added {args.name}." if reply["added"] else f"{args.name} is already blocked.")
+        case "profile" if args.action == "start":
+            print(f"🔬 Profiling started{f' for {args.seconds:g}s' if args.seconds else ''}.")
+        case "profile":
+            print(f"📄 Profile written to {reply['report']}")
+    return 0
 
 if __name__ == "__main__":
-    app = App()
-    app.run()
\ No newline at end of file
+    args = parse_args()
+    if args.command == "replay":
+        sys.exit(run_replay(args))
+    if args.command:
+        sys.exit(run_command(args))
+
+    from .control import InstanceLock, send_command
+
+    instance_lock = InstanceLock()
+    if not instance_lock.acquire():
+        if args.headless:
+            print("❌ hackablock is already running.", file=sys.stderr)
+            sys.exit(1)
+
+        # Bring the running instance's window up instead of starting a second watcher and poller
+        try:
+            shown = send_command("show")["ok"]
+        except (OSError, TimeoutError):
+            shown = False
+        print("hackablock is already running." if shown else "❌ hackablock is already running but its window couldn't be opened.")
+        sys.exit(0 if shown else 1)
+
+    if args.record_trace is not None:
+        from .settings import settings
+        from .trace_recorder import default_trace_path, trace_recorder
+
+        trace_path = Path(args.record_trace) if args.record_trace else default_trace_path()
+        try:
+            trace_recorder.start(trace_path, settings.data)
+            print(f"⏺️ Recording trace to {trace_path}")
+        except OSError as e:
+            print(f"❌ Could not record trace to {trace_path}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.profile is not None:
+        from .profiler import profiler
+        profiler.start(args.profile)
+
+    if args.headless:
+        # Qt is never imported in headless mode
+        from .daemon import Daemon
+        Daemon().run()
+    else:
+        if sys.platform == "win32":
+            import ctypes
+            app_id = "Hackablock.App"
+            ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(app_id)
+
+        from .app import App
+        App().run()
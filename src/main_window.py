@@ -1,16 +1,19 @@
 import threading
-from typing import Callable
+from typing import Any, Callable, Dict, Mapping
 
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QCloseEvent, QIcon, QFont
-from PySide6.QtWidgets import QGroupBox,QHBoxLayout,  QLabel, QLineEdit, QListWidget, QMainWindow, QProgressBar, QPushButton, QSpinBox, QTabWidget, QVBoxLayout, QWidget
+from PySide6.QtWidgets import QCheckBox, QGroupBox,QHBoxLayout,  QLabel, QLineEdit, QListWidget, QMainWindow, QMessageBox, QProgressBar, QPushButton, QSpinBox, QTabWidget, QVBoxLayout, QWidget
 
+from .block_rules import rule_error
+from .log_viewer import LogsTab
 from .settings import settings
 from .utils import format_time
 
 class MainWindow(QMainWindow):
     refresh_requested = Signal()
     block_requested = Signal()
+    hidden = Signal()
     
     def __init__(self, requirement_met_event: threading.Event, on_refresh: Callable | None) -> None:
         super().__init__()
@@ -19,7 +22,8 @@ class MainWindow(QMainWindow):
         self.current_seconds = 0
         
         self.setWindowTitle("Hackablock")
-        self.setFixedSize(400, 300)
+        self.setMinimumSize(400, 300)
+        self.resize(400, 300)
         self.setWindowIcon(QIcon("./assets/favicon.ico"))
         
         central_widget = QWidget()
@@ -31,6 +35,9 @@ class MainWindow(QMainWindow):
         self.tabs.addTab(self._create_progress_tab(), "Progress")
         self.tabs.addTab(self._create_blocked_apps_tab(), "Blocked Apps")
         self.tabs.addTab(self._create_settings_tab(), "Settings")
+        self.logs_tab = LogsTab()
+        self.tabs.addTab(self.logs_tab, "Logs")
+        self.tabs.currentChanged.connect(self._handle_tab_changed)
     
         layout.addWidget(self.tabs)
         central_widget.setLayout(layout)
@@ -117,6 +124,9 @@ class MainWindow(QMainWindow):
             self.required_minutes.setRange(1, 720)
             self.required_minutes.setValue(settings.data["minutes_required"])
             
+            self.suspend_apps = QCheckBox("Suspend blocked apps instead of closing them")
+            self.suspend_apps.setChecked(settings.data["enforcement_mode"] == "suspend")
+            
             apply_btn = QPushButton("Apply")
             apply_btn.clicked.connect(self._apply_general_settings)
             
@@ -124,6 +134,7 @@ class MainWindow(QMainWindow):
             general_layout.addWidget(self.api_key)
             general_layout.addWidget(QLabel(f"Daily required coding time (minutes):"))
             general_layout.addWidget(self.required_minutes)
+            general_layout.addWidget(self.suspend_apps)
             general_layout.addWidget(apply_btn)
             
             general_group.setLayout(general_layout)
@@ -145,8 +156,11 @@ class MainWindow(QMainWindow):
         return tab
     
     def _apply_general_settings(self) -> None:
-        settings.update_setting("hackatime_api_key", self.api_key.text())
-        settings.update_setting("minutes_required", self.required_minutes.value())
+        settings.update_settings({
+            "hackatime_api_key": self.api_key.text(),
+            "minutes_required": self.required_minutes.value(),
+            "enforcement_mode": "suspend" if self.suspend_apps.isChecked() else "kill"
+        })
         self.progress_bar.setMaximum(settings.data["minutes_required"] * 60)
         settings.save()
         
@@ -156,11 +170,16 @@ class MainWindow(QMainWindow):
     def _add_blocked_app(self) -> None:
         if not (new_app := self.new_app_input.text().strip()):
             return
+        if (error := rule_error(new_app)) is not None:
+            QMessageBox.warning(self, "Invalid rule", f"{new_app} can't be used as a block rule: {error}")
+            return
+
+        def add(data: Mapping[str, Any]) -> Dict[str, Any] | None:
+            if new_app.lower() in [a.lower() for a in data["blocked_apps"]]:
+                return None
+            return {"blocked_apps": [*data["blocked_apps"], new_app]}
 
-        blocked_apps = settings.data.get("blocked_apps", [])
-        if new_app.lower() not in [a.lower() for a in blocked_apps]:
-            blocked_apps.append(new_app)
-            settings.update_setting("blocked_apps", blocked_apps)
+        if settings.update(add) is not None:
             settings.save()
             self.blocked_list.addItem(new_app)
             self.new_app_input.clear()
@@ -169,9 +188,11 @@ class MainWindow(QMainWindow):
                 self.block_requested.emit()
     
     def _delete_selected_blocked_apps(self) -> None:
+        removed = set()
         for item in self.blocked_list.selectedItems():
             self.blocked_list.takeItem(self.blocked_list.row(item))
-            settings.data["blocked_apps"].remove(item.text())
+            removed.add(item.text())
+        settings.update(lambda data: {"blocked_apps": [a for a in data["blocked_apps"] if a not in removed]})
         settings.save()
     
     def show_window(self, tab_index: int | None) -> None:
@@ -181,6 +202,17 @@ class MainWindow(QMainWindow):
         
         if tab_index is not None:
             self.tabs.setCurrentIndex(tab_index)
+        self._handle_tab_changed(self.tabs.currentIndex())
+    
+    def _handle_tab_changed(self, tab_index: int) -> None:
+        # The log is only mapped and followed while its tab is on screen
+        if self.isVisible() and self.tabs.widget(tab_index) is self.logs_tab:
+            self.logs_tab.activate()
+        else:
+            self.logs_tab.deactivate()
+    
+    def dispose(self) -> None:
+        self.logs_tab.shutdown()
     
     def update_progress(self, seconds: int) -> None:
         self.current_seconds = seconds
@@ -200,4 +232,6 @@ class MainWindow(QMainWindow):
     def closeEvent(self, a0: QCloseEvent | None) -> None:
         if a0 is not None:
             a0.ignore()
-        self.hide()
\ No newline at end of file
+        self.hide()
+        self.logs_tab.deactivate()
+        self.hidden.emit()
\ No newline at end of file
@@ -0,0 +1,232 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .utils import get_app_path, timestamped_print
+
+SNAPSHOT_FILE = get_app_path() / "hackablock-metrics.json"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DECISION_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)
+
+MAX_LABEL_LENGTH = 64
+OVERFLOW_LABEL = "other"
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    # The Prometheus text format only escapes these three inside label values
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_key(names: Sequence[str], labels: Dict[str, Any], series: Dict[LabelValues, Any], max_series: int) -> LabelValues:
+    # Some labels come from process names, so both their length and how many series they create are capped
+    key = tuple(str(labels.get(name, ""))[:MAX_LABEL_LENGTH] for name in names)
+    if max_series and key not in series and len(series) >= max_series:
+        return (OVERFLOW_LABEL,) * len(names)
+    return key
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), max_series: int = 0) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series  # 0 is unbounded, past it new label sets are counted under OVERFLOW_LABEL
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        with self._lock:
+            key = _label_key(self.labelnames, labels, self._values, self.max_series)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in self._values.items()]
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS, max_series: int = 0
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}  # labels -> (bucket counts, [sum, count])
+
+    def observe(self, value: float, **labels: str) -> None:
+        with self._lock:
+            key = _label_key(self.labelnames, labels, self._values, self.max_series)
+            if key not in self._values:
+                self._values[key] = ([0] * len(self.buckets), [0.0, 0])
+            counts, totals = self._values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            totals[0] += value
+            totals[1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, (total, count)) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, f'le=\"{bound:g}\"')} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, 'le=\"+Inf\"')} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "labels": dict(zip(self.labelnames, key)),
+                    "buckets": dict(zip((f"{b:g}" for b in self.buckets), counts)),
+                    "sum": total,
+                    "count": count,
+                }
+                for key, (counts, (total, count)) in self._values.items()
+            ]
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = (), max_series: int = 0) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, help, labelnames, max_series)
+            return self._metrics[name]
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS, max_series: int = 0
+    ) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help, labelnames, buckets, max_series)
+            return self._metrics[name]
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "timestamp": time.time(),
+            "metrics": {metric.name: metric.snapshot() for metric in metrics},
+        }
+
+metrics = MetricsRegistry()
+
+ENFORCEMENT_LATENCY = metrics.histogram(
+    "hackablock_enforcement_latency_seconds", "Time from a blocked process spawning to it being killed", ["watcher"]
+)
+PROCESSES_BLOCKED = metrics.counter("hackablock_processes_blocked_total", "Blocked processes killed or suspended", ["source", "action"])
+RESPAWN_STORMS = metrics.counter(
+    "hackablock_respawn_storms_total", "Times a blocked app started respawning faster than it could be reported", ["app"], max_series=50
+)
+ENFORCEMENT_CPU = metrics.counter("hackablock_enforcement_cpu_seconds_total", "CPU time spent matching and killing blocked processes", ["source"])
+FETCH_DURATION = metrics.histogram("hackablock_fetch_duration_seconds", "Hackatime coding-time fetch latency", ["outcome"])
+FETCH_ERRORS = metrics.counter("hackablock_fetch_errors_total", "Failed Hackatime fetches by error class", ["error"])
+FETCH_CACHE = metrics.counter("hackablock_fetch_cache_total", "Coding-time lookups by cache result", ["result"])
+FETCH_THROTTLED = metrics.histogram("hackablock_fetch_throttled_seconds", "Time Hackatime requests waited on the shared rate limit")
+SCAN_DURATION = metrics.histogram("hackablock_scan_duration_seconds", "Duration of full blocked-process sweeps", ["backend"])
+SCAN_PROCESSES = metrics.counter("hackablock_scan_processes_examined_total", "Processes examined by full sweeps", ["backend"])
+EXEC_DECISIONS = metrics.histogram(
+    "hackablock_exec_decision_seconds", "Time to answer a fanotify exec permission request", ["decision", "cache"], buckets=DECISION_BUCKETS
+)
+NOTIFICATIONS = metrics.counter("hackablock_notifications_total", "Desktop notifications emitted", ["category"])
+NOTIFICATIONS_SUPPRESSED = metrics.counter(
+    "hackablock_notifications_suppressed_total", "Notifications merged into a batch or dropped", ["category", "reason"]
+)
+
+class MetricsExporter:
+    def __init__(self, registry: MetricsRegistry = metrics, snapshot_file: Path = SNAPSHOT_FILE) -> None:
+        self.registry = registry
+        self.snapshot_file = snapshot_file
+        self._httpd: ThreadingHTTPServer | None = None
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self, port: int = 0, snapshot_interval: float = 0) -> None:
+        if port:
+            handler = type("MetricsHandler", (_MetricsHandler,), {"registry": self.registry})
+            try:
+                self._httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+            except OSError as e:
+                logging.error(f"Failed to start metrics endpoint on port {port}: {e}")
+                timestamped_print("❌ Failed to start metrics endpoint. See 'hackablock.log'.")
+            else:
+                self._threads.append(threading.Thread(target=self._httpd.serve_forever, daemon=True))
+                logging.info(f"Serving Prometheus metrics on http://127.0.0.1:{port}/metrics")
+
+        if snapshot_interval:
+            self._threads.append(threading.Thread(target=self._snapshot_loop, args=(snapshot_interval,), daemon=True))
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def write_snapshot(self) -> None:
+        tmp_path = self.snapshot_file.with_suffix(".json.tmp")
+        try:
+            tmp_path.write_text(json.dumps(self.registry.snapshot(), indent=2))
+            os.replace(tmp_path, self.snapshot_file)
+        except OSError as e:
+            logging.error(f"Failed to write metrics snapshot: {e}")
+
+    def _snapshot_loop(self, interval: float) -> None:
+        while not self._stop_event.wait(timeout=interval):
+            self.write_snapshot()
+        self.write_snapshot()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = self.registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
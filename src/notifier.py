@@ -1,16 +1,61 @@
-from PySide6.QtCore import QObject, Signal
+from collections import defaultdict, deque
+import threading
+import time
+from typing import Deque, Dict, Tuple
+
+from PySide6.QtCore import QObject, QTimer
 from PySide6.QtWidgets import QSystemTrayIcon
 
+from .metrics import NOTIFICATIONS, NOTIFICATIONS_SUPPRESSED
+from .settings import settings
+
+RATE_WINDOW = 60  # sec, notification_rate_cap applies per category within this
+MAX_PENDING = 50
+STATE_CHANGE_CATEGORIES = {"progress"}  # Requirement met and apps resumed, sent once and never capped
+
 class Notifier(QObject):
-    notify_signal: Signal = Signal(str, str)
-    
     def __init__(self, tray: QSystemTrayIcon) -> None:
         super().__init__()
         self._tray = tray
-        self.notify_signal.connect(self._show_message)
-        
-    def _show_message(self, title: str, message: str) -> None:
-        self._tray.showMessage(title, message)
-    
-    def notify(self, title: str, message: str) -> None:
-        self.notify_signal.emit(title, message)
\ No newline at end of file
+
+        # Callers on any thread only queue, the timer shows batched messages from the GUI thread
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str, str], int] = {}  # (category, title, message) -> how many times it was sent
+        self._sent: Dict[str, Deque[float]] = defaultdict(deque)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._drain)
+        self._timer.start(int(settings.data["notification_window"] * 1000))
+
+    def notify(self, title: str, message: str, category: str = "general") -> None:
+        # Only identical messages are merged, two sweeps blocking different apps are both shown
+        key = (category, title, message)
+        with self._lock:
+            if key in self._pending:
+                self._pending[key] += 1
+                NOTIFICATIONS_SUPPRESSED.inc(category=category, reason="duplicate")
+            elif len(self._pending) >= MAX_PENDING and category not in STATE_CHANGE_CATEGORIES:
+                NOTIFICATIONS_SUPPRESSED.inc(category=category, reason="overflow")
+            else:
+                self._pending[key] = 1
+
+    def _drain(self) -> None:
+        self._timer.setInterval(int(settings.data["notification_window"] * 1000))
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+
+        now = time.monotonic()
+        rate_cap = settings.data["notification_rate_cap"]
+        for (category, title, message), count in pending.items():
+            sent = self._sent[category]
+            while sent and sent[0] < now - RATE_WINDOW:
+                sent.popleft()
+            if len(sent) >= rate_cap and category not in STATE_CHANGE_CATEGORIES:
+                NOTIFICATIONS_SUPPRESSED.inc(count, category=category, reason="rate_limited")
+                continue
+
+            sent.append(now)
+            NOTIFICATIONS.inc(category=category)
+            self._tray.showMessage(f"{title.rstrip(':.')} ×{count}" if count > 1 else title, message)
@@ -0,0 +1,50 @@
+from collections import deque
+import threading
+import time
+from typing import Callable, Deque, Tuple
+
+MIN_POLL_INTERVAL = 60  # sec
+RATE_WINDOW = 15 * 60  # sec
+MAX_CODING_RATE = 1.0  # coded seconds per wall-clock second
+
+class PollScheduler:
+    def __init__(self, min_interval: float = MIN_POLL_INTERVAL, rate_window: float = RATE_WINDOW, clock: Callable[[], float] = time.monotonic) -> None:
+        self.min_interval = min_interval
+        self.rate_window = rate_window
+        self.clock = clock
+        self._samples: Deque[Tuple[float, int]] = deque()  # (monotonic time, seconds coded)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: int, now: float | None = None) -> None:
+        now = self.clock() if now is None else now
+        with self._lock:
+            if self._samples and seconds < self._samples[-1][1]:  # Midnight reset
+                self._samples.clear()
+            self._samples.append((now, seconds))
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.rate_window:
+                self._samples.popleft()
+
+    def coding_rate(self) -> float:
+        with self._lock:
+            if len(self._samples) < 2:
+                return 0.0
+            (start_time, start_seconds), (end_time, end_seconds) = self._samples[0], self._samples[-1]
+
+        if end_time <= start_time:
+            return 0.0
+        return max(0.0, (end_seconds - start_seconds) / (end_time - start_time))
+
+    def next_delay(self, seconds: int, required_seconds: int, max_latency: float) -> float:
+        remaining = required_seconds - seconds
+        if remaining <= 0:
+            return self.min_interval
+
+        # The goal can't be crossed before `earliest`, so polling sooner only wastes calls.
+        # Polling no later than `earliest + max_latency` bounds how long apps stay blocked after it is.
+        earliest = remaining / MAX_CODING_RATE
+        latest = earliest + max_latency
+
+        rate = self.coding_rate()
+        predicted = remaining / rate if rate > 0 else latest
+
+        return max(self.min_interval, min(max(predicted, earliest), latest))
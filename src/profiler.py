@@ -0,0 +1,239 @@
+import atexit
+from collections import defaultdict
+from datetime import datetime
+import logging
+import marshal
+from pathlib import Path
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from types import CodeType, FrameType
+from typing import IO, Dict, Iterable, List, Tuple
+
+from .utils import get_app_path, timestamped_print
+
+SAMPLE_INTERVAL = 0.01  # sec
+TRACEMALLOC_FRAMES = 1  # Allocators are reported by line, deeper tracebacks only slow every allocation down
+TOP_FUNCTIONS = 25
+TOP_ALLOCATORS = 25
+
+FunctionKey = Tuple[str, int, str]  # (file, first line, name), the key pstats uses
+
+def _thread_clock(native_id: int) -> int:
+    # The kernel's per-thread CPU clock id, what pthread_getcpuclockid returns. Unlike that call it's
+    # safe for threads that already exited, clock_gettime just fails with EINVAL
+    return (~native_id << 3) | 6
+
+def _thread_cpu_times(threads: Iterable[threading.Thread]) -> Dict[int, float] | None:
+    if sys.platform.startswith("linux"):
+        times = {}
+        for thread in threads:
+            if thread.native_id is None:
+                continue
+            try:
+                times[thread.native_id] = time.clock_gettime(_thread_clock(thread.native_id))
+            except OSError:
+                pass
+        return times
+
+    import psutil  # Only needed without per-thread clocks, keeps it off the import path elsewhere
+
+    try:
+        return {t.id: t.user_time + t.system_time for t in psutil.Process().threads()}
+    except psutil.Error:
+        return None
+
+class ThreadProfile:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.samples = 0
+        self.cpu_seconds = 0.0
+        self.functions: Dict[FunctionKey, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])  # [samples, self, cumulative]
+        self.callers: Dict[FunctionKey, Dict[FunctionKey, List[float]]] = defaultdict(lambda: defaultdict(lambda: [0, 0.0]))
+
+    def add(self, stack: List[FunctionKey], weight: float) -> None:
+        # stack runs from the executing function outwards, recursion only counts once towards cumulative time
+        self.samples += 1
+        self.cpu_seconds += weight
+        self.functions[stack[0]][1] += weight
+
+        seen = set()
+        for callee, caller in zip(stack, stack[1:] + [None]):
+            if (callee, caller) in seen:
+                continue
+            if callee not in seen:
+                entry = self.functions[callee]
+                entry[0] += 1
+                entry[2] += weight
+                seen.add(callee)
+            if caller is not None:
+                edge = self.callers[callee][caller]
+                edge[0] += 1
+                edge[1] += weight
+                seen.add((callee, caller))
+
+    def dump(self, path: Path) -> None:
+        # The layout pstats.Stats loads, so the file opens in snakeviz or python -m pstats
+        stats = {
+            func: (int(hits), int(hits), self_seconds, cumulative, {
+                caller: (int(edge_hits), int(edge_hits), 0.0, edge_seconds)
+                for caller, (edge_hits, edge_seconds) in self.callers[func].items()
+            })
+            for func, (hits, self_seconds, cumulative) in self.functions.items()
+        }
+        with open(path, "wb") as f:
+            marshal.dump(stats, f)
+
+class Profiler:
+    def __init__(self) -> None:
+        self.enabled = False  # Nothing is hooked until start(), the sampler thread is all profiling adds
+        self.last_report: Path | None = None
+
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._profiles: Dict[str, ThreadProfile] = {}
+        self._code_keys: Dict[CodeType, FunctionKey] = {}
+
+    def start(self, duration: float = 0, directory: Path | None = None) -> bool:
+        with self._lock:
+            if self.enabled:
+                return False
+
+            self._stop_event.clear()
+            self._profiles = {}
+            self._code_keys = {}
+            self._thread = threading.Thread(
+                target=self._sample_loop, args=(duration, directory or get_app_path()), name="profiler", daemon=True
+            )
+            self.enabled = True
+            self._thread.start()
+
+        atexit.register(self.stop)
+        logging.info(f"Profiling every thread{f' for {duration:g}s' if duration else ''}")
+        timestamped_print(f"🔬 Profiling every thread{f' for {duration:g}s' if duration else ''}...")
+        return True
+
+    def stop(self) -> Path | None:
+        # Waits for the report, returns where it went or None if it couldn't be written
+        with self._lock:
+            thread = self._thread
+            self._stop_event.set()
+        if thread is not None:
+            thread.join()
+        return self.last_report
+
+    # INTERNAL HELPERS
+    def _sample_loop(self, duration: float, directory: Path) -> None:
+        started_at = datetime.now()
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        process_cpu, sampler_cpu = time.process_time(), time.thread_time()
+        deadline = time.monotonic() + duration if duration else None
+
+        own_ident = threading.get_ident()
+        last_cpu: Dict[int, float] = {}
+        next_sample_at = time.monotonic()
+        try:
+            while not self._stop_event.wait(max(0.0, next_sample_at - time.monotonic())):
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                # Falling behind skips samples instead of taking a burst of them
+                next_sample_at = max(next_sample_at + SAMPLE_INTERVAL, now)
+
+                self._sample(own_ident, last_cpu)
+        finally:
+            snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+            if started_tracing:
+                tracemalloc.stop()
+
+            self.last_report = self._write_report(
+                directory, started_at, time.process_time() - process_cpu, time.thread_time() - sampler_cpu, snapshot
+            )
+            with self._lock:
+                self._thread = None
+                self.enabled = False
+
+    def _sample(self, own_ident: int, last_cpu: Dict[int, float]) -> None:
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        cpu = _thread_cpu_times(threads.values())
+        for ident, frame in sys._current_frames().items():
+            thread = threads.get(ident)
+            if ident == own_ident or thread is None:
+                continue
+
+            # Each sample carries the CPU the thread used since the last one, so threads parked
+            # in a wait add nothing however often they're seen there
+            if cpu is None or thread.native_id not in cpu:
+                weight = SAMPLE_INTERVAL
+            else:
+                weight = max(0.0, cpu[thread.native_id] - last_cpu.get(thread.native_id, cpu[thread.native_id]))
+                last_cpu[thread.native_id] = cpu[thread.native_id]
+
+            if (profile := self._profiles.get(thread.name)) is None:
+                profile = self._profiles[thread.name] = ThreadProfile(thread.name)
+            profile.add(self._stack(frame), weight)
+
+    def _stack(self, frame: FrameType | None) -> List[FunctionKey]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            if (key := self._code_keys.get(code)) is None:
+                key = self._code_keys[code] = (code.co_filename, code.co_firstlineno, code.co_qualname)
+            stack.append(key)
+            frame = frame.f_back
+        return stack
+
+    def _write_report(
+        self, directory: Path, started_at: datetime, process_cpu: float, sampler_cpu: float,
+        snapshot: tracemalloc.Snapshot | None
+    ) -> Path | None:
+        prefix = f"hackablock-profile-{started_at:%Y%m%d-%H%M%S}"
+        path = directory / f"{prefix}.txt"
+        try:
+            profiles = sorted(self._profiles.values(), key=lambda p: p.cpu_seconds, reverse=True)
+            stats_paths = {}
+            for profile in profiles:
+                stats_paths[profile.name] = directory / f"{prefix}-{re.sub(r'[^\w.-]+', '_', profile.name).strip('_')}.prof"
+                profile.dump(stats_paths[profile.name])
+
+            with open(path, "w", encoding="utf-8") as f:
+                elapsed = (datetime.now() - started_at).total_seconds()
+                f.write(f"hackablock profile, {started_at:%Y-%m-%d %H:%M:%S}, {elapsed:.1f}s\n")
+                f.write(f"Sampled every {SAMPLE_INTERVAL * 1000:g}ms. Function times are the CPU each thread used between samples.\n\n")
+                f.write(f"Process CPU: {process_cpu:.3f}s, {sampler_cpu:.3f}s of it taking samples\n")
+                for profile in profiles:
+                    f.write(f"  {profile.name:<32} {profile.cpu_seconds:8.3f}s  {profile.samples:6} samples  {stats_paths[profile.name].name}\n")
+
+                for profile in profiles:
+                    if profile.cpu_seconds > 0:
+                        f.write(f"\n== {profile.name} ==\n")
+                        pstats.Stats(str(stats_paths[profile.name]), stream=f).sort_stats("tottime").print_stats(TOP_FUNCTIONS)
+
+                if snapshot is not None:
+                    self._write_allocators(f, snapshot)
+        except OSError as e:
+            logging.error(f"Failed to write profile to {directory}: {e}")
+            timestamped_print(f"❌ Could not write profile: {e}")
+            return None
+
+        logging.info(f"Profile written to {path}")
+        timestamped_print(f"📄 Profile written to {path}")
+        return path
+
+    def _write_allocators(self, f: IO[str], snapshot: tracemalloc.Snapshot) -> None:
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        f.write("\n== Top allocators (allocated while profiling and still live) ==\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATORS]:
+            frame = stat.traceback[0]
+            f.write(f"  {stat.size / 1024:10.1f} KiB {stat.count:8} blocks  {frame.filename}:{frame.lineno}\n")
+
+profiler = Profiler()
@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple, TypeVar
+
+from .coding_time_tracker import CodingTimeTracker
+from .hackatime_client import HackatimeClient, RateLimiter
+from .poll_scheduler import PollScheduler
+from .settings import Profile, SettingsSnapshot, settings
+from .trace_recorder import trace_recorder
+
+SEAT_FILE = "/run/systemd/seats/seat0"
+ACTIVE_USER_TTL = 5  # sec, session switches show up within it
+
+T = TypeVar("T")
+
+class ProfileState:
+    def __init__(self, profile: Profile, client: HackatimeClient, clock: Callable[[], float] = time.monotonic) -> None:
+        self.profile = profile
+        self.tracker = CodingTimeTracker(client, profile=profile.name)
+        self.scheduler = PollScheduler(clock=clock)
+        self.met = False
+        self.next_poll_at = 0.0  # monotonic
+
+class ProfileRegistry:
+    def __init__(self, client: HackatimeClient | None = None, clock: Callable[[], float] = time.monotonic) -> None:
+        self._lock = threading.Lock()
+        self._version = -1
+        self._index: Tuple[Tuple[ProfileState, ...], Dict[str, ProfileState]] = ((), {})  # (states, user -> state)
+        self._client = client
+        self._clock = clock
+        self._pool: ThreadPoolExecutor | None = None
+        self._active_user: Tuple[float, str | None] = (0.0, None)  # (expires at, user)
+        self._user_names: Dict[int, str | None] = {}
+
+    @property
+    def client(self) -> HackatimeClient:
+        # Shared by every profile, so the rate limit and circuit breaker cover all requests to Hackatime
+        with self._lock:
+            if self._client is None:
+                self._client = HackatimeClient(
+                    pool_size=settings.data["fetch_workers"],
+                    rate_limiter=RateLimiter(settings.data["fetch_rate_limit"], burst=settings.data["fetch_workers"])
+                )
+            return self._client
+
+    @property
+    def primary(self) -> ProfileState:
+        # The first profile also owns the window, heartbeat receiver and history
+        return self.states()[0]
+
+    def states(self) -> Tuple[ProfileState, ...]:
+        snapshot = settings.snapshot()
+        if snapshot.version != self._version:
+            self._sync(snapshot)
+        return self._index[0]
+
+    def all_met(self) -> bool:
+        return all(state.met for state in self.states())
+
+    def map(self, fn: Callable[[ProfileState], T], states: Sequence[ProfileState]) -> List[T]:
+        # Profiles are fetched side by side, the client's rate limiter keeps the total request rate in check
+        if len(states) <= 1:
+            return [fn(state) for state in states]
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=settings.data["fetch_workers"], thread_name_prefix="profile")
+            pool = self._pool
+        return list(pool.map(fn, states))
+
+    def enforced_profile(self, pid: int) -> Profile | None:
+        # The profile whose rules apply to pid, or None when its requirement is met.
+        # The owner is only looked up when there's more than one profile to choose from.
+        return self.enforced_profile_for_user(self.process_user(pid) if len(self.states()) > 1 else None)
+
+    def enforced_profile_for_user(self, user: str | None) -> Profile | None:
+        self.states()
+        states, by_user = self._index
+        if len(states) == 1:
+            state = states[0]
+        else:
+            state = by_user.get(user) or by_user.get(self.active_user()) or states[0]
+        return None if state.met else state.profile
+
+    def active_user(self) -> str | None:
+        expires_at, user = self._active_user
+        if time.monotonic() < expires_at:
+            return user
+
+        previous, user = user, self._read_active_user()
+        self._active_user = (time.monotonic() + ACTIVE_USER_TTL, user)
+        if trace_recorder.enabled and user != previous:
+            trace_recorder.session(user)
+        return user
+
+    def set_active_user(self, user: str | None) -> None:
+        # Pins the active session instead of reading it from the system, for trace replay
+        self._active_user = (math.inf, user)
+
+    def process_user(self, pid: int) -> str | None:
+        if sys.platform.startswith("linux"):
+            try:
+                return self._user_name(os.stat(f"/proc/{pid}").st_uid)
+            except OSError:
+                return None
+
+        import psutil  # Only needed without /proc, keeps it off the import path elsewhere
+
+        try:
+            return psutil.Process(pid).username().rpartition("\\")[2].lower()  # Windows reports DOMAIN\user
+        except psutil.Error:
+            return None
+
+    def reset(self, client: HackatimeClient | None = None, clock: Callable[[], float] = time.monotonic) -> None:
+        # Drops every profile's state, so a trace replay starts from a clean slate
+        self.close()
+        with self._lock:
+            self._client = client
+            self._clock = clock
+            self._version = -1
+            self._index = ((), {})
+            self._active_user = (0.0, None)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    # INTERNAL HELPERS
+    def _sync(self, snapshot: SettingsSnapshot) -> None:
+        client = self.client
+        with self._lock:
+            if snapshot.version == self._version:
+                return
+
+            # Trackers outlive settings edits, so totals and poll schedules carry over by profile name
+            existing = {state.profile.name: state for state in self._index[0]}
+            states = []
+            for profile in snapshot.profiles:
+                if state := existing.get(profile.name):
+                    state.profile = profile
+                else:
+                    state = ProfileState(profile, client, self._clock)
+                states.append(state)
+
+            by_user = {user: state for state in states for user in state.profile.users}
+            self._index = (tuple(states), by_user)
+            self._version = snapshot.version
+
+        if len(states) > 1:
+            logging.info(f"Loaded {len(states)} profiles: {', '.join(state.profile.name for state in states)}")
+
+    def _read_active_user(self) -> str | None:
+        if sys.platform.startswith("linux"):
+            try:
+                with open(SEAT_FILE) as f:
+                    for line in f:
+                        if line.startswith("ACTIVE_UID="):
+                            return self._user_name(int(line.split("=", 1)[1]))
+            except (OSError, ValueError):
+                pass
+
+        import psutil
+
+        try:
+            sessions = psutil.users()
+        except Exception as e:
+            logging.debug(f"Could not list login sessions: {e}")
+            return None
+        # Without a seat manager, the most recent login stands in for the active session
+        return max(sessions, key=lambda s: s.started).name.lower() if sessions else None
+
+    def _user_name(self, uid: int) -> str | None:
+        if uid not in self._user_names:
+            import pwd
+
+            try:
+                self._user_names[uid] = pwd.getpwuid(uid).pw_name.lower()
+            except KeyError:
+                self._user_names[uid] = None
+        return self._user_names[uid]
+
+profiles = ProfileRegistry()
@@ -1,36 +1,206 @@
+import atexit
+from dataclasses import dataclass
 import json
 import logging
-from typing import Callable, Dict, Hashable
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Tuple
 
+from .block_rules import BlockRuleIndex
+from .trace_recorder import trace_recorder
 from .utils import get_app_path
 
 SETTINGS_FILE = get_app_path() / "hackablock.json"
+SAVE_DEBOUNCE = 0.5  # sec
+DEFAULT_PROFILE = "default"
+
+def _is_profile(v: Any) -> bool:
+    # Keys a profile leaves out fall back to the top-level setting of the same name
+    return (
+        isinstance(v, dict) and isinstance(v.get("name"), str) and bool(v["name"].strip())
+        and isinstance(v.get("hackatime_api_key"), str)
+        and all(VALIDATION_RULES[key](v[key]) for key in ("minutes_required", "blocked_apps") if key in v)
+        and isinstance(v.get("users", []), list) and all(isinstance(u, str) for u in v.get("users", []))
+    )
 
 VALIDATION_RULES: Dict[str, Callable] = {
     "hackatime_api_key": lambda v: isinstance(v, str),
-    "minutes_required": lambda v: isinstance(v, int) and 1 <= v <= 720
+    "blocked_apps": lambda v: isinstance(v, list) and all(isinstance(a, str) for a in v),
+    "minutes_required": lambda v: isinstance(v, int) and 1 <= v <= 720,
+    "process_poll_interval": lambda v: isinstance(v, (int, float)) and 0.1 <= v <= 60,
+    "fetch_cache_ttl": lambda v: isinstance(v, (int, float)) and 0 <= v <= 600,
+    "max_unblock_latency": lambda v: isinstance(v, int) and 10 <= v <= 3600,
+    "heartbeat_server_enabled": lambda v: isinstance(v, bool),
+    "heartbeat_server_port": lambda v: isinstance(v, int) and 1024 <= v <= 65535,
+    "enforcement_mode": lambda v: v in ("kill", "suspend"),
+    "kill_respawning_parents": lambda v: isinstance(v, bool),
+    "respawning_launchers": lambda v: isinstance(v, list) and all(isinstance(a, str) for a in v),
+    "notification_window": lambda v: isinstance(v, (int, float)) and 0.1 <= v <= 60,
+    "notification_rate_cap": lambda v: isinstance(v, int) and 1 <= v <= 60,
+    "log_format": lambda v: v in ("text", "json"),
+    "log_max_bytes": lambda v: isinstance(v, int) and 64 * 1024 <= v <= 1024 ** 3,
+    "log_backups": lambda v: isinstance(v, int) and 0 <= v <= 50,
+    "metrics_port": lambda v: isinstance(v, int) and (v == 0 or 1024 <= v <= 65535),
+    "metrics_snapshot_interval": lambda v: isinstance(v, (int, float)) and (v == 0 or 5 <= v <= 3600),
+    "window_idle_timeout": lambda v: isinstance(v, int) and (v == 0 or 10 <= v <= 86400),
+    "exec_guard_enabled": lambda v: isinstance(v, bool),
+    "profiles": lambda v: isinstance(v, list) and all(_is_profile(p) for p in v) and len({p["name"] for p in v}) == len(v),
+    "fetch_workers": lambda v: isinstance(v, int) and 1 <= v <= 32,
+    "fetch_rate_limit": lambda v: isinstance(v, (int, float)) and 0.1 <= v <= 100
 }
 
 DEFAULTS: Dict = {
     "hackatime_api_key": "",
     "blocked_apps": ["steam.exe"],
     "minutes_required": 60,
+    "process_poll_interval": 1.0,
+    "fetch_cache_ttl": 15,
+    "max_unblock_latency": 120,
+    "heartbeat_server_enabled": False,
+    "heartbeat_server_port": 5293,
+    "enforcement_mode": "kill",  # "suspend" freezes blocked apps and resumes them once the requirement is met
+    "kill_respawning_parents": False,
+    "respawning_launchers": [],  # Parents that may be killed for respawning a blocked app, by process name
+    "notification_window": 2.0,  # sec, notifications within it are batched into one
+    "notification_rate_cap": 4,  # notifications per category per minute
+    "log_format": "text",  # "json" writes one JSON object per line
+    "log_max_bytes": 5 * 1024 * 1024,
+    "log_backups": 3,
+    "metrics_port": 0,  # Prometheus endpoint on localhost, 0 disables it
+    "metrics_snapshot_interval": 60,  # sec between hackablock-metrics.json writes, 0 disables them
+    "window_idle_timeout": 300,  # sec the closed window is kept before it's torn down, 0 keeps it for the session
+    "exec_guard_enabled": True,  # Linux as root: deny blocked execs through fanotify before they start
+    "profiles": [],  # Per-user keys, requirements and block lists, empty applies the settings above to everyone
+    "fetch_workers": 4,  # Profiles fetched at once
+    "fetch_rate_limit": 5,  # Hackatime requests per second across all profiles
 }
 
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    api_key: str
+    minutes_required: int
+    blocked_apps: Tuple[str, ...]
+    users: Tuple[str, ...]  # Lowercased login names whose processes and sessions it covers
+    block_rules: BlockRuleIndex
+
+    @property
+    def required_seconds(self) -> int:
+        return self.minutes_required * 60
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    version: int
+    data: Mapping[str, Any]
+    block_rules: BlockRuleIndex
+    profiles: Tuple[Profile, ...]
+
+def _build_profiles(data: Mapping[str, Any], block_rules: BlockRuleIndex) -> Tuple[Profile, ...]:
+    if not data["profiles"]:
+        return (Profile(DEFAULT_PROFILE, data["hackatime_api_key"], data["minutes_required"], data["blocked_apps"], (), block_rules),)
+
+    profiles = []
+    for p in data["profiles"]:
+        # Profiles sharing the top-level block list share its index too
+        blocked_apps = tuple(p["blocked_apps"]) if "blocked_apps" in p else data["blocked_apps"]
+        profiles.append(Profile(
+            p["name"].strip(),
+            p["hackatime_api_key"],
+            p.get("minutes_required", data["minutes_required"]),
+            blocked_apps,
+            tuple(u.lower() for u in p.get("users", [])),
+            block_rules if blocked_apps == data["blocked_apps"] else BlockRuleIndex(blocked_apps)
+        ))
+    return tuple(profiles)
+
+def _frozen(value: Any) -> Any:
+    # Snapshots are shared between threads without locking, so nothing in them, profiles included, may be mutable
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _frozen(v) for key, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+def _thawed(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _thawed(v) for key, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thawed(v) for v in value]
+    return value
+
+def _freeze(data: Mapping[str, Any], version: int) -> SettingsSnapshot:
+    frozen = _frozen(data)
+    block_rules = BlockRuleIndex(frozen["blocked_apps"])
+    return SettingsSnapshot(version, frozen, block_rules, _build_profiles(frozen, block_rules))
+
 class Settings:
     def __init__(self) -> None:
-        self.data = DEFAULTS.copy()
-        self._load()
+        self._write_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_requested = threading.Event()
+        self._saved_version = 0
+        self._writer: threading.Thread | None = None
+        
+        self._snapshot: SettingsSnapshot = _freeze(self._load(), 0)
+    
+    # Readers grab the current snapshot with a single attribute read, writers swap in a new one
+    @property
+    def data(self) -> Mapping[str, Any]:
+        return self._snapshot.data
+    
+    @property
+    def block_rules(self) -> BlockRuleIndex:
+        return self._snapshot.block_rules
+    
+    @property
+    def profiles(self) -> Tuple[Profile, ...]:
+        return self._snapshot.profiles
+    
+    def snapshot(self) -> SettingsSnapshot:
+        return self._snapshot
     
     def save(self) -> None:
-        try:
-            SETTINGS_FILE.write_text(json.dumps(self.data, indent=2))
-        except Exception as e:
-            logging.error(f"Failed to save settings: {e}")
+        # Saves come from the control socket, the GUI and the logic thread, only one of them may start the writer
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        self._save_requested.set()
     
-    def _load(self) -> None:
+    def flush(self) -> None:
+        self._write(self._snapshot)
+    
+    def _write_loop(self) -> None:
+        while True:
+            self._save_requested.wait()
+            # Debounce bursts of edits into a single write
+            while self._save_requested.is_set():
+                self._save_requested.clear()
+                time.sleep(SAVE_DEBOUNCE)
+            self._write(self._snapshot)
+    
+    def _write(self, snapshot: SettingsSnapshot) -> None:
+        with self._save_lock:
+            if snapshot.version <= self._saved_version:
+                return
+            
+            tmp_path = SETTINGS_FILE.with_suffix(".json.tmp")
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(_thawed(snapshot.data), f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, SETTINGS_FILE)
+                self._saved_version = snapshot.version
+            except Exception as e:
+                logging.error(f"Failed to save settings: {e}")
+    
+    def _load(self) -> Dict[str, Any]:
         if not SETTINGS_FILE.exists():
-            return
+            return DEFAULTS.copy()
         
         try:
             data = json.loads(SETTINGS_FILE.read_text())
@@ -38,8 +208,7 @@ class Settings:
                 raise ValueError("Settings file is not a dict")
         except Exception as e:
             logging.warning(f"Failed to load settings: {e}. Using default values.")
-            self.data = DEFAULTS.copy()
-            return
+            return DEFAULTS.copy()
         
         validated = {}
         for key, default_value in DEFAULTS.items():
@@ -50,9 +219,25 @@ class Settings:
                 value = default_value
             validated[key] = value
         
-        self.data = validated
+        return validated
+    
+    def update_setting(self, key: str, value: Any) -> None:
+        self.update_settings({key: value})
+    
+    def update_settings(self, values: Mapping[str, Any]) -> None:
+        self.update(lambda _: values)
     
-    def update_setting(self, key: str, value: Hashable) -> None:
-        self.data[key] = value
+    def update(self, change: Callable[[Mapping[str, Any]], Mapping[str, Any] | None]) -> Mapping[str, Any] | None:
+        # Read-modify-write: change() gets the current data under the write lock and returns the values to set,
+        # or None to leave everything as it is. Returns what it set
+        with self._write_lock:
+            current = self._snapshot
+            values = change(current.data)
+            if values is None:
+                return None
+            self._snapshot = _freeze({**current.data, **values}, current.version + 1)
+        if trace_recorder.enabled:
+            trace_recorder.settings_changed(values)
+        return values
 
 settings = Settings()
\ No newline at end of file
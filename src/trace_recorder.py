@@ -0,0 +1,135 @@
+import atexit
+from datetime import datetime
+import json
+import logging
+import os
+from pathlib import Path
+import queue
+import sys
+import threading
+import time
+from typing import IO, TYPE_CHECKING, Any, Dict, Mapping, Sequence
+
+from .utils import get_app_path
+
+if TYPE_CHECKING:
+    from .settings import Profile
+
+TRACE_VERSION = 1
+REDACTED = "<redacted>"
+
+def default_trace_path() -> Path:
+    return get_app_path() / f"hackablock-trace-{datetime.now():%Y%m%d-%H%M%S}.jsonl"
+
+def _redact(values: Mapping[str, Any]) -> Dict[str, Any]:
+    # Traces get attached to bug reports, so API keys never reach the file
+    redacted = {}
+    for key, value in values.items():
+        if key == "hackatime_api_key" and value:
+            value = REDACTED
+        elif key == "profiles":
+            value = [{**p, "hackatime_api_key": REDACTED} for p in value]
+        elif isinstance(value, tuple):
+            value = list(value)
+        redacted[key] = value
+    return redacted
+
+class TraceRecorder:
+    def __init__(self) -> None:
+        self.enabled = False  # Checked by callers before building a record, so tracing costs one attribute read when off
+        self.path: Path | None = None
+
+        self._queue: queue.SimpleQueue[Dict[str, Any] | None] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._started_at = 0.0
+
+    def start(self, path: Path, settings_data: Mapping[str, Any]) -> None:
+        f = open(path, "w", encoding="utf-8")
+        f.write(json.dumps({"version": TRACE_VERSION, "started_at": datetime.now().isoformat(), "platform": sys.platform}) + "\n")
+
+        self.path = path
+        self._started_at = time.monotonic()
+        self._writer = threading.Thread(target=self._write_loop, args=(f,), name="trace-writer", daemon=True)
+        self._writer.start()
+        self.enabled = True
+        atexit.register(self.stop)
+
+        self.settings_changed(settings_data)
+        logging.info(f"Recording trace to {path}")
+
+    def stop(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._queue.put(None)
+        if self._writer:
+            self._writer.join(timeout=5)
+            self._writer = None
+
+    def process(
+        self, source: str, pid: int, name: str, profile: "Profile | None", blocked: bool,
+        exe: str | None = None, cmdline: Sequence[str] | str | None = None
+    ) -> None:
+        # Imported on use, settings imports this module and both of these import settings
+        from .profiles import profiles
+        from .watchers.procfs import get_process_cmdline, get_process_exe
+
+        # Whatever the watcher didn't read itself is taken from /proc, so the replayer can match every rule type
+        if sys.platform.startswith("linux"):
+            exe = get_process_exe(pid) if exe is None else exe
+            cmdline = get_process_cmdline(pid) if cmdline is None else cmdline
+        self._emit("process", {
+            "source": source, "pid": pid, "name": name, "user": profiles.process_user(pid), "exe": exe,
+            "cmdline": list(cmdline) if isinstance(cmdline, (list, tuple)) else cmdline,
+            "profile": profile.name if profile else None, "blocked": blocked,
+        })
+
+    def fetch(self, profile: str | None, seconds: int | None = None, error: str | None = None) -> None:
+        self._emit("fetch", {"profile": profile, "seconds": seconds, "error": error})
+
+    def settings_changed(self, values: Mapping[str, Any]) -> None:
+        self._emit("settings", {"values": _redact(values)})
+
+    def session(self, user: str | None) -> None:
+        self._emit("session", {"user": user})
+
+    def heartbeat(self, seconds: int) -> None:
+        self._emit("heartbeat", {"seconds": seconds})
+
+    def restore(self, seconds: int) -> None:
+        self._emit("restore", {"seconds": seconds})
+
+    # INTERNAL HELPERS
+    def _emit(self, kind: str, fields: Dict[str, Any]) -> None:
+        record = {"t": round(time.monotonic() - self._started_at, 4), "kind": kind}
+        record.update((key, value) for key, value in fields.items() if value is not None)
+        self._queue.put(record)
+
+    def _write_loop(self, f: IO[str]) -> None:
+        # Records are encoded here rather than by the watchers, and written out in batches
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                for record in batch:
+                    if record is None:
+                        return
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                f.flush()
+        except (OSError, TypeError, ValueError) as e:
+            self.enabled = False
+            logging.error(f"Trace recording stopped: {e}")
+        finally:
+            try:
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                pass
+            f.close()
+
+trace_recorder = TraceRecorder()
@@ -0,0 +1,155 @@
+from contextlib import redirect_stdout
+from dataclasses import dataclass, field
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Any, Dict, Iterator, List
+
+from .daemon import Daemon
+from .hackatime_client import BACKOFF_BASE
+from .hackatime_error import HackatimeError
+from .profiles import profiles
+from .settings import settings
+from .trace_recorder import TRACE_VERSION
+
+MAX_REPORTED_MISMATCHES = 50
+
+@dataclass
+class ReplayReport:
+    events: int = 0
+    processes: int = 0
+    fetches: int = 0
+    skipped: int = 0  # Blocks decided by a sha256: rule, the trace doesn't carry digests
+    mismatch_count: int = 0
+    mismatches: List[str] = field(default_factory=list)
+    virtual_seconds: float = 0.0
+    wall_seconds: float = 0.0
+
+    @property
+    def speedup(self) -> float:
+        return self.virtual_seconds / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+class ReplayClient:
+    # Stands in for HackatimeClient, answering each fetch with the response the trace recorded
+    last_latency_ms = 0.0
+
+    def __init__(self) -> None:
+        self.response: Dict[str, Any] | None = None
+
+    def get_json(self, path: str, api_key: str) -> Any:
+        response, self.response = self.response, None
+        if response is None:
+            raise HackatimeError("No recorded response for this fetch")
+        if "error" in response:
+            raise HackatimeError(response["error"])
+        return {"data": {"grand_total": {"total_seconds": response["seconds"]}}}
+
+    def post_json(self, path: str, api_key: str, payload: Any) -> Any:
+        return {}
+
+    def retry_delay(self) -> float:
+        return BACKOFF_BASE
+
+    def close(self) -> None:
+        pass
+
+class TraceReplayer:
+    def __init__(self, path: Path, speed: float = 0) -> None:
+        self.path = path
+        self.speed = speed  # Virtual seconds per wall second, 0 replays as fast as possible
+        self.now = 0.0  # Virtual clock, seconds since recording started
+
+        self._client = ReplayClient()
+        self._daemon: Daemon | None = None
+        self._report = ReplayReport()
+
+    def run(self) -> ReplayReport:
+        original_settings = dict(settings.data)
+        profiles.reset(self._client, clock=lambda: self.now)
+        profiles.set_active_user(None)
+        self._daemon = Daemon()
+
+        # The daemon's progress messages would drown out the report, and the log is left to the real instance
+        logging.disable(logging.INFO)
+        started_at = time.perf_counter()
+        try:
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                for record in self._records():
+                    self._advance(record["t"], started_at)
+                    getattr(self, f"_replay_{record['kind']}", self._replay_unknown)(record)
+                    self._report.events += 1
+        finally:
+            self._report.wall_seconds = time.perf_counter() - started_at
+            self._report.virtual_seconds = self.now
+            logging.disable(logging.NOTSET)
+            settings.update_settings(original_settings)
+            profiles.reset()
+
+        return self._report
+
+    # INTERNAL HELPERS
+    def _records(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("version") != TRACE_VERSION:
+                raise ValueError(f"Unsupported trace version {header.get('version')!r} in {self.path}")
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _advance(self, t: float, started_at: float) -> None:
+        self.now = max(self.now, t)
+        if self.speed > 0 and (ahead := started_at + self.now / self.speed - time.perf_counter()) > 0:
+            time.sleep(ahead)
+
+    def _mismatch(self, message: str) -> None:
+        self._report.mismatch_count += 1
+        if len(self._report.mismatches) < MAX_REPORTED_MISMATCHES:
+            self._report.mismatches.append(f"t={self.now:.3f}s {message}")
+
+    def _replay_settings(self, record: Dict[str, Any]) -> None:
+        # Recorded fetches are real responses, a cache in front of them would swallow some
+        settings.update_settings({**record["values"], "fetch_cache_ttl": 0})
+
+    def _replay_session(self, record: Dict[str, Any]) -> None:
+        profiles.set_active_user(record.get("user"))
+
+    def _replay_restore(self, record: Dict[str, Any]) -> None:
+        self._daemon._apply_restored_progress(record["seconds"])
+
+    def _replay_heartbeat(self, record: Dict[str, Any]) -> None:
+        self._daemon._handle_local_heartbeat(record["seconds"])
+
+    def _replay_fetch(self, record: Dict[str, Any]) -> None:
+        self._report.fetches += 1
+        name = record.get("profile")
+        state = next((s for s in profiles.states() if s.profile.name == name), None)
+        if state is None:
+            self._mismatch(f"fetch for unknown profile {name!r}")
+            return
+
+        self._client.response = record
+        self._daemon._poll_profile(state)
+
+    def _replay_process(self, record: Dict[str, Any]) -> None:
+        self._report.processes += 1
+        profile = profiles.enforced_profile_for_user(record.get("user"))
+        rules = profile.block_rules if profile else None
+        blocked = rules is not None and rules.matches(record["name"], record.get("exe"), record.get("cmdline"))
+
+        expected_profile = record.get("profile")
+        if blocked == record["blocked"] and (profile.name if profile else None) == expected_profile:
+            return
+        if record["blocked"] and not blocked and rules is not None and rules.needs_hash:
+            self._report.skipped += 1
+            return
+
+        self._mismatch(
+            f"{record['source']} pid={record['pid']} {record['name']}: recorded {'blocked' if record['blocked'] else 'allowed'} "
+            f"under {expected_profile}, replayed {'blocked' if blocked else 'allowed'} under {profile.name if profile else None}"
+        )
+
+    def _replay_unknown(self, record: Dict[str, Any]) -> None:
+        logging.warning(f"Skipping unknown trace record kind {record['kind']!r}")
@@ -10,6 +10,8 @@ class Tray(QSystemTrayIcon):
         on_show_blocked_apps: Callable | None = None,
         on_show_settings: Callable | None = None,
         on_show_logs: Callable | None = None,
+        on_toggle_profiling: Callable | None = None,
+        is_profiling: Callable[[], bool] | None = None,
         on_quit: Callable | None = None
     ) -> None:
         super().__init__(QIcon("./assets/favicon.ico"))
@@ -18,6 +20,8 @@ class Tray(QSystemTrayIcon):
         self._on_show_blocked_apps = on_show_blocked_apps
         self._on_show_settings = on_show_settings
         self._on_show_logs = on_show_logs
+        self._on_toggle_profiling = on_toggle_profiling
+        self._is_profiling = is_profiling
         self._on_quit = on_quit
         
         self.setToolTip("Hackablock")
@@ -41,9 +45,16 @@ class Tray(QSystemTrayIcon):
         if show_settings_action := menu.addAction("⚙️ Settings"):
             show_settings_action.triggered.connect(self._on_show_settings)
         
-        if show_logs_action := menu.addAction("📂 Show Logs"):
+        if show_logs_action := menu.addAction("📜 Logs"):
             show_logs_action.triggered.connect(self._on_show_logs)
         
+        if profiling_action := menu.addAction("🔬 Start Profiling"):
+            profiling_action.triggered.connect(self._on_toggle_profiling)
+            # Profiling can also stop on a timer or over the control socket, so the label is refreshed on open
+            menu.aboutToShow.connect(lambda: profiling_action.setText(
+                "⏹️ Stop Profiling" if self._is_profiling and self._is_profiling() else "🔬 Start Profiling"
+            ))
+        
         menu.addSeparator()
         
         if quit_action := menu.addAction("❌ Quit"):
@@ -1,3 +1,4 @@
+import ctypes
 from datetime import datetime, timedelta
 import os
 from pathlib import Path
@@ -47,6 +48,25 @@ def open_folder(path: Path) -> None:
     else:
         subprocess.Popen(["xdg-open", str(path)])    
 
+def get_rss_bytes() -> int | None:
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return None
+
+    import psutil  # /proc is cheaper where it exists
+    return psutil.Process().memory_info().rss
+
+def trim_heap() -> None:
+    # glibc keeps freed pages mapped for reuse, this hands them back so RSS actually drops
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
 def timestamped_print(msg: str) -> None:
     time_str = datetime.now().strftime("%H:%M:%S")
     print(f"[{time_str}] {msg}")
@@ -0,0 +1,487 @@
+from collections import defaultdict, deque
+import json
+import logging
+import os
+from pathlib import Path
+import signal
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Set, Tuple
+
+from ..metrics import ENFORCEMENT_LATENCY, PROCESSES_BLOCKED, RESPAWN_STORMS
+from ..settings import settings
+from ..utils import get_app_path, timestamped_print
+from . import procfs
+
+if TYPE_CHECKING:
+    from ..notifier import Notifier
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+FREEZER_CGROUP = CGROUP_ROOT / "hackablock.frozen"
+FROZEN_FILE = get_app_path() / "hackablock-frozen.json"  # What's frozen, so a crashed run's leftovers can be resumed
+TERMINATE_TIMEOUT = 3  # sec, processes still alive after SIGTERM get SIGKILL
+
+STORM_WINDOW = 10  # sec
+STORM_THRESHOLD = 5  # kills of one app within STORM_WINDOW
+PARENT_REPEAT = 3  # respawns by the same parent during a storm before it's killed too
+REPORT_BACKOFF_BASE = 5  # sec
+REPORT_BACKOFF_MAX = 5 * 60  # sec
+PROTECTED_PARENTS = {
+    "systemd", "init", "launchd", "explorer.exe", "services.exe", "svchost.exe", "wininit.exe",
+    "sshd", "login", "gdm", "sddm", "lightdm", "xorg", "xwayland", "gnome-shell", "plasmashell", "kwin_x11", "kwin_wayland"
+}
+
+class ProcessFreezer:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._frozen: Dict[int, Tuple[float | None, str, str | None]] = {}  # pid -> (start time, name, original cgroup)
+        self._cgroup: Path | None = None
+        self._cgroup_checked = False
+
+    def is_frozen(self, pid: int) -> bool:
+        return pid in self._frozen
+
+    def frozen_names(self) -> List[str]:
+        with self._lock:
+            return sorted({name for _, name, _ in self._frozen.values()})
+
+    def freeze(self, pid: int, name: str) -> None:
+        # The whole tree is stopped, launchers often keep the real work in child processes
+        with self._lock:
+            for tree_pid in [pid, *self._descendants(pid)]:
+                if tree_pid in self._frozen:
+                    continue
+                try:
+                    start_time, original_cgroup = self._freeze_one(tree_pid)
+                except (ProcessLookupError, PermissionError):
+                    if tree_pid == pid:
+                        raise
+                    continue
+                self._frozen[tree_pid] = (start_time, name, original_cgroup)
+            self._save()
+
+            if self._cgroup:
+                (self._cgroup / "cgroup.freeze").write_text("1")
+
+    def resume_all(self) -> List[str]:
+        return self.resume()
+
+    def resume(self, should_resume: Callable[[int], bool] | None = None) -> List[str]:
+        with self._lock:
+            if should_resume is None:
+                frozen, self._frozen = self._frozen, {}
+            else:
+                frozen = {pid: entry for pid, entry in self._frozen.items() if should_resume(pid)}
+                for pid in frozen:
+                    del self._frozen[pid]
+            if not frozen:
+                return []
+
+            # Moving a process out of the frozen cgroup thaws it, the cgroup itself stays frozen for the rest
+            if self._cgroup and not self._frozen:
+                try:
+                    (self._cgroup / "cgroup.freeze").write_text("0")
+                except OSError as e:
+                    logging.error(f"Failed to thaw {self._cgroup}: {e}")
+
+            # One pid failing never holds up the rest, the ones that failed stay frozen and are retried next time
+            resumed, failed = set(), 0
+            for pid, entry in frozen.items():
+                start_time, name, original_cgroup = entry
+                try:
+                    self._resume_one(pid, start_time, original_cgroup)
+                    resumed.add(name)
+                except ProcessLookupError:
+                    continue
+                except OSError as e:
+                    logging.warning(f"Could not resume {name} (pid={pid}), will retry: {e}")
+                    self._frozen[pid] = entry
+                    failed += 1
+            self._save()
+
+        logging.info(f"Resumed {len(frozen) - failed} suspended processes: {', '.join(sorted(resumed))}")
+        return sorted(resumed)
+
+    def recover(self) -> List[str]:
+        # Resumes whatever a run that crashed or was killed left frozen, called once at startup
+        with self._lock:
+            try:
+                leftovers = json.loads(FROZEN_FILE.read_text())
+            except FileNotFoundError:
+                leftovers = {}
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not read {FROZEN_FILE.name}, nothing to resume from it: {e}")
+                leftovers = {}
+
+            resumed = set()
+            for pid, (start_time, name, original_cgroup) in leftovers.items():
+                try:
+                    self._resume_one(int(pid), start_time, original_cgroup)
+                    resumed.add(name)
+                except OSError as e:
+                    if not isinstance(e, ProcessLookupError):
+                        logging.warning(f"Could not resume {name} (pid={pid}) left frozen by the last run: {e}")
+
+            # Anything still in the freezer cgroup goes back to the root one, its original cgroup isn't known anymore
+            if sys.platform.startswith("linux") and (FREEZER_CGROUP / "cgroup.procs").is_file():
+                try:
+                    for pid in (FREEZER_CGROUP / "cgroup.procs").read_text().split():
+                        (CGROUP_ROOT / "cgroup.procs").write_text(pid)
+                    (FREEZER_CGROUP / "cgroup.freeze").write_text("0")
+                except OSError as e:
+                    logging.error(f"Failed to thaw {FREEZER_CGROUP}: {e}")
+
+            self._save()
+
+        if resumed:
+            logging.info(f"Resumed processes left suspended by the last run: {', '.join(sorted(resumed))}")
+        return sorted(resumed)
+
+    # INTERNAL HELPERS
+    def _save(self) -> None:
+        try:
+            if not self._frozen:
+                FROZEN_FILE.unlink(missing_ok=True)
+                return
+            tmp_path = FROZEN_FILE.with_suffix(".json.tmp")
+            tmp_path.write_text(json.dumps({pid: list(entry) for pid, entry in self._frozen.items()}))
+            os.replace(tmp_path, FROZEN_FILE)
+        except OSError as e:
+            logging.warning(f"Failed to save the list of suspended processes: {e}")
+
+    def _freeze_one(self, pid: int) -> Tuple[float, str | None]:
+        start_time = _start_time(pid)
+        if start_time is None:
+            raise ProcessLookupError(pid)
+
+        if sys.platform == "win32":
+            import psutil  # Windows has no SIGSTOP, NtSuspendProcess is reached through psutil
+
+            try:
+                psutil.Process(pid).suspend()
+            except psutil.NoSuchProcess as e:
+                raise ProcessLookupError(pid) from e
+            except psutil.AccessDenied as e:
+                raise PermissionError(str(e)) from e
+            return start_time, None
+
+        if cgroup := self._get_cgroup():
+            original_cgroup = _read_cgroup(pid) or "/"
+            try:
+                (cgroup / "cgroup.procs").write_text(str(pid))
+                return start_time, original_cgroup
+            except OSError as e:
+                # Moving between cgroups needs write access to both, stop this one with a signal instead
+                logging.warning(f"Could not move pid {pid} into {cgroup}, using SIGSTOP: {e}")
+
+        os.kill(pid, signal.SIGSTOP)
+        return start_time, None
+
+    def _resume_one(self, pid: int, start_time: float | None, original_cgroup: str | None) -> None:
+        # Guard against the pid having been reused while it was frozen
+        if _start_time(pid) != start_time:
+            raise ProcessLookupError(pid)
+
+        if sys.platform == "win32":
+            import psutil
+
+            try:
+                psutil.Process(pid).resume()
+            except psutil.NoSuchProcess as e:
+                raise ProcessLookupError(pid) from e
+            except psutil.AccessDenied as e:
+                raise PermissionError(str(e)) from e
+        elif original_cgroup is not None:
+            try:
+                (CGROUP_ROOT / original_cgroup.lstrip("/") / "cgroup.procs").write_text(str(pid))
+            except OSError as e:
+                # The original cgroup may be gone by now, e.g. its session scope ended. Out of the frozen one is what counts
+                logging.warning(f"Could not move pid {pid} back to {original_cgroup}, moving it to the root cgroup: {e}")
+                (CGROUP_ROOT / "cgroup.procs").write_text(str(pid))
+        else:
+            os.kill(pid, signal.SIGCONT)
+
+    def _get_cgroup(self) -> Path | None:
+        if self._cgroup_checked:
+            return self._cgroup
+        self._cgroup_checked = True
+
+        if not sys.platform.startswith("linux") or not (CGROUP_ROOT / "cgroup.controllers").is_file():
+            return None
+        try:
+            FREEZER_CGROUP.mkdir(exist_ok=True)
+        except OSError as e:
+            logging.info(f"cgroup v2 freezer unavailable, suspending with SIGSTOP: {e}")
+            return None
+        if not os.access(FREEZER_CGROUP / "cgroup.freeze", os.W_OK):
+            return None
+
+        logging.info(f"Suspending blocked processes with the cgroup v2 freezer at {FREEZER_CGROUP}")
+        self._cgroup = FREEZER_CGROUP
+        return self._cgroup
+
+    def _descendants(self, pid: int) -> List[int]:
+        if sys.platform == "win32":
+            import psutil
+
+            try:
+                return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+            except psutil.Error:
+                return []
+
+        descendants = []
+        pending = [pid]
+        while pending:
+            parent = pending.pop()
+            for child in _read_children(parent):
+                if child not in descendants:
+                    descendants.append(child)
+                    pending.append(child)
+        return descendants
+
+class RespawnGuard:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._kills: Dict[str, Deque[float]] = defaultdict(deque)
+        self._parents: Dict[str, Tuple[int, int]] = {}  # app -> (parent pid, consecutive respawns)
+        self._next_report: Dict[str, float] = {}
+        self._backoff: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = defaultdict(int)
+
+    def is_storming(self, name: str, now: float | None = None) -> bool:
+        with self._lock:
+            kills = self._kills.get(name)
+            return kills is not None and len(self._prune(kills, now or time.monotonic())) >= STORM_THRESHOLD
+
+    def record(self, name: str, now: float | None = None) -> int:
+        # Returns how many kills to print now, 0 while console reports for a respawning app are backed off
+        now = now or time.monotonic()
+        with self._lock:
+            kills = self._prune(self._kills[name], now)
+            kills.append(now)
+            if len(kills) < STORM_THRESHOLD:
+                self._backoff.pop(name, None)
+                self._next_report.pop(name, None)
+                return self._suppressed.pop(name, 0) + 1
+
+            if len(kills) == STORM_THRESHOLD:
+                RESPAWN_STORMS.inc(app=name)
+                logging.warning(f"{name} is respawning, backing off reports")
+            if now < self._next_report.get(name, 0):
+                self._suppressed[name] += 1
+                return 0
+
+            backoff = self._backoff.get(name, REPORT_BACKOFF_BASE)
+            self._next_report[name] = now + backoff
+            self._backoff[name] = min(backoff * 2, REPORT_BACKOFF_MAX)
+            return self._suppressed.pop(name, 0) + 1
+
+    def record_parent(self, name: str, parent_pid: int) -> bool:
+        with self._lock:
+            last_parent, count = self._parents.get(name, (None, 0))
+            count = count + 1 if last_parent == parent_pid else 1
+            self._parents[name] = (parent_pid, count)
+            return count >= PARENT_REPEAT
+
+    def _prune(self, kills: Deque[float], now: float) -> Deque[float]:
+        while kills and kills[0] < now - STORM_WINDOW:
+            kills.popleft()
+        return kills
+
+freezer = ProcessFreezer()
+respawn_guard = RespawnGuard()
+
+def block_process(pid: int, name: str, notifier: "Notifier | None" = None, exec_time_ns: int | None = None, watcher: str = "netlink", parent_pid: int | None = None) -> bool:
+    suspend = settings.data["enforcement_mode"] == "suspend"
+    if suspend and freezer.is_frozen(pid):
+        return False
+
+    # The parent is looked up before the kill, a reaped child's /proc entry is gone
+    storming = not suspend and respawn_guard.is_storming(name)
+    if storming and parent_pid is None:
+        parent_pid = procfs.get_parent_pid(pid)
+
+    try:
+        if suspend:
+            freezer.freeze(pid, name)
+        else:
+            _kill(pid)
+    except ProcessLookupError:
+        return False
+    except PermissionError as e:
+        logging.warning(f"Could not {'suspend' if suspend else 'terminate'} {name}: {e}")
+        return False
+    except Exception as e:
+        logging.error(f"Unexpected error {'suspending' if suspend else 'terminating'} {name}: {e}")
+        return False
+
+    PROCESSES_BLOCKED.inc(source=watcher, action="suspend" if suspend else "kill")
+    if exec_time_ns is not None:
+        latency_ms = (time.monotonic_ns() - exec_time_ns) / 1_000_000
+        ENFORCEMENT_LATENCY.observe(latency_ms / 1000, watcher=watcher)
+
+    if storming and parent_pid and settings.data["kill_respawning_parents"] and respawn_guard.record_parent(name, parent_pid):
+        kill_respawning_parent(parent_pid, name)
+
+    announce_block(name, notifier)
+
+    action = "Suspended" if suspend else "Terminated"
+    if exec_time_ns is not None:
+        logging.info(
+            f"{action} process: {name} (pid={pid}) {latency_ms:.2f}ms after exec",
+            extra={"pid": pid, "app": name, "latency_ms": round(latency_ms, 3)}
+        )
+    else:
+        logging.info(f"{action} process: {name} (pid={pid})", extra={"pid": pid, "app": name})
+    return True
+
+def announce_block(name: str, notifier: "Notifier | None" = None) -> None:
+    if reported := respawn_guard.record(name):
+        timestamped_print(f"🚫 Blocked {name} ×{reported} from opening" if reported > 1 else f"🚫 Blocked {name} from opening")
+    if notifier:
+        notifier.notify(f"🚫 Blocked {name} from opening", f"Code a total of {settings.data['minutes_required']} minutes to unblock apps.", category="blocked")
+
+def kill_respawning_parent(parent_pid: int, name: str) -> bool:
+    if parent_pid <= 1 or parent_pid in (os.getpid(), os.getppid()):
+        return False
+
+    # Never a session's leader or its login shell, and otherwise only launchers the user listed
+    parent_name = _process_name(parent_pid)
+    if parent_name is None or parent_name.lower() in PROTECTED_PARENTS or _is_session_root(parent_pid):
+        return False
+    if parent_name.lower() not in {launcher.lower() for launcher in settings.data["respawning_launchers"]}:
+        logging.info(f"{parent_name} (pid={parent_pid}) keeps respawning {name}, list it in respawning_launchers to have it killed")
+        return False
+
+    try:
+        if sys.platform == "win32":
+            import psutil
+
+            psutil.Process(parent_pid).kill()
+        else:
+            os.kill(parent_pid, signal.SIGKILL)
+    except Exception as e:
+        logging.warning(f"Could not kill {parent_name} (pid={parent_pid}) respawning {name}: {e}")
+        return False
+
+    PROCESSES_BLOCKED.inc(source="respawn", action="kill")
+    logging.warning(f"Killed {parent_name} (pid={parent_pid}), it kept respawning {name}")
+    timestamped_print(f"🔁 Stopped {parent_name} from respawning {name}")
+    return True
+
+def terminate_trees(targets: List[Tuple[int, str]], timeout: float = TERMINATE_TIMEOUT) -> Tuple[Set[str], List[str]]:
+    import psutil  # Only needed once something has to be killed, keeps it off the startup sweep
+
+    killed_apps = set()
+    failed_kills = set()
+
+    procs: Dict[int, Tuple[psutil.Process, str]] = {}
+    for pid, name in targets:
+        logging.info(f"Killing running process tree: {name} (pid={pid})", extra={"pid": pid, "app": name})
+        try:
+            root = psutil.Process(pid)
+            tree = [root, *root.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            continue
+        except psutil.AccessDenied:
+            failed_kills.add(f"{name} (access denied)")
+            continue
+        for proc in tree:
+            procs.setdefault(proc.pid, (proc, name))
+
+    # Signal every tree before waiting on any, so they all shut down in parallel
+    for pid, (proc, name) in list(procs.items()):
+        try:
+            proc.terminate()
+        except psutil.NoSuchProcess:
+            killed_apps.add(name)
+            del procs[pid]
+        except psutil.AccessDenied:
+            logging.warning(f"Access denied killing {name} (pid={pid})")
+            failed_kills.add(f"{name} (access denied)")
+            del procs[pid]
+
+    gone, alive = psutil.wait_procs([proc for proc, _ in procs.values()], timeout=timeout)
+    killed_apps.update(procs[proc.pid][1] for proc in gone)
+
+    for proc in alive:
+        name = procs[proc.pid][1]
+        try:
+            logging.info(f"{name} (pid={proc.pid}) ignored SIGTERM for {timeout}s, killing")
+            proc.kill()
+            killed_apps.add(name)
+        except psutil.NoSuchProcess:
+            killed_apps.add(name)
+        except psutil.AccessDenied:
+            failed_kills.add(f"{name} (access denied)")
+
+    return killed_apps, sorted(failed_kills)
+
+def _kill(pid: int) -> None:
+    if sys.platform == "win32":
+        import psutil  # Windows has no SIGKILL
+
+        try:
+            psutil.Process(pid).kill()
+        except psutil.NoSuchProcess as e:
+            raise ProcessLookupError(pid) from e
+        except psutil.AccessDenied as e:
+            raise PermissionError(f"access denied to pid {pid}") from e
+    else:
+        os.kill(pid, signal.SIGKILL)
+
+def _is_session_root(pid: int) -> bool:
+    if sys.platform == "win32":
+        return False
+
+    try:
+        if os.getsid(pid) == pid:
+            return True
+    except OSError:
+        return True
+    cmdline = procfs.get_process_cmdline(pid)
+    return bool(cmdline) and cmdline[0].startswith("-")  # A login shell's argv[0] starts with '-'
+
+def _process_name(pid: int) -> str | None:
+    if sys.platform == "win32":
+        import psutil
+
+        try:
+            return psutil.Process(pid).name()
+        except psutil.Error:
+            return None
+
+    return procfs.get_process_name(pid)
+
+def _start_time(pid: int) -> float | None:
+    if sys.platform == "win32":
+        import psutil
+
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+
+    stat = procfs.read_stat(pid)
+    return stat[1] if stat else None
+
+def _read_cgroup(pid: int) -> str | None:
+    try:
+        with open(f"{procfs.PROC_PATH}/{pid}/cgroup") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return line[3:].strip()
+    except OSError:
+        pass
+    return None
+
+def _read_children(pid: int) -> List[int]:
+    children = []
+    try:
+        for tid in os.listdir(f"{procfs.PROC_PATH}/{pid}/task"):
+            with open(f"{procfs.PROC_PATH}/{pid}/task/{tid}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
@@ -0,0 +1,236 @@
+from collections import OrderedDict, defaultdict
+import ctypes
+import errno
+import logging
+import os
+import re
+import select
+import struct
+import threading
+import time
+from typing import TYPE_CHECKING, DefaultDict, Iterator, List, Tuple
+
+from ..binary_hashes import binary_hashes
+from ..block_rules import BlockRuleIndex
+from ..metrics import EXEC_DECISIONS, PROCESSES_BLOCKED
+from ..profiles import profiles
+from ..settings import settings
+from ..trace_recorder import trace_recorder
+from . import enforcer
+from .procfs import get_parent_pid
+
+if TYPE_CHECKING:
+    from ..notifier import Notifier
+
+FAN_CLOEXEC = 0x01
+FAN_CLASS_CONTENT = 0x04  # Required for permission events
+FAN_MARK_ADD = 0x01
+FAN_MARK_MOUNT = 0x10
+FAN_MARK_FLUSH = 0x80
+FAN_OPEN_EXEC_PERM = 0x00040000  # Linux 5.0+
+FAN_ALLOW = 0x01
+FAN_DENY = 0x02
+FANOTIFY_METADATA_VERSION = 3
+AT_FDCWD = -100
+MOUNT_ESCAPE = re.compile(rb"\\([0-7]{3})")  # /proc/self/mounts octal-escapes spaces and other separators
+
+EVENT_METADATA = struct.Struct("=IBBHQii")  # event_len, vers, reserved, metadata_len, mask, fd, pid
+RESPONSE = struct.Struct("=iI")  # fd, response
+READ_BUFFER_SIZE = 64 * 1024
+DECISION_CACHE_SIZE = 4096
+
+# Nothing is ever executed from these, marking them would only add permission checks
+PSEUDO_FILESYSTEMS = frozenset({
+    "proc", "sysfs", "cgroup", "cgroup2", "devpts", "mqueue", "securityfs", "debugfs", "tracefs", "pstore",
+    "bpf", "configfs", "fusectl", "hugetlbfs", "binfmt_misc", "efivarfs", "autofs", "nsfs", "rpc_pipefs",
+})
+
+DecisionKey = Tuple[int, int, int]  # (device, inode, mtime_ns)
+
+_libc = ctypes.CDLL(None, use_errno=True)
+_libc.fanotify_init.argtypes = [ctypes.c_uint, ctypes.c_uint]
+_libc.fanotify_mark.argtypes = [ctypes.c_int, ctypes.c_uint, ctypes.c_uint64, ctypes.c_int, ctypes.c_char_p]
+
+class DecisionCache:
+    def __init__(self, max_size: int = DECISION_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._rules: BlockRuleIndex | None = None
+        self._decisions: OrderedDict[DecisionKey, str | None] = OrderedDict()  # Blocked name, or None when allowed
+
+    def lookup(self, rules: BlockRuleIndex, key: DecisionKey) -> Tuple[bool, str | None]:
+        # Every settings change builds a new rule index, so identity is enough to spot stale decisions
+        if rules is not self._rules:
+            self._rules = rules
+            self._decisions.clear()
+            return False, None
+
+        try:
+            self._decisions.move_to_end(key)
+        except KeyError:
+            return False, None
+        return True, self._decisions[key]
+
+    def store(self, key: DecisionKey, name: str | None) -> None:
+        self._decisions[key] = name
+        if len(self._decisions) > self.max_size:
+            self._decisions.popitem(last=False)
+
+def decide(event_fd: int, rules: BlockRuleIndex, cache: DecisionCache) -> Tuple[str | None, bool]:
+    # Returns the blocked app's name, or None to allow, and whether the cache answered
+    stat = os.fstat(event_fd)
+    key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+    hit, name = cache.lookup(rules, key)
+    if hit:
+        return name, True
+
+    # The process still runs its old image at this point, so the binary's own path is all there is to match
+    path = os.readlink(f"/proc/self/fd/{event_fd}")
+    name = os.path.basename(path)
+    if rules.matches(name, path):
+        blocked = name
+    elif rules.needs_hash:
+        # An unhashed binary is let through once, the exec watcher blocks it when its hash is ready
+        if (digest := binary_hashes.lookup(path, stat=stat)) is None:
+            return None, False
+        blocked = name if digest in rules.hashes else None
+    else:
+        blocked = None
+    cache.store(key, blocked)
+    return blocked, False
+
+def open_exec_guard() -> int:
+    fd = _libc.fanotify_init(FAN_CLOEXEC | FAN_CLASS_CONTENT, os.O_RDONLY | os.O_LARGEFILE | os.O_CLOEXEC)
+    if fd < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"fanotify_init: {os.strerror(err)}")
+
+    try:
+        if not _set_marks(fd, True):
+            raise OSError(errno.ENOTSUP, "no mount accepted an exec permission mark")
+    except Exception:
+        os.close(fd)
+        raise
+    return fd
+
+def start_exec_guard(shutdown_event: threading.Event, requirement_met_event: threading.Event, notifier: "Notifier | None" = None) -> threading.Thread | None:
+    if not settings.data["exec_guard_enabled"]:
+        return None
+
+    try:
+        fd = open_exec_guard()
+    except OSError as e:
+        # Needs CAP_SYS_ADMIN and Linux 5.0+, the exec watcher still kills blocked apps right after they start
+        logging.info(f"fanotify exec guard unavailable: {e}")
+        return None
+
+    thread = threading.Thread(target=_guard_loop, args=(fd, shutdown_event, requirement_met_event, notifier), name="exec-guard", daemon=True)
+    thread.start()
+    logging.info("fanotify exec guard active, blocked apps are denied before they start")
+    return thread
+
+# INTERNAL HELPERS
+def _mount_points() -> List[str]:
+    mount_points = []
+    with open("/proc/self/mounts", "rb") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 3 and fields[2].decode(errors="replace") not in PSEUDO_FILESYSTEMS:
+                mount_points.append(os.fsdecode(MOUNT_ESCAPE.sub(lambda m: bytes([int(m.group(1), 8)]), fields[1])))
+    return mount_points
+
+def _set_marks(fd: int, enabled: bool) -> bool:
+    if not enabled:
+        return _libc.fanotify_mark(fd, FAN_MARK_FLUSH | FAN_MARK_MOUNT, 0, AT_FDCWD, None) == 0
+
+    marked = 0
+    for mount_point in _mount_points():
+        if _libc.fanotify_mark(fd, FAN_MARK_ADD | FAN_MARK_MOUNT, FAN_OPEN_EXEC_PERM, AT_FDCWD, os.fsencode(mount_point)) == 0:
+            marked += 1
+        else:
+            logging.debug(f"fanotify couldn't mark {mount_point}: {os.strerror(ctypes.get_errno())}")
+    return marked > 0
+
+def _parse_events(data: bytes) -> Iterator[Tuple[int, int]]:
+    offset = 0
+    while offset + EVENT_METADATA.size <= len(data):
+        event_len, version, _, _, _, event_fd, pid = EVENT_METADATA.unpack_from(data, offset)
+        if version != FANOTIFY_METADATA_VERSION:
+            raise OSError(errno.EPROTO, f"unsupported fanotify metadata version {version}")
+        if event_fd >= 0:
+            yield event_fd, pid
+        offset += event_len
+
+def _guard_loop(fd: int, shutdown_event: threading.Event, requirement_met_event: threading.Event, notifier: "Notifier | None") -> None:
+    caches: DefaultDict[str, DecisionCache] = defaultdict(DecisionCache)  # One per profile, each sees only its own rules
+    own_pid = os.getpid()
+    marked = True
+
+    try:
+        while not shutdown_event.is_set():
+            # Unmarked while apps are unblocked, so execs pay nothing on days the requirement is met
+            if marked == requirement_met_event.is_set() and _set_marks(fd, not marked):
+                marked = not marked
+
+            readable, _, _ = select.select([fd], [], [], 1)
+            if not readable:
+                continue
+
+            try:
+                data = os.read(fd, READ_BUFFER_SIZE)
+            except InterruptedError:
+                continue
+
+            enforce = not requirement_met_event.is_set()
+            for event_fd, pid in _parse_events(data):
+                started_at = time.perf_counter()
+                blocked, hit, parent_pid, path, profile = None, False, None, None, None
+                try:
+                    if enforce and pid != own_pid and (profile := profiles.enforced_profile(pid)) and profile.block_rules:
+                        blocked, hit = decide(event_fd, profile.block_rules, caches[profile.name])
+                    if blocked and trace_recorder.enabled:
+                        path = os.readlink(f"/proc/self/fd/{event_fd}")  # The process still shows its old image
+                    # A denied child exits straight away, so its launcher is looked up before answering
+                    if blocked and enforcer.respawn_guard.is_storming(blocked):
+                        parent_pid = get_parent_pid(pid)
+                except OSError:
+                    blocked = None  # Fail open, a stuck decision would stall every exec on the machine
+                except Exception as e:
+                    logging.error(f"Unexpected error deciding exec of pid {pid}, allowing it: {e}", exc_info=True)
+                    blocked = None
+                finally:
+                    # Every permission event must be answered, the exec waits in the kernel until then
+                    try:
+                        os.write(fd, RESPONSE.pack(event_fd, FAN_DENY if blocked else FAN_ALLOW))
+                    finally:
+                        os.close(event_fd)
+
+                # The rest of the batch still waits on an answer, reporting one exec must not get in the way
+                try:
+                    decision_s = time.perf_counter() - started_at
+                    EXEC_DECISIONS.observe(decision_s, decision="deny" if blocked else "allow", cache="hit" if hit else "miss")
+                    if blocked:
+                        _report_denied(pid, blocked, decision_s, parent_pid, notifier)
+                        if trace_recorder.enabled:
+                            trace_recorder.process("fanotify", pid, blocked, profile, True, exe=path, cmdline=[])
+                except Exception as e:
+                    logging.error(f"Unexpected error reporting denied exec of pid {pid}: {e}", exc_info=True)
+
+        logging.info("fanotify exec guard stopped due to shutdown being requested.")
+
+    except Exception as e:
+        logging.error(f"fanotify exec guard stopped unexpectedly: {e}")
+    finally:
+        os.close(fd)  # The kernel allows anything still pending
+
+def _report_denied(pid: int, name: str, decision_s: float, parent_pid: int | None, notifier: "Notifier | None") -> None:
+    PROCESSES_BLOCKED.inc(source="fanotify", action="deny")
+
+    # A launcher that keeps retrying a denied exec is handled like one respawning a killed app
+    if parent_pid and settings.data["kill_respawning_parents"] and enforcer.respawn_guard.record_parent(name, parent_pid):
+        enforcer.kill_respawning_parent(parent_pid, name)
+
+    enforcer.announce_block(name, notifier)
+    logging.info(
+        f"Denied exec: {name} (pid={pid}) in {decision_s * 1_000_000:.0f}us",
+        extra={"pid": pid, "app": name, "latency_ms": round(decision_s * 1000, 3)}
+    )
@@ -0,0 +1,146 @@
+import errno
+from functools import partial
+import logging
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from ..metrics import ENFORCEMENT_CPU
+from ..profiles import profiles
+from ..trace_recorder import trace_recorder
+from ..utils import timestamped_print
+from .polling import watch_processes as poll_processes
+from .enforcer import block_process
+from .fanotify import start_exec_guard
+from .procfs import get_process_name, is_blocked
+
+if TYPE_CHECKING:
+    from ..notifier import Notifier
+
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+NLMSG_DONE = 3
+
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+PROC_EVENT_EXEC = 0x00000002
+
+NLMSG_HEADER = struct.Struct("=IHHII")  # len, type, flags, seq, pid
+CN_MSG_HEADER = struct.Struct("=IIIIHH")  # idx, val, seq, ack, len, flags
+PROC_EVENT_HEADER = struct.Struct("=IIQ")  # what, cpu, timestamp_ns
+EXEC_EVENT = struct.Struct("=ii")  # process_pid, process_tgid
+
+RECV_BUFFER_SIZE = 4096
+SOCKET_RCVBUF = 8 * 1024 * 1024
+
+def _open_proc_connector() -> socket.socket:
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+        sock.bind((0, CN_IDX_PROC))
+        _set_listening(sock, True)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+def _set_listening(sock: socket.socket, listen: bool) -> None:
+    op = struct.pack("=I", PROC_CN_MCAST_LISTEN if listen else PROC_CN_MCAST_IGNORE)
+    cn_msg = CN_MSG_HEADER.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(op), 0) + op
+    nlmsg = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(cn_msg), NLMSG_DONE, 0, 0, os.getpid()) + cn_msg
+    sock.send(nlmsg)
+
+def _parse_exec_events(data: bytes):
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        msg_len = NLMSG_HEADER.unpack_from(data, offset)[0]
+        if msg_len < NLMSG_HEADER.size:
+            break
+
+        event_offset = offset + NLMSG_HEADER.size + CN_MSG_HEADER.size
+        if event_offset + PROC_EVENT_HEADER.size + EXEC_EVENT.size <= offset + msg_len:
+            what, _, timestamp_ns = PROC_EVENT_HEADER.unpack_from(data, event_offset)
+            if what == PROC_EVENT_EXEC:
+                pid, tgid = EXEC_EVENT.unpack_from(data, event_offset + PROC_EVENT_HEADER.size)
+                if pid == tgid:
+                    yield pid, timestamp_ns
+
+        offset += (msg_len + 3) & ~3
+
+def watch_processes(shutdown_event: threading.Event, requirement_met_event: threading.Event, notifier: "Notifier | None" = None) -> None:
+    # The guard denies blocked execs outright, the exec watcher still catches rules it can't see such as cmdline ones
+    exec_guard = start_exec_guard(shutdown_event, requirement_met_event, notifier)
+    try:
+        _watch_exec_events(shutdown_event, requirement_met_event, notifier)
+    finally:
+        if exec_guard:
+            exec_guard.join(timeout=2)
+
+def _watch_exec_events(shutdown_event: threading.Event, requirement_met_event: threading.Event, notifier: "Notifier | None" = None) -> None:
+    try:
+        sock = _open_proc_connector()
+    except OSError as e:
+        logging.warning(f"Netlink process connector unavailable (requires CAP_NET_ADMIN): {e}. Falling back to polling.")
+        timestamped_print("⚠️ Netlink process watching unavailable, falling back to polling.")
+        poll_processes(shutdown_event, requirement_met_event, notifier)
+        return
+
+    try:
+        while not shutdown_event.is_set():
+            try:
+                readable, _, _ = select.select([sock], [], [], 1)
+                if not readable:
+                    continue
+
+                data = sock.recv(RECV_BUFFER_SIZE)
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    logging.warning("Process watcher fell behind, some exec events were dropped")
+                    continue
+                if not shutdown_event.is_set():
+                    logging.error(f"Netlink error in process watcher: {e}")
+                    time.sleep(1)
+                continue
+
+            # Drain events while unblocked so the socket buffer doesn't overflow
+            if requirement_met_event.is_set() or shutdown_event.is_set():
+                continue
+
+            cpu_started_at = time.thread_time()
+            for pid, timestamp_ns in _parse_exec_events(data):
+                # One event going wrong must not end enforcement for the session
+                try:
+                    name = get_process_name(pid)
+                    if not name:
+                        continue
+
+                    profile = profiles.enforced_profile(pid)
+                    blocked = profile is not None and is_blocked(
+                        profile.block_rules, pid, name, partial(block_process, pid, name, notifier, exec_time_ns=timestamp_ns)
+                    )
+                    if trace_recorder.enabled:
+                        trace_recorder.process("netlink", pid, name, profile, blocked)
+                    if blocked:
+                        block_process(pid, name, notifier, exec_time_ns=timestamp_ns)
+                except Exception as e:
+                    logging.error(f"Unexpected error handling exec of pid {pid}: {e}", exc_info=True)
+            ENFORCEMENT_CPU.inc(time.thread_time() - cpu_started_at, source="netlink")
+
+        if shutdown_event.is_set():
+            logging.info("Process watcher stopped due to shutdown being requested.")
+            timestamped_print("✅ Process watcher stopped - shutdown requested.")
+
+    except Exception as e:
+        logging.error(f"Unexpected error in process watcher: {e}")
+        timestamped_print("❌ Process watcher stopped unexpectedly. See 'hackablock.log'.")
+    finally:
+        try:
+            _set_listening(sock, False)
+        except OSError:
+            pass
+        sock.close()
@@ -0,0 +1,61 @@
+from functools import partial
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from ..metrics import ENFORCEMENT_CPU
+from ..profiles import profiles
+from ..settings import settings
+from ..trace_recorder import trace_recorder
+from ..utils import timestamped_print
+from .enforcer import block_process
+from .procfs import ProcScanner, is_blocked, start_time_to_monotonic_ns
+
+if TYPE_CHECKING:
+    from ..notifier import Notifier
+
+def watch_processes(shutdown_event: threading.Event, requirement_met_event: threading.Event, notifier: "Notifier | None" = None) -> None:
+    if not ProcScanner.is_supported():
+        logging.error("Polling process watcher requires /proc")
+        timestamped_print("❌ Failed to start process watcher. See 'hackablock.log'.")
+        return
+
+    scanner = ProcScanner()
+    scanner.scan()  # Already running processes are handled by the startup sweep
+
+    logging.info(f"Polling for new processes every {settings.data['process_poll_interval']}s")
+
+    try:
+        while not shutdown_event.wait(timeout=settings.data["process_poll_interval"]):
+            cpu_started_at = time.thread_time()
+            # A scan or a pid going wrong is logged and skipped, it must not end enforcement for the session
+            try:
+                new_processes = scanner.scan()
+            except Exception as e:
+                logging.error(f"Unexpected error scanning for new processes: {e}", exc_info=True)
+                continue
+            if requirement_met_event.is_set():
+                continue
+
+            for pid, name in new_processes:
+                try:
+                    start_time = scanner.start_time(pid)
+                    exec_time_ns = start_time_to_monotonic_ns(start_time) if start_time is not None else None
+                    block = partial(block_process, pid, name, notifier, exec_time_ns=exec_time_ns, watcher="polling")
+                    profile = profiles.enforced_profile(pid)
+                    blocked = profile is not None and is_blocked(profile.block_rules, pid, name, block)
+                    if trace_recorder.enabled:
+                        trace_recorder.process("polling", pid, name, profile, blocked)
+                    if blocked:
+                        block()
+                except Exception as e:
+                    logging.error(f"Unexpected error handling new process {name} (pid={pid}): {e}", exc_info=True)
+            ENFORCEMENT_CPU.inc(time.thread_time() - cpu_started_at, source="polling")
+
+        logging.info("Process watcher stopped due to shutdown being requested.")
+        timestamped_print("✅ Process watcher stopped - shutdown requested.")
+
+    except Exception as e:
+        logging.error(f"Unexpected error in process watcher: {e}")
+        timestamped_print("❌ Process watcher stopped unexpectedly. See 'hackablock.log'.")
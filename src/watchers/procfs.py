@@ -0,0 +1,152 @@
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from ..binary_hashes import matches_hash
+from ..block_rules import BlockRuleIndex
+
+PROC_PATH = "/proc"
+TASK_COMM_LEN = 16
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+RECHECK_AGE = 60  # sec, processes younger than this are re-read every scan since they may still exec
+
+def read_stat(pid: int) -> Tuple[str, int] | None:
+    try:
+        with open(f"{PROC_PATH}/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+
+    # comm is wrapped in parentheses and may itself contain spaces or ')'
+    comm_start, comm_end = stat.find(b"("), stat.rfind(b")")
+    if comm_start < 0 or comm_end < 0:
+        return None
+
+    fields = stat[comm_end + 2:].split()
+    try:
+        start_time = int(fields[19])
+    except (IndexError, ValueError):
+        return None
+
+    return stat[comm_start + 1:comm_end].decode(errors="replace"), start_time
+
+def get_parent_pid(pid: int) -> int | None:
+    try:
+        with open(f"{PROC_PATH}/{pid}/stat", "rb") as f:
+            stat = f.read()
+        return int(stat[stat.rfind(b")") + 2:].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+def start_time_to_monotonic_ns(start_time: int) -> int:
+    # start_time is in clock ticks since boot, which includes time spent suspended unlike CLOCK_MONOTONIC
+    since_start_ns = time.clock_gettime_ns(time.CLOCK_BOOTTIME) - start_time * 1_000_000_000 // CLOCK_TICKS
+    return time.monotonic_ns() - since_start_ns
+
+def expand_comm(pid: int, comm: str) -> str:
+    # comm is truncated to TASK_COMM_LEN - 1 chars, recover the full name from the executable
+    if len(comm) < TASK_COMM_LEN - 1:
+        return comm
+
+    try:
+        exe_name = os.path.basename(os.readlink(f"{PROC_PATH}/{pid}/exe"))
+    except OSError:
+        return comm
+
+    return exe_name if exe_name.startswith(comm) else comm
+
+def get_process_name(pid: int) -> str | None:
+    try:
+        with open(f"{PROC_PATH}/{pid}/comm", "rb") as f:
+            comm = f.read().rstrip(b"\n").decode(errors="replace")
+    except OSError:
+        return None
+
+    return expand_comm(pid, comm)
+
+def get_process_exe(pid: int) -> str | None:
+    try:
+        return os.readlink(f"{PROC_PATH}/{pid}/exe")
+    except OSError:
+        return None
+
+def get_process_cmdline(pid: int) -> List[str] | None:
+    try:
+        with open(f"{PROC_PATH}/{pid}/cmdline", "rb") as f:
+            return f.read().decode(errors="replace").split("\0")[:-1]
+    except OSError:
+        return None
+
+def is_blocked(rules: BlockRuleIndex, pid: int, name: str, on_hash_match: Callable[[], None] | None = None) -> bool:
+    # exe and cmdline are only read when rules that need them exist
+    if rules.matches(
+        name,
+        get_process_exe(pid) if rules.needs_exe else None,
+        get_process_cmdline(pid) if rules.needs_cmdline else None
+    ):
+        return True
+    return rules.needs_hash and _matches_running_hash(rules, pid, on_hash_match)
+
+def _matches_running_hash(rules: BlockRuleIndex, pid: int, on_match: Callable[[], None] | None) -> bool:
+    # /proc/<pid>/exe is the image actually running, even after the file was renamed or replaced
+    stat = read_stat(pid) if on_match else None
+
+    def on_verified_match() -> None:
+        # The pid may have been reused while its binary was being hashed
+        if stat and (current := read_stat(pid)) and current[1] == stat[1]:
+            on_match()
+
+    return matches_hash(rules, f"{PROC_PATH}/{pid}/exe", on_verified_match if on_match else None)
+
+class ProcScanner:
+    def __init__(self) -> None:
+        self._processes: Dict[int, Tuple[int, int, str, str]] = {}  # pid -> (/proc entry inode, start_time, comm, name)
+
+    @staticmethod
+    def is_supported() -> bool:
+        return os.path.isfile(f"{PROC_PATH}/self/stat")
+
+    def scan(self) -> List[Tuple[int, str]]:
+        # Returns processes that are new since the last scan, and known pids that exec'd into something else
+        try:
+            with os.scandir(PROC_PATH) as it:
+                entries = {int(entry.name): entry.inode() for entry in it if entry.name.isdigit()}
+        except OSError as e:
+            logging.error(f"Failed to list {PROC_PATH}: {e}")
+            return []
+
+        known = self._processes
+        for pid in known.keys() - entries.keys():
+            del known[pid]
+
+        # readdir hands out each /proc entry's inode for free, and a reused pid gets a new one. Young processes
+        # are re-read regardless, a launcher or fork can still exec into a blocked app after it was first seen
+        recheck_after = int(time.clock_gettime(time.CLOCK_BOOTTIME) * CLOCK_TICKS) - RECHECK_AGE * CLOCK_TICKS
+        new_processes = []
+        for pid, inode in entries.items():
+            cached = known.get(pid)
+            if cached is not None and cached[0] == inode and cached[1] < recheck_after:
+                continue
+            if (stat := read_stat(pid)) is None:
+                known.pop(pid, None)
+                continue
+
+            comm, start_time = stat
+            if cached is not None and cached[1:3] == (start_time, comm):
+                known[pid] = (inode, *cached[1:])
+                continue
+
+            name = expand_comm(pid, comm)
+            known[pid] = (inode, start_time, comm, name)
+            new_processes.append((pid, name))
+
+        return new_processes
+
+    def start_time(self, pid: int) -> int | None:
+        cached = self._processes.get(pid)
+        return cached[1] if cached else None
+
+    def processes(self) -> Iterator[Tuple[int, str]]:
+        for pid, (_, _, _, name) in list(self._processes.items()):
+            yield pid, name
@@ -1,7 +1,10 @@
+from datetime import datetime
+from functools import partial
 import logging
 import sys
 import time
 import threading
+from typing import TYPE_CHECKING
 
 if sys.platform == "win32":
     import pythoncom
@@ -10,11 +13,26 @@ else:
     pythoncom = None
     wmi = None
 
-from ..notifier import Notifier
+from ..binary_hashes import matches_hash
+from ..metrics import ENFORCEMENT_CPU, ENFORCEMENT_LATENCY, PROCESSES_BLOCKED
+from ..profiles import profiles
 from ..settings import settings
+from ..trace_recorder import trace_recorder
 from ..utils import timestamped_print
+from .enforcer import block_process, freezer, kill_respawning_parent, respawn_guard
 
-def watch_processes(shutdown_event: threading.Event, requirement_met_event: threading.Event, notifier: Notifier | None = None) -> None:
+if TYPE_CHECKING:
+    from ..notifier import Notifier
+
+def _seconds_since_creation(creation_date: str | None) -> float | None:
+    # CIM_DATETIME, e.g. "20250101120000.123456+060" in local time
+    try:
+        created_at = datetime.strptime(creation_date[:21], "%Y%m%d%H%M%S.%f")
+    except (TypeError, ValueError):
+        return None
+    return (datetime.now() - created_at).total_seconds()
+
+def watch_processes(shutdown_event: threading.Event, requirement_met_event: threading.Event, notifier: "Notifier | None" = None) -> None:
     pythoncom.CoInitialize()
     
     try:
@@ -28,18 +46,48 @@ def watch_processes(shutdown_event: threading.Event, requirement_met_event: thre
             
             try:
                 new_proc = proc_watcher(timeout_ms=3000)
+                cpu_started_at = time.thread_time()
                 
-                if not shutdown_event.is_set() and new_proc.Name.lower() in settings.data["blocked_apps"]:
+                profile = profiles.enforced_profile(new_proc.ProcessId)
+                rules = profile.block_rules if profile else None
+                blocked = bool(rules) and not shutdown_event.is_set() and (rules.matches(
+                    new_proc.Name,
+                    new_proc.ExecutablePath if rules.needs_exe else None,
+                    new_proc.CommandLine if rules.needs_cmdline else None
+                ) or matches_hash(
+                    # A binary seen for the first time is hashed in the background and blocked from there, off this COM thread
+                    rules, new_proc.ExecutablePath, partial(block_process, new_proc.ProcessId, new_proc.Name, notifier, watcher="wmi")
+                ))
+                if trace_recorder.enabled:
+                    trace_recorder.process("wmi", new_proc.ProcessId, new_proc.Name, profile, blocked, new_proc.ExecutablePath, new_proc.CommandLine)
+                if blocked:
+                    suspend = settings.data["enforcement_mode"] == "suspend"
                     try:
-                        new_proc.Terminate()
-                        timestamped_print(f"🚫 Blocked {new_proc.Name} from opening")
+                        if suspend:
+                            freezer.freeze(new_proc.ProcessId, new_proc.Name)
+                        else:
+                            new_proc.Terminate()
+                        PROCESSES_BLOCKED.inc(source="wmi", action="suspend" if suspend else "kill")
+                        if (latency := _seconds_since_creation(new_proc.CreationDate)) is not None:
+                            ENFORCEMENT_LATENCY.observe(latency, watcher="wmi")
+                        if (
+                            not suspend and settings.data["kill_respawning_parents"] and respawn_guard.is_storming(new_proc.Name)
+                            and respawn_guard.record_parent(new_proc.Name, new_proc.ParentProcessId)
+                        ):
+                            kill_respawning_parent(new_proc.ParentProcessId, new_proc.Name)
+                        if reported := respawn_guard.record(new_proc.Name):
+                            timestamped_print(f"🚫 Blocked {new_proc.Name} ×{reported} from opening" if reported > 1 else f"🚫 Blocked {new_proc.Name} from opening")
                         if notifier:
-                            notifier.notify(f"🚫 Blocked {new_proc.Name} from opening", f"Code a total of {settings.data["minutes_required"]} minutes to unblock apps.")
-                        logging.info(f"Terminated process: {new_proc.Name} (pid={new_proc.ProcessId})")
+                            notifier.notify(f"🚫 Blocked {new_proc.Name} from opening", f"Code a total of {settings.data["minutes_required"]} minutes to unblock apps.", category="blocked")
+                        logging.info(
+                            f"{'Suspended' if suspend else 'Terminated'} process: {new_proc.Name} (pid={new_proc.ProcessId})",
+                            extra={"pid": new_proc.ProcessId, "app": new_proc.Name, "latency_ms": round(latency * 1000, 3) if latency is not None else None}
+                        )
                     except (OSError, AttributeError) as e:
-                        logging.warning(f"Could not terminate {new_proc.Name}: {e}")
+                        logging.warning(f"Could not {'suspend' if suspend else 'terminate'} {new_proc.Name}: {e}")
                     except Exception as e:
                         logging.error(f"Unexpected error terminating {new_proc.Name}: {e}")
+                ENFORCEMENT_CPU.inc(time.thread_time() - cpu_started_at, source="wmi")
                         
             except wmi.x_wmi_timed_out:
                 continue
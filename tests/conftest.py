@@ -0,0 +1,18 @@
+import os
+from pathlib import Path
+import sys
+import tempfile
+
+import pytest
+
+# In development hackablock keeps its settings, log and database in the working directory, keep them out of the repo
+os.chdir(tempfile.mkdtemp(prefix="hackablock-tests-"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.settings import settings  # noqa: E402
+
+@pytest.fixture
+def restore_settings():
+    original = dict(settings.data)
+    yield settings
+    settings.update_settings(original)
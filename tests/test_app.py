@@ -0,0 +1,112 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PySide6.QtCore")
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+
+from src.app import App  # noqa: E402
+from src.hackatime_client import HackatimeClient  # noqa: E402
+from src.hackatime_error import HackatimeError  # noqa: E402
+from src.profiles import profiles  # noqa: E402
+
+API_LATENCY = 1.0  # sec
+FRAME_INTERVAL = 10  # ms
+MAX_FRAME_GAP = 0.2  # sec, a frozen window shows up as a gap of about API_LATENCY
+
+class SlowHackatimeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        time.sleep(API_LATENCY)
+        body = json.dumps({"data": {"grand_total": {"total_seconds": 1234}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+@pytest.fixture
+def app(monkeypatch: pytest.MonkeyPatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHackatimeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    tracker = profiles.primary.tracker
+    client = HackatimeClient(base_url=f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(tracker, "client", client)
+    monkeypatch.setattr(tracker, "_cached", None)
+    tracker.restore(0)
+
+    app = App()
+    app._init_qt_app()
+    yield app
+
+    app.fetch_pool.shutdown(wait=True)
+    if app.main_window:
+        app.main_window.dispose()
+        app.main_window.deleteLater()
+    tracker.restore(0)
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+def _max_frame_gap(actions, duration: float) -> float:
+    # Runs the event loop for `duration` with a timer ticking every FRAME_INTERVAL, returns the longest gap between ticks
+    ticks = []
+    timer = QtCore.QTimer()
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    timer.start(FRAME_INTERVAL)
+    for action in actions:
+        QtCore.QTimer.singleShot(50, action)
+
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(int(duration * 1000), loop.quit)
+    loop.exec()
+    timer.stop()
+    return max(later - earlier for earlier, later in zip(ticks, ticks[1:]))
+
+def test_window_and_refresh_do_not_stall_the_gui(app: App):
+    app._get_main_window()  # Building the widgets isn't what's measured
+    progress = []
+    app.signals.window_progress_signal.connect(progress.append)
+    app.signals.refresh_progress_signal.connect(progress.append)
+
+    gap = _max_frame_gap([lambda: app._show_main_window_thread(0), app._handle_refresh_progress], API_LATENCY * 2.5)
+    assert gap < MAX_FRAME_GAP, f"GUI thread stalled for {gap * 1000:.0f}ms"
+    assert progress == [1234, 1234]
+
+def test_blocking_does_not_stall_the_gui(app: App, monkeypatch: pytest.MonkeyPatch):
+    blocked = threading.Event()
+    monkeypatch.setattr(app, "_block_running_processes", lambda: (time.sleep(API_LATENCY), blocked.set()))
+
+    gap = _max_frame_gap([app._handle_block_requested], API_LATENCY * 1.5)
+    assert gap < MAX_FRAME_GAP, f"GUI thread stalled for {gap * 1000:.0f}ms"
+    assert blocked.is_set()
+
+@pytest.mark.parametrize("error", [HackatimeError("API down"), TypeError("unexpected response")])
+def test_any_fetch_error_is_reported(app: App, monkeypatch: pytest.MonkeyPatch, error: Exception):
+    def fail() -> int:
+        raise error
+
+    monkeypatch.setattr(app, "_get_seconds_coded", fail)
+    errors = []
+    app.signals.update_error_signal.connect(errors.append)
+    app._fetch_in_background(app.signals.refresh_progress_signal)
+    app.fetch_pool.shutdown(wait=True)
+    QtCore.QCoreApplication.processEvents()  # Emitted from the pool, delivered on the GUI thread
+
+    assert len(errors) == 1 and isinstance(errors[0], HackatimeError)
+    assert str(error) in str(errors[0])
+
+def test_show_logs_opens_the_logs_tab(app: App):
+    app._show_logs_tab()
+    assert app.main_window.tabs.currentWidget() is app.main_window.logs_tab
@@ -0,0 +1,17 @@
+import pytest
+
+from benchmarks.harness import Benchmark, run_benchmark
+
+def test_teardown_runs_when_a_benchmark_fails():
+    torn_down = []
+
+    def setup():
+        def run() -> None:
+            raise RuntimeError("benchmark broke")
+
+        run.teardown = lambda: torn_down.append(True)
+        return run
+
+    with pytest.raises(RuntimeError, match="benchmark broke"):
+        run_benchmark(Benchmark("failing", setup, {}, 1), {}, quick=True)
+    assert torn_down == [True]
@@ -0,0 +1,63 @@
+import hashlib
+import os
+from pathlib import Path
+import threading
+
+import pytest
+
+from src.binary_hashes import BinaryHashCache, file_key
+
+def _write(path: Path, content: bytes) -> Path:
+    path.write_bytes(content)
+    return path
+
+def _hash_now(cache: BinaryHashCache, path: Path, stat: os.stat_result | None = None) -> str:
+    # A miss queues the file, waits for the worker to hand the digest over
+    ready = threading.Event()
+    digests = []
+    assert cache.lookup(str(path), lambda digest: (digests.append(digest), ready.set()), stat) is None
+    assert ready.wait(timeout=5)
+    return digests[0]
+
+@pytest.fixture
+def cache(tmp_path: Path) -> BinaryHashCache:
+    return BinaryHashCache(tmp_path / "hackablock-hashes.json")
+
+def test_miss_hashes_in_the_background_then_hits(cache: BinaryHashCache, tmp_path: Path):
+    binary = _write(tmp_path / "steam", b"steam binary")
+    assert _hash_now(cache, binary) == hashlib.sha256(b"steam binary").hexdigest()
+
+    # Keyed by (device, inode, size, mtime), so a copy elsewhere is hashed again
+    assert cache.lookup(str(binary)) == hashlib.sha256(b"steam binary").hexdigest()
+    assert cache.lookup(str(_write(tmp_path / "copy", b"steam binary"))) is None
+
+def test_least_recently_used_is_evicted(tmp_path: Path):
+    cache = BinaryHashCache(tmp_path / "hackablock-hashes.json", max_entries=2)
+    a, b, c = (_write(tmp_path / name, name.encode()) for name in ("a", "b", "c"))
+    _hash_now(cache, a)
+    _hash_now(cache, b)
+    assert cache.lookup(str(a)) is not None  # a is now the most recently used
+
+    _hash_now(cache, c)
+    assert cache.lookup(str(a)) is not None
+    assert cache.lookup(str(c)) is not None
+    assert file_key(b.stat()) not in cache._hashes
+
+def test_persisted_hashes_are_loaded_by_the_next_run(cache: BinaryHashCache, tmp_path: Path):
+    binary = _write(tmp_path / "steam", b"steam binary")
+    digest = _hash_now(cache, binary)
+    cache.flush()
+
+    reloaded = BinaryHashCache(cache.path)
+    assert reloaded.lookup(str(binary)) == digest
+    assert reloaded._pool is None  # Nothing had to be hashed
+
+def test_binary_replaced_while_hashing_is_stored_under_its_new_key(cache: BinaryHashCache, tmp_path: Path):
+    binary = _write(tmp_path / "steam", b"old steam")
+    old_stat = binary.stat()
+    os.replace(_write(tmp_path / "steam.new", b"new steam, replaced"), binary)
+
+    # The lookup saw the old file, the worker opens the new one
+    assert _hash_now(cache, binary, old_stat) == hashlib.sha256(b"new steam, replaced").hexdigest()
+    assert file_key(old_stat) not in cache._hashes
+    assert cache.lookup(str(binary)) == hashlib.sha256(b"new steam, replaced").hexdigest()
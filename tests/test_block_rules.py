@@ -0,0 +1,51 @@
+import pytest
+
+from src.block_rules import BlockRuleIndex, rule_error
+
+def test_exact_names_match_case_insensitively():
+    rules = BlockRuleIndex(["Steam.exe"])
+    assert rules.matches("steam.exe")
+    assert rules.matches("STEAM.EXE")
+    assert not rules.matches("steamwebhelper.exe")
+
+def test_globs_regexes_paths_and_cmdlines():
+    rules = BlockRuleIndex(["game*", "re:roblox(player)?", "path:/opt/games/*", "cmdline:*--launch-game*"])
+    assert rules.matches("gamelauncher")
+    assert rules.matches("RobloxPlayer")
+    assert not rules.matches("robloxstudio")
+    assert rules.matches("runner", exe="/opt/games/bin/runner")
+    assert rules.matches("python", cmdline=["python", "main.py", "--launch-game"])
+    assert not rules.matches("python", exe="/usr/bin/python", cmdline=["python", "main.py"])
+
+@pytest.mark.parametrize("rule", ["re:(?i)steam", "re:(?s)a.b", "cmdline:re:(?x) steam"])
+def test_global_inline_flags_are_rejected(rule: str):
+    assert "inline flags" in rule_error(rule)
+    assert not BlockRuleIndex([rule])
+
+def test_scoped_inline_flags_are_allowed():
+    assert rule_error("re:(?s:a.b)") is None
+    assert BlockRuleIndex(["re:(?s:a.b)"]).matches("a\nb")
+
+@pytest.mark.parametrize("rule", ["re:(", "re:[a-", "sha256:abc", "path:re:*steam"])
+def test_invalid_rules_are_reported_and_skipped(rule: str):
+    assert rule_error(rule) is not None
+    rules = BlockRuleIndex([rule, "steam"])
+    assert rules.matches("steam")
+
+def test_rules_that_only_break_once_combined_still_work():
+    # Each is valid alone, joined they'd redefine the group name or point \\1 at the other rule's group
+    rules = BlockRuleIndex([
+        "re:(?P<app>steam)\\.exe", "re:(?P<app>epic)games",
+        "re:(ab)\\1", "re:(x)(y)\\2",
+        "game*", "launcher?",
+    ])
+    for name in ("steam.exe", "epicgames", "abab", "xyy", "gameboy", "launcher1"):
+        assert rules.matches(name), name
+    for name in ("abba", "xyx", "steam"):
+        assert not rules.matches(name), name
+
+def test_sha256_rules():
+    digest = "a" * 64
+    rules = BlockRuleIndex([f"sha256:{digest.upper()}"])
+    assert rules.needs_hash
+    assert rules.hashes == {digest}
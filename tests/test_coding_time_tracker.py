@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from src.coding_time_tracker import CodingTimeTracker
+from src.hackatime_error import HackatimeError
+
+WAITERS = 4
+
+class SlowClient:
+    # Holds the leader's request until released, so the other callers pile up behind it
+    last_latency_ms = 0.0
+
+    def __init__(self, response: Any) -> None:
+        self.response = response
+        self.requests = 0
+        self.release = threading.Event()
+
+    def get_json(self, path: str, api_key: str) -> Any:
+        self.requests += 1
+        self.release.wait(5)
+        if isinstance(self.response, BaseException):
+            raise self.response
+        return self.response
+
+def _fetch_concurrently(client: SlowClient) -> list:
+    tracker = CodingTimeTracker(client)
+    outcomes = {}
+
+    def fetch(i: int) -> None:
+        try:
+            outcomes[i] = tracker.fetch_coding_seconds("key")
+        except Exception as e:
+            outcomes[i] = type(e)
+
+    # Daemon threads, so a waiter that never wakes fails the test instead of hanging it
+    threads = [threading.Thread(target=fetch, args=(i,), daemon=True) for i in range(WAITERS + 1)]
+    threads[0].start()
+    while tracker._in_flight is None:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    while tracker.coalesced_calls < WAITERS:
+        time.sleep(0.001)
+    client.release.set()
+
+    deadline = time.monotonic() + 5
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    assert tracker._in_flight is None
+    return [outcomes.get(i) for i in range(WAITERS + 1)]
+
+def test_waiters_share_the_leaders_result():
+    client = SlowClient({"data": {"grand_total": {"total_seconds": 1800}}})
+    assert _fetch_concurrently(client) == [1800] * (WAITERS + 1)
+    assert client.requests == 1
+
+@pytest.mark.parametrize("response", [[], None, {"data": None}, {"data": []}, {"data": {"grand_total": {}}}])
+def test_malformed_responses_reach_every_waiter(response: Any):
+    assert _fetch_concurrently(SlowClient(response)) == [HackatimeError] * (WAITERS + 1)
+
+def test_unexpected_exceptions_reach_every_waiter():
+    assert _fetch_concurrently(SlowClient(RuntimeError("boom"))) == [RuntimeError] * (WAITERS + 1)
+
+def test_a_failed_fetch_is_retried_by_the_next_caller():
+    client = SlowClient(RuntimeError("boom"))
+    client.release.set()
+    tracker = CodingTimeTracker(client)
+    with pytest.raises(RuntimeError):
+        tracker.fetch_coding_seconds("key")
+    client.response = {"data": {"grand_total": {"total_seconds": 60}}}
+    assert tracker.fetch_coding_seconds("key") == 60
+    assert client.requests == 2
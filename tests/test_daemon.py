@@ -0,0 +1,10 @@
+import pytest
+
+from src.control import CommandError
+from src.daemon import Daemon
+
+def test_add_app_command_rejects_invalid_rules(restore_settings):
+    before = restore_settings.data["blocked_apps"]
+    with pytest.raises(CommandError, match="inline flags"):
+        Daemon()._handle_add_app_command({"name": "re:(?i)steam"})
+    assert restore_settings.data["blocked_apps"] == before
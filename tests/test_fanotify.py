@@ -0,0 +1,64 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="fanotify is Linux only")
+
+from src.profiles import profiles  # noqa: E402
+from src.watchers import fanotify  # noqa: E402
+
+def _event(event_fd: int, pid: int) -> bytes:
+    return fanotify.EVENT_METADATA.pack(fanotify.EVENT_METADATA.size, fanotify.FANOTIFY_METADATA_VERSION, 0, fanotify.EVENT_METADATA.size, 0, event_fd, pid)
+
+def _answers(kernel: socket.socket, count: int) -> list:
+    responses = b""
+    while len(responses) < fanotify.RESPONSE.size * count and (chunk := kernel.recv(4096)):
+        responses += chunk
+    return list(fanotify.RESPONSE.iter_unpack(responses[:len(responses) - len(responses) % fanotify.RESPONSE.size]))
+
+def test_one_bad_decision_does_not_stop_the_guard(restore_settings, monkeypatch: pytest.MonkeyPatch):
+    restore_settings.update_settings({"blocked_apps": ["steam"]})
+    monkeypatch.setattr(profiles.primary, "met", False)
+    monkeypatch.setattr(fanotify, "_set_marks", lambda fd, mark: False)
+
+    # A socket stands in for the fanotify fd, it's read from and answered on the same descriptor
+    guard, kernel = socket.socketpair()
+    event_fds = [os.open(os.devnull, os.O_RDONLY) for _ in range(3)]
+    bad_fd = event_fds[0]
+    calls = []
+
+    def decide(event_fd, rules, cache):
+        calls.append(event_fd)
+        if len(calls) == 1:
+            raise RuntimeError("decision broke")
+        return "steam", False
+
+    denied = []
+    monkeypatch.setattr(fanotify, "decide", decide)
+    monkeypatch.setattr(fanotify, "_report_denied", lambda pid, name, decision_s, parent_pid, notifier: denied.append(pid))
+
+    shutdown_event, requirement_met_event = threading.Event(), threading.Event()
+    loop = threading.Thread(target=fanotify._guard_loop, args=(guard.detach(), shutdown_event, requirement_met_event, None), daemon=True)
+    loop.start()
+    try:
+        kernel.sendall(b"".join(_event(event_fd, 100 + i) for i, event_fd in enumerate(event_fds)))
+        kernel.settimeout(5)
+        assert _answers(kernel, 3) == [(bad_fd, fanotify.FAN_ALLOW), (event_fds[1], fanotify.FAN_DENY), (event_fds[2], fanotify.FAN_DENY)]
+
+        # Still answering later batches
+        late_fd = os.open(os.devnull, os.O_RDONLY)
+        kernel.sendall(_event(late_fd, 103))
+        assert _answers(kernel, 1) == [(late_fd, fanotify.FAN_DENY)]
+        deadline = time.monotonic() + 5
+        while len(denied) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert denied == [101, 102, 103]
+        assert loop.is_alive()
+    finally:
+        shutdown_event.set()
+        loop.join(timeout=5)
+        kernel.close()
@@ -0,0 +1,126 @@
+from pathlib import Path
+import subprocess
+import sys
+import time
+from typing import List
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="uses /proc and SIGSTOP")
+
+from src import daemon as daemon_module  # noqa: E402
+from src.profiles import profiles  # noqa: E402
+from src.watchers import enforcer  # noqa: E402
+
+def _state(pid: int) -> str:
+    stat = Path(f"/proc/{pid}/stat").read_text()
+    return stat[stat.rindex(")") + 2]
+
+def _stopped(procs: List[subprocess.Popen], expected: List[bool]) -> List[bool]:
+    # Signals land asynchronously, give the states up to a couple of seconds to reach what's expected
+    deadline = time.monotonic() + 2
+    while (stopped := [_state(proc.pid) == "T" for proc in procs]) != expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return stopped
+
+@pytest.fixture(autouse=True)
+def frozen_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(enforcer, "FROZEN_FILE", tmp_path / "hackablock-frozen.json")
+    monkeypatch.setattr(enforcer, "FREEZER_CGROUP", tmp_path / "hackablock.frozen")
+    return enforcer.FROZEN_FILE
+
+@pytest.fixture
+def sleepers():
+    procs = [subprocess.Popen(["sleep", "60"]) for _ in range(3)]
+    yield procs
+    for proc in procs:
+        proc.kill()
+        proc.wait()
+
+@pytest.fixture
+def freezer(monkeypatch: pytest.MonkeyPatch) -> enforcer.ProcessFreezer:
+    freezer = enforcer.ProcessFreezer()
+    monkeypatch.setattr(freezer, "_get_cgroup", lambda: None)  # SIGSTOP, so the test needn't touch real cgroups
+    return freezer
+
+def test_resume_continues_past_failures_and_retries_them(freezer: enforcer.ProcessFreezer, sleepers, monkeypatch: pytest.MonkeyPatch):
+    for i, proc in enumerate(sleepers):
+        freezer.freeze(proc.pid, f"app{i}")
+    assert _stopped(sleepers, [True, True, True]) == [True, True, True]
+
+    resume_one = freezer._resume_one
+    stuck = sleepers[0].pid
+
+    def flaky_resume(pid, start_time, original_cgroup):
+        if pid == stuck:
+            raise OSError(16, "Device or resource busy")
+        resume_one(pid, start_time, original_cgroup)
+
+    monkeypatch.setattr(freezer, "_resume_one", flaky_resume)
+    assert freezer.resume() == ["app1", "app2"]
+    assert _stopped(sleepers, [True, False, False]) == [True, False, False]
+    assert freezer.is_frozen(stuck)
+    assert freezer.frozen_names() == ["app0"]
+
+    # The next tick tries again
+    monkeypatch.setattr(freezer, "_resume_one", resume_one)
+    assert freezer.resume() == ["app0"]
+    assert _stopped(sleepers[:1], [False]) == [False]
+    assert freezer.frozen_names() == []
+
+def test_processes_that_exited_while_frozen_are_dropped(freezer: enforcer.ProcessFreezer, sleepers):
+    freezer.freeze(sleepers[0].pid, "app0")
+    freezer.freeze(sleepers[1].pid, "app1")
+    sleepers[0].kill()
+    sleepers[0].wait()
+
+    assert freezer.resume() == ["app1"]
+    assert freezer.frozen_names() == []
+
+def test_resume_falls_back_to_the_root_cgroup(tmp_path: Path, sleepers, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(enforcer, "CGROUP_ROOT", tmp_path)
+    pid = sleepers[0].pid
+    start_time = enforcer._start_time(pid)
+
+    # The cgroup it came from has been removed since
+    enforcer.ProcessFreezer()._resume_one(pid, start_time, "/user.slice/session-1.scope")
+    assert (tmp_path / "cgroup.procs").read_text() == str(pid)
+
+def test_failed_resumes_are_retried_by_the_main_loop(freezer: enforcer.ProcessFreezer, sleepers, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(daemon_module, "freezer", freezer)
+    monkeypatch.setattr(profiles.primary, "met", False)
+    daemon = daemon_module.Daemon()
+    freezer.freeze(sleepers[0].pid, "app0")
+
+    def busy_resume(pid, start_time, original_cgroup):
+        raise OSError(16, "Device or resource busy")
+
+    resume_one = freezer._resume_one
+    monkeypatch.setattr(freezer, "_resume_one", busy_resume)
+    daemon._set_requirement_met()
+    assert freezer.frozen_names() == ["app0"]
+
+    monkeypatch.setattr(freezer, "_resume_one", resume_one)
+    daemon._retry_failed_resumes()
+    assert _stopped(sleepers[:1], [False]) == [False]
+    assert freezer.frozen_names() == []
+
+def test_leftovers_of_a_crashed_run_are_resumed(freezer: enforcer.ProcessFreezer, sleepers, frozen_file: Path):
+    freezer.freeze(sleepers[0].pid, "app0")
+    freezer.freeze(sleepers[1].pid, "app1")
+    assert _stopped(sleepers, [True, True, False]) == [True, True, False]
+    assert frozen_file.exists()
+
+    # A new run knows nothing of the old one's freezer except what it saved
+    assert enforcer.ProcessFreezer().recover() == ["app0", "app1"]
+    assert _stopped(sleepers, [False, False, False]) == [False, False, False]
+    assert not frozen_file.exists()
+
+def test_recovery_empties_and_thaws_the_freezer_cgroup(tmp_path: Path, sleepers, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(enforcer, "CGROUP_ROOT", tmp_path)
+    enforcer.FREEZER_CGROUP.mkdir()
+    (enforcer.FREEZER_CGROUP / "cgroup.procs").write_text(f"{sleepers[0].pid}\n")
+
+    enforcer.ProcessFreezer().recover()
+    assert (tmp_path / "cgroup.procs").read_text() == str(sleepers[0].pid)
+    assert (enforcer.FREEZER_CGROUP / "cgroup.freeze").read_text() == "0"
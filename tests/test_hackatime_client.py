@@ -0,0 +1,169 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import pytest
+import requests
+
+from src.hackatime_client import HackatimeClient
+from src.hackatime_error import CircuitOpenError
+
+BODY = {"data": {"grand_total": {"total_seconds": 1234}}}
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Plays back the server's scripted responses in order, the last one repeats once the script runs out
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        server = self.server
+        with server.lock:
+            status, headers, delay = server.script.pop(0) if len(server.script) > 1 else server.script[0]
+            server.requests.append((dict(self.headers), self.client_address))
+        if delay:
+            time.sleep(delay)
+
+        body = json.dumps(BODY).encode() if status == 200 else b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.lock = threading.Lock()
+        self.script: List[Tuple[int, Dict[str, str], float]] = [(200, {}, 0.0)]
+        self.requests: List[Tuple[Dict[str, str], Any]] = []
+
+    def respond(self, *responses: Tuple[int, Dict[str, str], float]) -> None:
+        with self.lock:
+            self.script = list(responses)
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _client(server: StandInServer, **kwargs) -> HackatimeClient:
+    kwargs = {"backoff_base": 1.0, "backoff_max": 8.0, "failure_threshold": 3, "reset_timeout": 0.3, **kwargs}
+    return HackatimeClient(base_url=f"http://127.0.0.1:{server.server_port}", **kwargs)
+
+def test_success_reuses_the_connection(server: StandInServer):
+    client = _client(server)
+    assert client.get_json("/summary", "key") == BODY
+    assert client.get_json("/summary", "key") == BODY
+    assert server.requests[0][0]["Authorization"] == "Bearer key"
+    assert server.requests[0][1] == server.requests[1][1]
+    client.close()
+
+@pytest.mark.parametrize("status", [500, 503, 429])
+def test_server_errors_and_rate_limits_count_as_failures(server: StandInServer, status: int):
+    server.respond((status, {}, 0.0))
+    client = _client(server)
+    with pytest.raises(requests.HTTPError):
+        client.get_json("/summary", "key")
+    assert 0.5 <= client.retry_delay() <= 1.0
+    client.close()
+
+def test_client_errors_do_not_trip_the_breaker(server: StandInServer):
+    server.respond((401, {}, 0.0))
+    client = _client(server, failure_threshold=1)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            client.get_json("/summary", "bad-key")
+    assert len(server.requests) == 3
+    client.close()
+
+def test_timeouts_count_as_failures(server: StandInServer):
+    server.respond((200, {}, 0.5))
+    client = _client(server, timeout=0.1)
+    started = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        client.get_json("/summary", "key")
+    assert time.perf_counter() - started < 0.4
+    assert 0.5 <= client.retry_delay() <= 1.0
+    client.close()
+
+def test_backoff_doubles_with_jitter_up_to_the_cap(server: StandInServer):
+    server.respond((500, {}, 0.0))
+    client = _client(server, failure_threshold=100)
+    for failures in range(1, 7):
+        with pytest.raises(requests.HTTPError):
+            client.get_json("/summary", "key")
+        expected = min(8.0, 2 ** (failures - 1))
+        delays = [client.retry_delay() for _ in range(200)]
+        assert expected / 2 <= min(delays) and max(delays) <= expected
+        assert max(delays) - min(delays) > expected / 4  # Jittered, not a fixed delay
+
+    # One success resets the backoff
+    server.respond((200, {}, 0.0))
+    client.get_json("/summary", "key")
+    assert client.retry_delay() <= 1.0
+    client.close()
+
+def test_latency_is_recorded(server: StandInServer):
+    server.respond((200, {}, 0.05))
+    client = _client(server)
+    for _ in range(3):
+        client.get_json("/summary", "key")
+    stats = client.latency_stats()
+    assert stats["count"] == 3
+    assert stats["p50_ms"] >= 50
+    assert client.last_latency_ms >= 50
+    client.close()
+
+def test_etag_304_returns_the_cached_body(server: StandInServer):
+    server.respond((200, {"ETag": '"v1"'}, 0.0), (304, {"ETag": '"v1"'}, 0.0), (200, {"ETag": '"v2"'}, 0.0))
+    client = _client(server)
+    assert client.get_json("/summary", "key") == BODY
+    assert "If-None-Match" not in server.requests[0][0]
+
+    assert client.get_json("/summary", "key") == BODY
+    assert server.requests[1][0]["If-None-Match"] == '"v1"'
+
+    # Cached bodies are per API key
+    client.get_json("/summary", "other-key")
+    assert "If-None-Match" not in server.requests[2][0]
+    client.close()
+
+def test_circuit_opens_then_half_opens(server: StandInServer):
+    server.respond((503, {}, 0.0))
+    client = _client(server)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            client.get_json("/summary", "key")
+
+    # Open: nothing reaches the server until the reset timeout passes
+    with pytest.raises(CircuitOpenError):
+        client.get_json("/summary", "key")
+    assert len(server.requests) == 3
+    assert client.retry_delay() == 1.0  # Waits out the reset timeout, at least a second
+
+    # Half-open: one trial request, its failure opens the circuit again straight away
+    time.sleep(0.35)
+    with pytest.raises(requests.HTTPError):
+        client.get_json("/summary", "key")
+    assert len(server.requests) == 4
+    with pytest.raises(CircuitOpenError):
+        client.get_json("/summary", "key")
+    assert len(server.requests) == 4
+
+    # A successful trial closes it
+    server.respond((200, {}, 0.0))
+    time.sleep(0.35)
+    assert client.get_json("/summary", "key") == BODY
+    assert client.get_json("/summary", "key") == BODY
+    assert len(server.requests) == 6
+    client.close()
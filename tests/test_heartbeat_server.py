@@ -0,0 +1,141 @@
+from datetime import date, datetime, time as dt_time
+import threading
+import time
+from typing import Any, List
+
+import pytest
+import requests
+
+from src.daemon import Daemon
+from src import heartbeat_server as heartbeat_server_module
+from src.heartbeat_server import HeartbeatServer
+from src.profiles import profiles
+
+EDITORS = 4
+BATCHES_PER_EDITOR = 100
+BULK_SIZE = 25
+HEARTBEAT_INTERVAL = 2  # sec between consecutive heartbeats, across all the editors
+
+class RecordingClient:
+    # Stands in for the upstream API, only the bulk forwarding calls it
+    def __init__(self) -> None:
+        self.forwarded: List[Any] = []
+
+    def post_json(self, path: str, api_key: str, payload: Any) -> Any:
+        self.forwarded.extend(payload)
+        return {}
+
+def _today_at(hour: int) -> float:
+    return datetime.combine(date.today(), dt_time(hour)).timestamp()
+
+@pytest.fixture
+def primary_tracker():
+    tracker = profiles.primary.tracker
+    tracker.restore(0)
+    yield tracker
+    tracker.restore(0)
+
+@pytest.fixture
+def daemon(primary_tracker, monkeypatch: pytest.MonkeyPatch):
+    daemon = Daemon()
+    published = []
+    monkeypatch.setattr(daemon, "_publish_progress", published.append)
+    daemon.published = published
+    return daemon
+
+def test_invalid_heartbeats_in_a_batch_are_skipped():
+    server = HeartbeatServer(RecordingClient())
+    start = _today_at(1)
+    errors = server.add_heartbeats([
+        {"time": start}, {"time": "soon"}, {"time": 1e300}, {"time": float("nan")}, {}, "heartbeat", {"time": start + 60},
+    ])
+    assert [error is None for error in errors] == [True, False, False, False, False, False, True]
+    assert server.effective_seconds == 60
+    assert len(server._pending) == 2
+
+def test_future_heartbeats_do_not_stop_counting():
+    server = HeartbeatServer(RecordingClient())
+    now = time.time()
+    errors = server.add_heartbeats([{"time": now + 86400}, {"time": now + 365 * 86400}])
+    assert all(errors)
+
+    assert server.add_heartbeats([{"time": now - 120}, {"time": now - 60}]) == [None, None]
+    assert server._today.day == date.today()
+    assert server.effective_seconds == 60
+
+def test_http_partial_batch_is_accepted(daemon: Daemon):
+    server = HeartbeatServer(RecordingClient())
+    server.start(0)
+    try:
+        url = f"http://127.0.0.1:{server._httpd.server_port}/api/hackatime/v1/users/current/heartbeats"
+        start = _today_at(1)
+        res = requests.post(f"{url}.bulk", json=[{"time": start}, {"time": 1e300}, {"time": start + 30}], timeout=5)
+        assert res.status_code == 201
+        assert [status for _, status in res.json()["responses"]] == [201, 400, 201]
+        assert server.effective_seconds == 30
+
+        assert requests.post(url, json={"time": "never"}, timeout=5).status_code == 400
+        assert requests.post(url, data=b"{not json", timeout=5).status_code == 400
+    finally:
+        server.stop()
+
+def test_stale_progress_is_not_taken_for_a_midnight_reset(daemon: Daemon, primary_tracker, monkeypatch: pytest.MonkeyPatch):
+    server = HeartbeatServer(RecordingClient(), on_progress=daemon._handle_local_heartbeat)
+    daemon.heartbeat_server = server
+    start = _today_at(1)
+    server.add_heartbeats([{"time": start}, {"time": start + 100}])
+    server.add_heartbeats([{"time": start + 200}])
+    assert primary_tracker.total_seconds == 200
+
+    # A handler thread that computed 100s but got descheduled before passing it on
+    daemon._handle_local_heartbeat(100)
+    assert primary_tracker.total_seconds == 200
+
+    # A poll that lands in between goes through the same lock and reconciles against the receiver
+    monkeypatch.setattr(primary_tracker, "fetch_coding_seconds", lambda api_key=None: 150)
+    assert daemon._get_seconds_coded() == 200
+    assert primary_tracker.total_seconds == 200
+
+def test_load_from_several_editors(daemon: Daemon, primary_tracker, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(heartbeat_server_module, "MAX_CLOCK_SKEW", 86400)  # The timeline runs from 1am for hours, maybe past now
+    client = RecordingClient()
+    server = HeartbeatServer(client, on_progress=daemon._handle_local_heartbeat)
+    daemon.heartbeat_server = server
+    server.start(0)
+    url = f"http://127.0.0.1:{server._httpd.server_port}/api/hackatime/v1/users/current/heartbeats.bulk"
+
+    start = _today_at(1)
+    failures = []
+
+    def editor(i: int) -> None:
+        # Each editor's heartbeats interleave with the others'
+        with requests.Session() as session:
+            for batch in range(BATCHES_PER_EDITOR):
+                first = (batch * BULK_SIZE) * HEARTBEAT_INTERVAL * EDITORS
+                heartbeats = [
+                    {"time": start + first + (n * EDITORS + i) * HEARTBEAT_INTERVAL, "entity": f"editor{i}.py"}
+                    for n in range(BULK_SIZE)
+                ]
+                res = session.post(url, json=heartbeats, timeout=10)
+                if res.status_code != 201:
+                    failures.append(res.status_code)
+
+    editors = [threading.Thread(target=editor, args=(i,)) for i in range(EDITORS)]
+    started_at = time.perf_counter()
+    for thread in editors:
+        thread.start()
+    for thread in editors:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+    server.stop()
+
+    total = EDITORS * BATCHES_PER_EDITOR * BULK_SIZE
+    assert failures == []
+    assert total / elapsed > 1000, f"only {total / elapsed:.0f} heartbeats/s"
+
+    # Every heartbeat is 2s after another one, so the day is one unbroken stretch
+    expected = (total - 1) * HEARTBEAT_INTERVAL
+    assert server.effective_seconds == expected
+    assert primary_tracker.total_seconds == expected
+    assert daemon.published == sorted(daemon.published)
+    assert len(client.forwarded) == total
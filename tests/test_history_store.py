@@ -0,0 +1,26 @@
+from datetime import date, datetime
+import logging
+from pathlib import Path
+
+import pytest
+
+from src.history_store import HistoryStore
+
+def test_recorded_samples_are_written_on_close(tmp_path: Path):
+    store = HistoryStore(tmp_path / "history.db")
+    store.record(60, datetime(2026, 1, 2, 10))
+    store.record(120, datetime(2026, 1, 2, 11))
+    store.close()
+
+    store = HistoryStore(tmp_path / "history.db")
+    assert store.daily_totals(date(2026, 1, 1), date(2026, 1, 3)) == [("2026-01-02", 120)]
+    assert [seconds for _, seconds in store.samples(date(2026, 1, 2))] == [60, 120]
+    store.close()
+
+def test_record_after_close_warns(tmp_path: Path, caplog: pytest.LogCaptureFixture):
+    store = HistoryStore(tmp_path / "history.db")
+    store.close()
+    with caplog.at_level(logging.WARNING):
+        store.record(60)
+    assert "History store is closed" in caplog.text
+    store.close()  # Closing twice is harmless
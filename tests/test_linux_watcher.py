@@ -0,0 +1,98 @@
+import os
+from pathlib import Path
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="netlink is Linux only")
+
+from src.profiles import profiles  # noqa: E402
+from src.watchers import enforcer  # noqa: E402
+from src.watchers import linux  # noqa: E402
+
+PROBE_NAME = "hb-test-probe"
+
+def _event(what: int, pid: int, tgid: int) -> bytes:
+    event = linux.PROC_EVENT_HEADER.pack(what, 0, 123) + linux.EXEC_EVENT.pack(pid, tgid)
+    cn_msg = linux.CN_MSG_HEADER.pack(linux.CN_IDX_PROC, linux.CN_VAL_PROC, 0, 0, len(event), 0) + event
+    return linux.NLMSG_HEADER.pack(linux.NLMSG_HEADER.size + len(cn_msg), linux.NLMSG_DONE, 0, 0, 0) + cn_msg
+
+def test_parse_exec_events_keeps_process_execs_only():
+    fork = 0x00000001
+    data = _event(linux.PROC_EVENT_EXEC, 10, 10) + _event(fork, 11, 11) + _event(linux.PROC_EVENT_EXEC, 12, 10)
+    assert list(linux._parse_exec_events(data)) == [(10, 123)]
+
+def test_parse_exec_events_stops_at_truncated_message():
+    data = _event(linux.PROC_EVENT_EXEC, 10, 10)
+    assert list(linux._parse_exec_events(data + data[:8])) == [(10, 123)]
+
+def _connector_available() -> bool:
+    try:
+        linux._open_proc_connector().close()
+        return True
+    except OSError:
+        return False
+
+@pytest.mark.skipif(os.geteuid() != 0 or not _connector_available(), reason="the proc connector needs CAP_NET_ADMIN")
+def test_blocked_exec_is_killed(restore_settings, tmp_path: Path):
+    probe = tmp_path / PROBE_NAME
+    shutil.copy(shutil.which("sleep"), probe)
+    restore_settings.update_settings({
+        "blocked_apps": [PROBE_NAME], "enforcement_mode": "kill", "kill_respawning_parents": False, "exec_guard_enabled": False,
+    })
+    enforcer.respawn_guard = enforcer.RespawnGuard()
+
+    shutdown_event, requirement_met_event = threading.Event(), threading.Event()
+    watcher = threading.Thread(target=linux.watch_processes, args=(shutdown_event, requirement_met_event), daemon=True)
+    watcher.start()
+    try:
+        time.sleep(0.2)
+        started_at = time.perf_counter()
+        proc = subprocess.Popen([str(probe), "60"])
+        assert proc.wait(timeout=5) < 0
+        assert time.perf_counter() - started_at < 1
+
+        # Nothing is killed once the requirement is met
+        requirement_met_event.set()
+        allowed = subprocess.Popen([str(probe), "0.3"])
+        assert allowed.wait(timeout=5) == 0
+    finally:
+        shutdown_event.set()
+        watcher.join(timeout=5)
+
+def test_one_bad_event_does_not_stop_the_watcher(monkeypatch: pytest.MonkeyPatch):
+    sock, feed = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    monkeypatch.setattr(linux, "_open_proc_connector", lambda: sock)
+    monkeypatch.setattr(linux, "_set_listening", lambda sock, listen: None)
+    monkeypatch.setattr(profiles.primary, "met", False)
+
+    checked = []
+
+    def get_process_name(pid: int) -> str:
+        if pid == 10:
+            raise RuntimeError("unreadable /proc entry")
+        return f"app{pid}"
+
+    monkeypatch.setattr(linux, "get_process_name", get_process_name)
+    monkeypatch.setattr(linux, "is_blocked", lambda rules, pid, name, on_hash_match: checked.append(pid) or False)
+
+    shutdown_event, requirement_met_event = threading.Event(), threading.Event()
+    watcher = threading.Thread(target=linux._watch_exec_events, args=(shutdown_event, requirement_met_event), daemon=True)
+    watcher.start()
+    try:
+        feed.send(_event(linux.PROC_EVENT_EXEC, 10, 10) + _event(linux.PROC_EVENT_EXEC, 11, 11))
+        feed.send(_event(linux.PROC_EVENT_EXEC, 12, 12))
+        deadline = time.monotonic() + 5
+        while checked != [11, 12] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert checked == [11, 12]
+        assert watcher.is_alive()
+    finally:
+        shutdown_event.set()
+        watcher.join(timeout=5)
+        feed.close()
@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PySide6.QtWidgets")
+
+from src.log_viewer import LogIndex  # noqa: E402
+
+LINES = [
+    "2026-01-01 10:00:00 [INFO] Booting hackablock",
+    "2026-01-01 10:00:01 [WARNING] Steam is respawning",
+    '{"time": "2026-01-01T10:00:02", "level": "ERROR", "message": "steam could not be killed"}',
+    "2026-01-01 10:00:03 [INFO] Blocked steam",
+]
+
+@pytest.fixture
+def log(tmp_path: Path) -> Path:
+    return tmp_path / "hackablock.log"
+
+@pytest.fixture
+def index(log: Path):
+    # Jobs are run directly instead of on the worker thread, signals are delivered straight away
+    index = LogIndex(log)
+    index.resets = []
+    index.filtered = []
+    index.reset.connect(lambda: index.resets.append(True))
+    index.filter_ready.connect(lambda generation, lines, extends: index.filtered.append((generation, None if lines is None else list(lines), extends)))
+    yield index
+    index._unmap()
+
+def test_partial_last_line_waits_for_its_newline(index: LogIndex, log: Path):
+    log.write_text(f"{LINES[0]}\n{LINES[1][:20]}")
+    index._refresh()
+    assert index.line_count == 1
+    assert index.line(0) == LINES[0]
+
+    with log.open("a") as f:
+        f.write(f"{LINES[1][20:]}\n")
+    index._refresh()
+    assert index.line_count == 2
+    assert index.line(1) == LINES[1]
+    assert index.resets == [True]  # Only the first open
+
+def test_rotation_starts_over(index: LogIndex, log: Path):
+    log.write_text("".join(f"{line}\n" for line in LINES))
+    index._refresh()
+    assert index.line_count == 4
+
+    log.rename(log.with_name("hackablock.log.1"))
+    log.write_text(f"{LINES[3]}\n")
+    index._refresh()
+    assert index.resets == [True, True]
+    assert index.line_count == 1
+    assert index.line(0) == LINES[3]
+
+def test_truncation_starts_over(index: LogIndex, log: Path):
+    log.write_text("".join(f"{line}\n" for line in LINES))
+    index._refresh()
+
+    with log.open("r+") as f:
+        f.truncate(0)
+        f.write(f"{LINES[0]}\n")
+    index._refresh()
+    assert index.resets == [True, True]
+    assert index.line_count == 1
+    assert index.line(0) == LINES[0]
+
+@pytest.mark.parametrize("min_level, text, expected", [
+    ("WARNING", "", [1, 2]),  # Both the text and the JSON lines formats
+    (None, "STEAM", [1, 2, 3]),
+    ("ERROR", "steam", [2]),
+    ("INFO", "booting", [0]),
+    (None, "", None),
+])
+def test_filter_by_level_and_text(index: LogIndex, log: Path, min_level, text, expected):
+    log.write_text("".join(f"{line}\n" for line in LINES))
+    index._refresh()
+
+    index.set_filter(7, min_level, text)
+    index._jobs.get()()
+    assert index.filtered == [(7, expected, False)]
+
+def test_filter_extends_to_new_lines(index: LogIndex, log: Path):
+    log.write_text(f"{LINES[0]}\n{LINES[1]}\n")
+    index._refresh()
+    index.set_filter(1, "WARNING", "")
+    index._jobs.get()()
+
+    with log.open("a") as f:
+        f.write(f"{LINES[2]}\n{LINES[3]}\n")
+    index._refresh()
+    assert index.filtered == [(1, [1], False), (1, [2], True)]
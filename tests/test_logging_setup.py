@@ -0,0 +1,43 @@
+import logging
+import os
+from pathlib import Path
+
+import pytest
+
+from src import logging_setup
+
+def _record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 0, message, None, None)
+
+def test_rollover_waits_while_the_log_cannot_be_renamed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    log = tmp_path / "hackablock.log"
+    monkeypatch.setattr(logging_setup, "LOG_FILE", log)
+    (tmp_path / "hackablock.log.1").write_text("older\n")
+    (tmp_path / "hackablock.log.2").write_text("oldest\n")
+    handler = logging_setup.create_file_handler("text", max_bytes=100, backups=2)
+
+    # What Windows does while the Logs tab has the file mapped
+    rename = os.rename
+
+    def locked_rename(src, dst):
+        if os.fspath(src) == str(log):
+            raise PermissionError(13, "The process cannot access the file because it is being used by another process")
+        rename(src, dst)
+
+    monkeypatch.setattr(os, "rename", locked_rename)
+    try:
+        for i in range(10):
+            handler.emit(_record(f"message {i} " + "x" * 20))
+        assert log.read_text().count("message") == 10
+        assert (tmp_path / "hackablock.log.1").read_text() == "older\n"
+        assert (tmp_path / "hackablock.log.2").read_text() == "oldest\n"
+
+        # Once the file is free again the next attempt goes through
+        monkeypatch.setattr(os, "rename", rename)
+        monkeypatch.setattr(handler, "_retry_at", 0.0)
+        handler.emit(_record("after the tab closed"))
+        assert "message 9" in (tmp_path / "hackablock.log.1").read_text()
+        assert (tmp_path / "hackablock.log.2").read_text() == "older\n"
+        assert "after the tab closed" in log.read_text()
+    finally:
+        handler.close()
@@ -0,0 +1,31 @@
+from src.metrics import MAX_LABEL_LENGTH, OVERFLOW_LABEL, MetricsRegistry
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test", ["app"])
+    counter.inc(app='evil"} 1\nfake_metric{x="\\')
+    lines = registry.render_prometheus().splitlines()
+    assert lines[2] == 'test_total{app="evil\\"} 1\\nfake_metric{x=\\"\\\\"} 1'
+    assert len(lines) == 3
+
+def test_histogram_label_values_are_escaped():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test", ["app"], buckets=(1.0,))
+    histogram.observe(0.5, app='a"b')
+    assert 'test_seconds_bucket{app="a\\"b",le="1"} 1' in registry.render_prometheus()
+
+def test_long_label_values_are_truncated():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test", ["app"])
+    counter.inc(app="x" * 1000)
+    assert counter.snapshot() == [{"labels": {"app": "x" * MAX_LABEL_LENGTH}, "value": 1}]
+
+def test_series_past_the_cap_are_counted_together():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test", ["app"], max_series=3)
+    for i in range(10):
+        counter.inc(app=f"app{i}")
+    counter.inc(app="app0")
+
+    values = {series["labels"]["app"]: series["value"] for series in counter.snapshot()}
+    assert values == {"app0": 2, "app1": 1, "app2": 1, OVERFLOW_LABEL: 7}
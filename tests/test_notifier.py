@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PySide6.QtCore")
+
+from src.notifier import MAX_PENDING, Notifier  # noqa: E402
+
+class FakeTray:
+    def __init__(self) -> None:
+        self.shown = []
+
+    def showMessage(self, title: str, message: str) -> None:
+        self.shown.append((title, message))
+
+@pytest.fixture
+def notifier(restore_settings):
+    QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    restore_settings.update_settings({"notification_rate_cap": 2})
+    notifier = Notifier(FakeTray())
+    yield notifier
+    notifier._timer.stop()
+
+def test_rate_cap_drops_repeated_noise(notifier: Notifier):
+    for i in range(4):
+        notifier.notify(f"🚫 Blocked app{i} from opening", "", category="blocked")
+        notifier._drain()
+    assert [title for title, _ in notifier._tray.shown] == ["🚫 Blocked app0 from opening", "🚫 Blocked app1 from opening"]
+
+def test_state_changes_are_never_capped(notifier: Notifier):
+    for i in range(3):
+        notifier.notify(f"▶️ Resumed suspended apps {i}:", "steam", category="progress")
+        notifier._drain()
+    for i in range(MAX_PENDING):
+        notifier.notify(f"🚫 Blocked app{i} from opening", "", category="blocked")
+    notifier.notify("🎉 Time requirement met!", "Apps are unblocked!", category="progress")
+    notifier._drain()
+
+    titles = [title for title, _ in notifier._tray.shown]
+    assert titles[:3] == [f"▶️ Resumed suspended apps {i}:" for i in range(3)]
+    assert "🎉 Time requirement met!" in titles
+
+def test_only_identical_messages_are_merged(notifier: Notifier):
+    notifier.notify("🚫 Blocked running apps:", "steam", category="blocked")
+    notifier.notify("🚫 Blocked running apps:", "discord", category="blocked")
+    notifier._drain()
+    notifier.notify("❌ Could not fetch coding time.", "Retrying in 1m 0s.", category="fetch_error")
+    notifier.notify("❌ Could not fetch coding time.", "Retrying in 1m 0s.", category="fetch_error")
+    notifier._drain()
+
+    assert notifier._tray.shown == [
+        ("🚫 Blocked running apps:", "steam"),
+        ("🚫 Blocked running apps:", "discord"),
+        ("❌ Could not fetch coding time ×2", "Retrying in 1m 0s."),
+    ]
@@ -0,0 +1,67 @@
+import pytest
+
+from src.poll_scheduler import MAX_CODING_RATE, PollScheduler
+
+REQUIRED = 3600
+MAX_LATENCY = 120
+HORIZON = 12 * 3600
+
+# Seconds coded by wall-clock second t since the daemon started
+TIMELINES = {
+    "steady": lambda t: t * 0.5,
+    "flat_out": lambda t: t,
+    "bursty": lambda t: (t // 2400) * 1080 + min(t % 2400, 1200) * 0.9,
+    "late_start": lambda t: max(0, t - 7200) * 0.7,
+    "coded_before_start": lambda t: 2400 + t * 0.3,
+    "slowing": lambda t: min(t, 1800) * 0.9 + max(0, t - 1800) * 0.1,
+}
+
+def _replay(coded, scheduler: PollScheduler | None):
+    # Polls like the daemon's loop, returns (API calls, seconds between reaching the goal and seeing it)
+    now, calls = 0.0, 0
+    while now < HORIZON:
+        seconds = int(coded(now))
+        calls += 1
+        if seconds >= REQUIRED:
+            crossed_at = next(t for t in range(HORIZON) if coded(t) >= REQUIRED)
+            return calls, now - crossed_at
+        if scheduler is None:  # What the rate-aware scheduler replaced
+            now += max(REQUIRED - seconds, 60)
+        else:
+            scheduler.record(seconds, now=now)
+            now += scheduler.next_delay(seconds, REQUIRED, MAX_LATENCY)
+    return calls, None
+
+@pytest.mark.parametrize("timeline", TIMELINES)
+def test_unblock_latency_is_bounded(timeline: str):
+    calls, latency = _replay(TIMELINES[timeline], PollScheduler(min_interval=60))
+    assert latency is not None and latency <= MAX_LATENCY
+
+@pytest.mark.parametrize("timeline", TIMELINES)
+def test_no_more_calls_than_the_old_scheduler(timeline: str):
+    old_calls, _ = _replay(TIMELINES[timeline], None)
+    new_calls, _ = _replay(TIMELINES[timeline], PollScheduler(min_interval=60))
+    assert new_calls <= old_calls
+
+def test_never_polls_before_the_goal_could_be_reached():
+    scheduler = PollScheduler(min_interval=60)
+    scheduler.record(0, now=0)
+    scheduler.record(600, now=600)  # Coding flat out
+    assert scheduler.next_delay(600, REQUIRED, MAX_LATENCY) >= (REQUIRED - 600) / MAX_CODING_RATE
+
+def test_idle_backs_off_to_the_latency_bound():
+    scheduler = PollScheduler(min_interval=60)
+    for now in range(0, 3600, 600):
+        scheduler.record(1000, now=now)
+    assert scheduler.coding_rate() == 0
+    assert scheduler.next_delay(1000, REQUIRED, MAX_LATENCY) == REQUIRED - 1000 + MAX_LATENCY
+
+def test_goal_met_polls_at_the_minimum_interval():
+    assert PollScheduler(min_interval=60).next_delay(REQUIRED, REQUIRED, MAX_LATENCY) == 60
+
+def test_midnight_reset_forgets_yesterdays_rate():
+    scheduler = PollScheduler(min_interval=60)
+    scheduler.record(0, now=0)
+    scheduler.record(3000, now=3600)
+    scheduler.record(0, now=3700)
+    assert scheduler.coding_rate() == 0
@@ -0,0 +1,54 @@
+import threading
+import time
+from typing import List, Tuple
+
+import pytest
+
+from src.profiles import profiles
+from src.watchers import polling
+
+class FlakyScanner:
+    # Plays back one scan per poll, an exception in the list is raised by that scan
+    scans: List = []
+
+    @staticmethod
+    def is_supported() -> bool:
+        return True
+
+    def scan(self) -> List[Tuple[int, str]]:
+        result = FlakyScanner.scans.pop(0) if FlakyScanner.scans else []
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def start_time(self, pid: int) -> None:
+        return None
+
+def test_bad_pids_and_scans_do_not_stop_the_watcher(restore_settings, monkeypatch: pytest.MonkeyPatch):
+    restore_settings.update_settings({"process_poll_interval": 0.1})
+    monkeypatch.setattr(profiles.primary, "met", False)
+    monkeypatch.setattr(FlakyScanner, "scans", [[], [(10, "app10"), (11, "app11")], OSError("/proc went away"), [(12, "app12")]])
+    monkeypatch.setattr(polling, "ProcScanner", FlakyScanner)
+
+    checked = []
+
+    def is_blocked(rules, pid: int, name: str, on_hash_match) -> bool:
+        if pid == 10:
+            raise RuntimeError("unreadable /proc entry")
+        checked.append(pid)
+        return False
+
+    monkeypatch.setattr(polling, "is_blocked", is_blocked)
+
+    shutdown_event, requirement_met_event = threading.Event(), threading.Event()
+    watcher = threading.Thread(target=polling.watch_processes, args=(shutdown_event, requirement_met_event), daemon=True)
+    watcher.start()
+    try:
+        deadline = time.monotonic() + 5
+        while checked != [11, 12] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert checked == [11, 12]
+        assert watcher.is_alive()
+    finally:
+        shutdown_event.set()
+        watcher.join(timeout=5)
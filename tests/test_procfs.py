@@ -0,0 +1,100 @@
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="/proc is Linux only")
+
+from src.watchers import procfs  # noqa: E402
+
+def _now_ticks() -> int:
+    return int(time.clock_gettime(time.CLOCK_BOOTTIME) * procfs.CLOCK_TICKS)
+
+def _write_process(root: Path, pid: int, comm: str, start_time: int) -> None:
+    (root / str(pid)).mkdir(exist_ok=True)
+    (root / str(pid) / "stat").write_text(f"{pid} ({comm}) S 1 {pid} {pid} 0 -1 4194560 0 0 0 0 0 0 0 0 20 0 1 0 {start_time} 0 0\n")
+
+@pytest.fixture
+def fake_proc(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(procfs, "PROC_PATH", str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def old_start() -> int:
+    return _now_ticks() - 2 * procfs.RECHECK_AGE * procfs.CLOCK_TICKS
+
+def test_scan_reports_only_new_processes(fake_proc: Path, old_start: int):
+    _write_process(fake_proc, 100, "bash", old_start)
+    scanner = procfs.ProcScanner()
+    assert scanner.scan() == [(100, "bash")]
+    assert scanner.scan() == []
+
+    _write_process(fake_proc, 101, "steam", old_start)
+    assert scanner.scan() == [(101, "steam")]
+    assert dict(scanner.processes()) == {100: "bash", 101: "steam"}
+
+def test_old_unchanged_processes_are_not_read_again(fake_proc: Path, old_start: int, monkeypatch: pytest.MonkeyPatch):
+    for pid in range(100, 110):
+        _write_process(fake_proc, pid, "worker", old_start)
+    scanner = procfs.ProcScanner()
+    scanner.scan()
+
+    reads = []
+    monkeypatch.setattr(procfs, "read_stat", lambda pid: reads.append(pid))
+    scanner.scan()
+    assert reads == []
+
+def test_young_process_that_execs_is_reported_again(fake_proc: Path):
+    start_time = _now_ticks()
+    _write_process(fake_proc, 200, "sh", start_time)
+    scanner = procfs.ProcScanner()
+    assert scanner.scan() == [(200, "sh")]
+    assert scanner.scan() == []
+
+    # exec keeps the pid, its /proc entry and the start time, only the name changes
+    _write_process(fake_proc, 200, "steam", start_time)
+    assert scanner.scan() == [(200, "steam")]
+    assert scanner.start_time(200) == start_time
+
+def test_reused_pid_is_reported_with_its_new_name(fake_proc: Path, old_start: int):
+    _write_process(fake_proc, 300, "bash", old_start)
+    scanner = procfs.ProcScanner()
+    scanner.scan()
+
+    # A new process behind the same pid gets a fresh /proc entry
+    replacement = fake_proc / "tmp-300"
+    replacement.mkdir()
+    (replacement / "stat").write_text(f"300 (steam) S 1 300 300 0 -1 4194560 0 0 0 0 0 0 0 0 20 0 1 0 {old_start + 50} 0 0\n")
+    shutil.rmtree(fake_proc / "300")
+    replacement.rename(fake_proc / "300")
+
+    assert scanner.scan() == [(300, "steam")]
+    assert scanner.start_time(300) == old_start + 50
+
+def test_exited_processes_are_forgotten(fake_proc: Path, old_start: int):
+    _write_process(fake_proc, 400, "bash", old_start)
+    scanner = procfs.ProcScanner()
+    scanner.scan()
+    shutil.rmtree(fake_proc / "400")
+    scanner.scan()
+    assert scanner.start_time(400) is None
+    assert list(scanner.processes()) == []
+
+def test_real_wrapper_exec_is_seen(tmp_path: Path):
+    probe = tmp_path / "hb-exec-probe"
+    shutil.copy(shutil.which("sleep"), probe)
+    scanner = procfs.ProcScanner()
+    scanner.scan()
+
+    wrapper = subprocess.Popen(["sh", "-c", f'sleep 0.3; exec "{probe}" 5'])
+    try:
+        time.sleep(0.1)
+        assert (wrapper.pid, "sh") in scanner.scan()
+        time.sleep(0.5)
+        assert (wrapper.pid, "hb-exec-probe") in scanner.scan()
+    finally:
+        wrapper.kill()
+        wrapper.wait()
@@ -0,0 +1,64 @@
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux") or not shutil.which("sleep"), reason="uses /proc and sleep")
+
+from src.settings import DEFAULTS  # noqa: E402
+from src.watchers import enforcer  # noqa: E402
+
+LAUNCHER_NAME = "hb-test-launcher"
+
+@pytest.fixture
+def spawn(tmp_path: Path):
+    procs = []
+
+    def spawn(name: str, argv0: str | None = None, **kwargs) -> subprocess.Popen:
+        binary = tmp_path / name
+        if not binary.exists():
+            shutil.copy(shutil.which("sleep"), binary)
+        proc = subprocess.Popen([argv0 or str(binary), "60"], executable=binary, **kwargs)
+        procs.append(proc)
+        return proc
+
+    yield spawn
+    for proc in procs:
+        proc.kill()
+        proc.wait()
+
+@pytest.fixture
+def launchers(restore_settings):
+    restore_settings.update_settings({"kill_respawning_parents": True, "respawning_launchers": [LAUNCHER_NAME.upper()]})
+    return restore_settings
+
+def test_parents_are_left_alone_by_default():
+    assert DEFAULTS["kill_respawning_parents"] is False
+    assert DEFAULTS["respawning_launchers"] == []
+
+def test_only_listed_launchers_are_killed(launchers, spawn):
+    listed = spawn(LAUNCHER_NAME)
+    unlisted = spawn("hb-test-terminal")
+
+    assert not enforcer.kill_respawning_parent(unlisted.pid, "steam")
+    assert unlisted.poll() is None
+
+    assert enforcer.kill_respawning_parent(listed.pid, "steam")
+    assert listed.wait(timeout=5) == -9
+
+@pytest.mark.parametrize("kwargs", [
+    {"start_new_session": True},  # The session leader, like the shell a terminal runs
+    {"argv0": f"-{LAUNCHER_NAME}"},  # A login shell
+], ids=["session-leader", "login-shell"])
+def test_session_roots_are_never_killed(launchers, spawn, kwargs):
+    parent = spawn(LAUNCHER_NAME, **kwargs)
+    assert not enforcer.kill_respawning_parent(parent.pid, "steam")
+    assert parent.poll() is None
+
+def test_desktop_shells_are_never_killed(launchers, spawn):
+    launchers.update_settings({"respawning_launchers": ["gnome-shell"]})
+    parent = spawn("gnome-shell")
+    assert not enforcer.kill_respawning_parent(parent.pid, "steam")
+    assert parent.poll() is None
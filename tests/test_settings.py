@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src import settings as settings_module
+from src.daemon import Daemon
+
+WRITERS = 8
+ADDS_PER_WRITER = 50
+
+def test_snapshots_are_deeply_immutable(restore_settings):
+    restore_settings.update_settings({"profiles": [{"name": "alice", "hackatime_api_key": "key", "blocked_apps": ["steam"], "users": ["alice"]}]})
+    profile = restore_settings.data["profiles"][0]
+    with pytest.raises(TypeError):
+        profile["blocked_apps"] = ["nothing"]
+    with pytest.raises(AttributeError):
+        profile["blocked_apps"].append("nothing")
+    with pytest.raises(TypeError):
+        restore_settings.data["minutes_required"] = 1
+
+def test_saved_settings_are_plain_json(restore_settings):
+    restore_settings.update_settings({"profiles": [{"name": "alice", "hackatime_api_key": "key", "users": ["alice"]}]})
+    restore_settings.flush()
+    saved = json.loads(settings_module.SETTINGS_FILE.read_text())
+    assert saved["profiles"] == [{"name": "alice", "hackatime_api_key": "key", "users": ["alice"]}]
+    assert saved["blocked_apps"] == list(restore_settings.data["blocked_apps"])
+
+def test_update_can_leave_settings_alone(restore_settings):
+    version = restore_settings.snapshot().version
+    assert restore_settings.update(lambda data: None) is None
+    assert restore_settings.snapshot().version == version
+
+def test_concurrent_adds_are_not_lost(restore_settings):
+    restore_settings.update_settings({"blocked_apps": []})
+    daemon = Daemon()
+    stop = threading.Event()
+    problems = []
+
+    def read() -> None:
+        # Every snapshot's index has to agree with its own block list, and the list only ever grows
+        seen = 0
+        while not stop.is_set():
+            snapshot = restore_settings.snapshot()
+            apps = snapshot.data["blocked_apps"]
+            if len(apps) < seen or (apps and not snapshot.block_rules.matches(apps[-1])):
+                problems.append(apps)
+            seen = len(apps)
+
+    def write(i: int) -> None:
+        for n in range(ADDS_PER_WRITER):
+            if not daemon._add_blocked_app(f"app-{i}-{n}"):
+                problems.append(f"app-{i}-{n}")
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(i,)) for i in range(WRITERS)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert problems == []
+    assert len(restore_settings.data["blocked_apps"]) == WRITERS * ADDS_PER_WRITER
+
+    # Adding one that's already there, in any case, changes nothing
+    assert not daemon._add_blocked_app("APP-0-0")
+    assert len(restore_settings.data["blocked_apps"]) == WRITERS * ADDS_PER_WRITER
+
+def test_concurrent_saves_start_one_writer(monkeypatch: pytest.MonkeyPatch):
+    fresh = settings_module.Settings()
+    barrier = threading.Barrier(WRITERS)
+    savers = [threading.Thread(target=lambda: (barrier.wait(), fresh.save())) for _ in range(WRITERS)]
+
+    started, registered = [], []
+
+    class SlowThread(threading.Thread):
+        # Widens the gap between checking for a writer and having one
+        def __init__(self, *args, **kwargs) -> None:
+            time.sleep(0.05)
+            started.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(settings_module.threading, "Thread", SlowThread)
+    monkeypatch.setattr(settings_module.atexit, "register", registered.append)
+    for thread in savers:
+        thread.start()
+    for thread in savers:
+        thread.join()
+
+    assert len(started) == 1
+    assert registered == [fresh.flush]
@@ -0,0 +1,16 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+@pytest.mark.parametrize("module, qt_loaded", [("src.daemon", False), ("src.app", True)])
+def test_headless_mode_never_loads_qt(tmp_path, module: str, qt_loaded: bool):
+    code = f"import sys, {module}; print(any(name.split('.')[0] in ('PySide6', 'shiboken6') for name in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=tmp_path, env={**os.environ, "PYTHONPATH": str(REPO_ROOT)}, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == str(qt_loaded)
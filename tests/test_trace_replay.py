@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from src.profiles import profiles
+from src.trace_recorder import REDACTED, trace_recorder
+from src.trace_replay import TraceReplayer
+
+SECRETS = ("top-level-secret", "profile-secret")
+
+@pytest.fixture
+def trace(restore_settings, tmp_path, monkeypatch: pytest.MonkeyPatch):
+    # Records a short session through the real hooks: settings, a fetch and one blocked and one allowed process
+    restore_settings.update_settings({
+        "hackatime_api_key": SECRETS[0], "blocked_apps": ["steam"], "minutes_required": 60,
+        "profiles": [{"name": "alice", "hackatime_api_key": SECRETS[1], "users": ["alice"]}],
+    })
+    path = tmp_path / "trace.jsonl"
+    trace_recorder.start(path, restore_settings.data)
+    try:
+        restore_settings.update_settings({"minutes_required": 30})
+        state = profiles.states()[0]
+        monkeypatch.setattr(state, "met", False)
+        trace_recorder.fetch("alice", seconds=600)
+
+        profile = profiles.enforced_profile(os.getpid())
+        for name in ("steam", "code"):
+            blocked = profile.block_rules.matches(name)
+            trace_recorder.process("netlink", os.getpid(), name, profile, blocked, exe=f"/usr/bin/{name}", cmdline=[name])
+    finally:
+        trace_recorder.stop()
+    return path
+
+def test_recorded_trace_replays_without_mismatches(trace, restore_settings):
+    before = dict(restore_settings.data)
+    report = TraceReplayer(trace).run()
+
+    assert report.mismatch_count == 0, report.mismatches
+    assert (report.events, report.processes, report.fetches) == (5, 2, 1)
+    assert dict(restore_settings.data) == before
+
+def test_api_keys_never_reach_the_trace(trace):
+    text = trace.read_text()
+    assert not any(secret in text for secret in SECRETS)
+    assert text.count(REDACTED) == 2  # Top-level and profile key in the opening settings, changes only carry what changed